@@ -5,8 +5,9 @@ if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 import customtkinter as ctk
 from sound_monitor.app import SoundMonitorApp
+from sound_monitor.daemon import DaemonClient
 
 if __name__ == "__main__":
     ctk.set_appearance_mode("dark")
-    app = SoundMonitorApp()
+    app = SoundMonitorApp(client=DaemonClient.connect())
     app.mainloop()
@@ -1,5 +1,5 @@
 __all__ = [
-    "constants", "utils", "gauge", "com_guard", "audio",
-    "persistence", "reporting", "charting", "ui_left",
-    "ui_right", "settings_dialog", "monitor", "app"
+    "constants", "utils", "profile", "engine", "gauge", "com_guard", "audio", "simaudio", "sessions", "metering",
+    "stats", "diagnostics", "persistence", "journal", "reporting", "analytics", "charting", "ui_left",
+    "ui_right", "settings_dialog", "diagnostics_dialog", "core", "monitor", "daemon", "replay", "sweep", "bench", "app"
 ]
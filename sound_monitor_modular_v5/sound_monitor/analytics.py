@@ -0,0 +1,200 @@
+# Análise de exposição sobre vários dias/arquivos (journal .tsj, export .tsc/.csv).
+# Cada arquivo vira colunas contíguas e é reduzido a somas combináveis; arquivos
+# independentes rodam em paralelo num pool de processos.
+import gzip, os, time, warnings
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from .history import COLUMNS, ZONES, MODES
+from .journal import HEADER, RECORD, segment_paths
+from .reporting import load_columnar
+
+_NUMPY_AVAILABLE = False
+try:
+    import numpy as np
+    _NUMPY_AVAILABLE = True
+except Exception:
+    _NUMPY_AVAILABLE = False
+
+def has_numpy() -> bool:
+    return _NUMPY_AVAILABLE
+
+# Histograma de nível: 0..140 dB em passos de 0,1 dB (percentis L10/L50/L90)
+HIST_MIN_DB = 0.0
+HIST_MAX_DB = 140.0
+HIST_STEP_DB = 0.1
+HIST_BINS = int(round((HIST_MAX_DB - HIST_MIN_DB) / HIST_STEP_DB))
+# Intervalos maiores que isto (pausa, app fechado) não contam tempo
+MAX_GAP_SEC = 5.0
+
+def _require_numpy():
+    if not _NUMPY_AVAILABLE:
+        raise RuntimeError("numpy não disponível")
+
+def _journal_dtype():
+    dt = np.dtype([(name, "<f8" if tc == "d" else "i1") for name, tc in COLUMNS])
+    if dt.itemsize != RECORD.size:
+        raise ValueError(f"registro do journal com {RECORD.size} bytes, dtype com {dt.itemsize}")
+    return dt
+
+def load_arrays(path):
+    """Colunas do arquivo como arrays numpy contíguos (modo/zona como códigos)."""
+    _require_numpy()
+    name = str(path).lower()
+    if name.endswith(".tsj"):
+        size = os.path.getsize(path)
+        n = max(0, size - HEADER.size) // RECORD.size
+        rec = np.fromfile(path, dtype=_journal_dtype(), count=n, offset=HEADER.size)
+        return {c: np.ascontiguousarray(rec[c]) for c, _ in COLUMNS}
+    if name.endswith(".tsc"):
+        _meta, cols = load_columnar(path)
+        return {c: np.array(cols[c]) for c, _ in COLUMNS}
+    if name.endswith(".csv") or name.endswith(".csv.gz"):
+        return _load_csv(path)
+    raise ValueError(f"formato não suportado para análise: {path}")
+
+def _from_local_seconds(naive):
+    """Inverso de `_local_seconds`: horário local "ingênuo" (s) -> timestamp.
+
+    Mesma regra do `time.mktime` por linha (hora ambígua decidida pelo mktime),
+    mas consultada uma vez por minuto distinto.
+    """
+    minute = np.floor(naive / 60.0).astype(np.int64)
+    mins, idx = np.unique(minute, return_inverse=True)
+    offs = np.fromiter((time.mktime(time.gmtime(m * 60)[:8] + (-1,)) - m * 60 for m in mins.tolist()),
+                       dtype=np.float64, count=len(mins))
+    return naive + offs[idx]
+
+def _csv_dtype():
+    # texto de modo/zona; o timestamp ISO vai direto para datetime64 no parser do numpy
+    return np.dtype([(name, "M8[s]" if name == "ts" else "U16" if tc == "b" else "f8") for name, tc in COLUMNS])
+
+def _load_csv(path):
+    opener = gzip.open if str(path).lower().endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", newline="") as fh, warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)   # só cabeçalho: "input contained no data"
+        rec = np.loadtxt(fh, delimiter=",", skiprows=1, dtype=_csv_dtype(), quotechar='"', comments=None, ndmin=1)
+    out = {"ts": _from_local_seconds(rec["ts"].astype(np.int64).astype(np.float64))}
+    for c, tc in COLUMNS[1:]:
+        if tc == "b":
+            code = {v: k for k, v in enumerate(MODES if c == "mode" else ZONES)}
+            vals, inv = np.unique(rec[c], return_inverse=True)
+            out[c] = np.array([code.get(str(v), 0) for v in vals], dtype=np.int8)[inv.reshape(-1)]
+        else:
+            out[c] = np.ascontiguousarray(rec[c])
+    return out
+
+def _local_seconds(ts):
+    """Timestamps -> segundos no horário local, com o fuso de cada instante.
+
+    O deslocamento é consultado uma vez por minuto distinto (as mudanças de
+    horário de verão caem em minuto cheio), então um arquivo que atravessa a
+    troca vai para a hora/dia local certos sem chamar localtime por amostra.
+    """
+    minute = np.floor(ts / 60.0).astype(np.int64)
+    mins, idx = np.unique(minute, return_inverse=True)
+    offs = np.fromiter((time.localtime(m * 60).tm_gmtoff for m in mins.tolist()), dtype=np.float64, count=len(mins))
+    return ts + offs[idx]
+
+def partial_stats(cols, max_gap=MAX_GAP_SEC):
+    """Reduz um conjunto de colunas a somas combináveis (vetorizado)."""
+    _require_numpy()
+    ts = cols["ts"]; t = cols["t_session"]; L = cols["L"]
+    n = len(ts)
+    if n == 0:
+        return {"hours": {}, "days": {}, "hist": np.zeros(HIST_BINS), "zone": np.zeros(len(ZONES)),
+                "mode": np.zeros(len(MODES)), "time": 0.0, "energy": 0.0, "points": 0}
+    # cada amostra vale até a próxima (nível anterior mantido); nova sessão/lacuna = 0
+    dt = np.zeros(n)
+    d = np.diff(t)
+    dt[:-1] = np.where((d > 0) & (d <= max_gap), d, 0.0)
+    energy = 10.0 ** (L / 10.0) * dt
+
+    local = _local_seconds(ts)
+    hour = np.floor(local / 3600.0).astype(np.int64)
+    hours, h_idx = np.unique(hour, return_inverse=True)
+    h_energy = np.bincount(h_idx, weights=energy)
+    h_time = np.bincount(h_idx, weights=dt)
+
+    day = np.floor(local / 86400.0).astype(np.int64)
+    days, d_idx = np.unique(day, return_inverse=True)
+    d_daily = np.zeros(len(days))
+    np.maximum.at(d_daily, d_idx, cols["daily"])
+
+    b = np.clip(((L - HIST_MIN_DB) / HIST_STEP_DB).astype(np.int64), 0, HIST_BINS - 1)
+    return {
+        "hours": {int(k): (float(e), float(s)) for k, e, s in zip(hours, h_energy, h_time)},
+        "days": {int(k): float(v) for k, v in zip(days, d_daily)},
+        "hist": np.bincount(b, weights=dt, minlength=HIST_BINS),
+        "zone": np.bincount(cols["zone"].astype(np.int64), weights=dt, minlength=len(ZONES))[:len(ZONES)],
+        "mode": np.bincount(cols["mode"].astype(np.int64), weights=dt, minlength=len(MODES))[:len(MODES)],
+        "time": float(dt.sum()),
+        "energy": float(energy.sum()),
+        "points": int(n),
+    }
+
+def merge_stats(parts):
+    _require_numpy()
+    acc = {"hours": {}, "days": {}, "hist": np.zeros(HIST_BINS), "zone": np.zeros(len(ZONES)),
+           "mode": np.zeros(len(MODES)), "time": 0.0, "energy": 0.0, "points": 0}
+    for p in parts:
+        for k, (e, s) in p["hours"].items():
+            e0, s0 = acc["hours"].get(k, (0.0, 0.0))
+            acc["hours"][k] = (e0 + e, s0 + s)
+        for k, v in p["days"].items():
+            acc["days"][k] = max(acc["days"].get(k, 0.0), v)
+        acc["hist"] += p["hist"]; acc["zone"] += p["zone"]; acc["mode"] += p["mode"]
+        acc["time"] += p["time"]; acc["energy"] += p["energy"]; acc["points"] += p["points"]
+    return acc
+
+def _leq(energy, seconds):
+    return float(10.0 * np.log10(energy / seconds)) if seconds > 0 and energy > 0 else None
+
+def _percentile_level(hist, exceed_pct):
+    """Ln: nível excedido em `exceed_pct`% do tempo (a partir do histograma ponderado)."""
+    total = hist.sum()
+    if total <= 0:
+        return None
+    cum = np.cumsum(hist)
+    i = int(np.searchsorted(cum, total * (1.0 - exceed_pct / 100.0)))
+    return round(HIST_MIN_DB + (min(i, HIST_BINS - 1) + 0.5) * HIST_STEP_DB, 2)
+
+def finish_stats(acc):
+    """Métricas finais: Leq por hora, L10/L50/L90, tempo por zona/modo, dose diária."""
+    def _key(units, sec, fmt):
+        return datetime.fromtimestamp(units * sec, timezone.utc).strftime(fmt)
+    return {
+        "points": acc["points"],
+        "total_time_s": acc["time"],
+        "leq_db": _leq(acc["energy"], acc["time"]),
+        "L10": _percentile_level(acc["hist"], 10),
+        "L50": _percentile_level(acc["hist"], 50),
+        "L90": _percentile_level(acc["hist"], 90),
+        "hourly_leq": {_key(k, 3600, "%Y-%m-%d %H:00"): _leq(e, s)
+                       for k, (e, s) in sorted(acc["hours"].items()) if s > 0},
+        "zone_time_s": dict(zip(ZONES, map(float, acc["zone"]))),
+        "mode_time_s": dict(zip(MODES, map(float, acc["mode"]))),
+        "daily_dose": {_key(k, 86400, "%Y-%m-%d"): v for k, v in sorted(acc["days"].items())},
+        "level_hist_1db": np.add.reduceat(acc["hist"], np.arange(0, HIST_BINS, int(round(1 / HIST_STEP_DB)))).tolist(),
+    }
+
+def analyze_arrays(cols, max_gap=MAX_GAP_SEC):
+    return finish_stats(merge_stats([partial_stats(cols, max_gap)]))
+
+def _partial_for_path(args):
+    path, max_gap = args
+    return partial_stats(load_arrays(path), max_gap)
+
+def analyze_files(paths, workers=None, max_gap=MAX_GAP_SEC):
+    """Analisa vários arquivos; cada um vai para um processo do pool."""
+    _require_numpy()
+    paths = [str(p) for p in paths]
+    if len(paths) <= 1 or workers == 1:
+        parts = [_partial_for_path((p, max_gap)) for p in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_partial_for_path, [(p, max_gap) for p in paths]))
+    return finish_stats(merge_stats(parts))
+
+def analyze_journal(base=None, workers=None, max_gap=MAX_GAP_SEC):
+    """Todos os segmentos diários do journal (um por processo)."""
+    return analyze_files(segment_paths(base), workers, max_gap)
@@ -1,280 +1,242 @@
-import time, math, platform, json
+import os, time, threading
 import customtkinter as ctk
-from pathlib import Path
-from tkinter import messagebox, filedialog
-from datetime import datetime
-from queue import Queue, Empty
-
-from .constants import (
-    DISCORD_BG, DISCORD_SURFACE, DISCORD_ACCENT, DISCORD_ERROR
-)
-from .utils import db_to_percent, fmt_hms, round_pct_ui
-from .audio import AudioBackend, VolumeEnforcer
-from .persistence import load_settings, save_settings
+from tkinter import messagebox, filedialog, EventType
+
+from .constants import DISCORD_BG, DISCORD_ACCENT, DISCORD_ERROR
+from .utils import round_pct_ui
+from .core import MonitorCore
+from .engine import DYNAMIC_STRATEGIES
 from .ui_left import build_left_panel
 from .ui_right import build_right_panel
 from .settings_dialog import open_settings_modal
-from .monitor import start_monitor_thread
-from .reporting import has_openpyxl, make_workbook, compute_summary_stats
-from .charting import draw_history_chart
+from .monitor import start_monitor_thread, start_attach_thread, _record_sample, clock_view
+from .render import RenderModel
+from .reporting import has_openpyxl, EXPORTERS, exporter_for, ReportExport, ExportCancelled
+from .daemon import DaemonError
+from .diagnostics_dialog import open_diagnostics_panel
+
+_MESSAGEBOXES = {"info": messagebox.showinfo, "warning": messagebox.showwarning, "error": messagebox.showerror}
+
+# Tcl sem threads: outra thread não pode armar um `after`, então a thread do Tk
+# precisa olhar a fila sozinha. O intervalo cai para o mínimo quando há o que
+# aplicar e dobra a cada passada vazia até o máximo (latência de tela ≤ 0,4 s parado).
+RENDER_POLL_MIN_MS = 50
+RENDER_POLL_MAX_MS = 400
+
+class _RemoteExport:
+    """Exportação rodando no daemon; daqui só dá para cancelar."""
+    def __init__(self, client):
+        self._client = client
+
+    def cancel(self):
+        try:
+            self._client.send("export_cancel")
+        except DaemonError:
+            pass
 
-class SoundMonitorApp(ctk.CTk):
-    def __init__(self):
+class SoundMonitorApp(MonitorCore, ctk.CTk):
+    """Janela do monitor. Com `client` (DaemonClient) é só uma vista do daemon:
+    não abre backend de áudio, journal nem checkpoint, e as ações viram comandos."""
+
+    def __init__(self, client=None):
         super().__init__()
         self.title("Monitor de Exposição Sonora - TCC")
         self.geometry("980x740")
         self.minsize(860, 770)
         self.configure(fg_color=DISCORD_BG)
 
-        # Config padrão (8h / 3dB)
-        self._defaults_cfg = {
-            "min_db": 40.0, "max_db": 95.0, "ref_db": 85.0,
-            "base_time_sec": 8 * 3600.0, "exchange_rate_db": 3.0,
-            "min_enforced_volume": 5.0, "default_volume": 30.0,
-        }
-        self.cfg = dict(self._defaults_cfg)
-
-        # Preferências e estados
-        self.hard_lock_enabled = True
-        self.lock_on_autoadjust = True
-        self.locked = False
-        self.lock_target_pct = None
-        self.lock_reason = ""
-        self.mode = "prefixado"
-        self.dynamic_strategy = "reserva"
-
-        mynow = time.time()
-        self.session_dose = 0.0
-        self.prev_session_dose = 0.0
-        self.time_at_current_level = 0.0
-        self.daily_dose = 0.0
-        self._day_key = datetime.now().strftime("%Y-%m-%d")
-        self.alert_50_fired = False
-        self.alert_100_fired = False
-        self.daily_warn_fired = False
-        self.daily_block_fired = False
-        self._last_update = mynow
-        import threading
-        self._stop_event = threading.Event()
-
-        self._last_L_for_timer = None
-        self.timer_epsilon_db = 1.0
-        self._last_vol_key = None
-
-        self.history = []
-        self.MAX_HISTORY = 50000
-        self.session_start_ts = mynow
-        self._last_hist_log = 0.0
-        self._last_chart_draw = 0.0
-        self.chart_window_sec = 120
-        self.chart_points = []
-        self._last_sys_sync = 0.0
-
-        self._audio_backend = AudioBackend()
-        self._audio_warned = False
-
-        self._lock_enforcer = None
-        import threading as _t
-        self._lock_enforcer_stop = _t.Event()
+        # Estado de dose/modos e serviços (sem UI); anexada, o motor local só espelha o do daemon
+        self._client = client
+        if client is None:
+            self._init_core(visible=True)
+        else:
+            self._init_state(visible=True)
 
         self._slider_updating = False
-        self.paused = False
-
-        # Parâmetros dinâmicos
-        self.dynamic_reserve_min_sec = 600.0
-        self.dynamic_reserve_max_sec = 1200.0
-        self.dynamic_reserve_fraction = 0.10
-        self.dynamic_step_small = 0.5
-        self.dynamic_step_medium = 1.0
-        self.dynamic_step_large = 2.0
-        self.dynamic_hysteresis_sec = 90.0
-        self.dynamic_adjust_interval = 0.6
-        self.dynamic_limiting_active = False
-        self.dynamic_decay_active = False
-        self.last_dynamic_adjust_ts = 0.0
-        self.dynamic_softlock_enabled = True
-        self.dynamic_ceiling_pct = None
-        self.dynamic_release_delay = 20.0
-        self._dynamic_upper_ok_since = None
-
-        self._volume_quantum = 2.0
-        self._ema_remaining_sec = None
-        self._ema_alpha = 0.25
+        self._clock = None
+        self._export_job = None
+        self._export_top = None
 
         # UI
         build_left_panel(self)
         build_right_panel(self)
 
         self._vol_cache = float(self.vol_slider.get())
-        self._ui_queue = Queue()
-        self.after(20, self._ui_pump)
-
-        # Carregar settings
-        self._load_settings()
+        self._render = RenderModel(self._schedule_render, diag=self.diag)
+        self._register_render_slots()
+        self._register_diag_sources()
+        self._render_polling = not self._tcl_threaded()
+        self._render_poll_ms = RENDER_POLL_MIN_MS
+        if self._render_polling:
+            self._render_poll()
+        self._clock_tick()
+
+        if client is not None:
+            self._attach(client)
+        else:
+            # Carregar settings
+            self._load_settings()
+            self._restore_checkpoint()
 
-        # Monitor
-        start_monitor_thread(self)
+            # Monitor
+            start_monitor_thread(self)
 
-        # Sync inicial
-        if self._audio_backend.available():
-            try:
-                sv = self._get_system_volume_percent()
+            # Sync inicial
+            sv = self._audio.refresh(wait=True)
+            if sv is not None:
                 if abs(sv - float(self.vol_slider.get())) > 2.0:
                     self._safe_set_slider(sv)
-                self.vol_label.configure(text=f"{round_pct_ui(self.vol_slider.get())}%")
                 self._vol_cache = float(self.vol_slider.get())
-            except Exception:
-                pass
+                self._set_vol_label(self._vol_cache)
 
+        self.bind("<Control-Shift-KeyPress-D>", lambda e: self._open_diagnostics_panel(), add="+")
+        self.bind("<Map>", self._on_visibility, add="+")
+        self.bind("<Unmap>", self._on_visibility, add="+")
         self.protocol("WM_DELETE_WINDOW", self._on_close)
 
     # --- UI Dispatchers ---
-    def _ui_pump(self):
+    def _register_render_slots(self):
+        r = self._render
+        r.register("gauge", lambda v: self.gauge.set_value(*v))
+        r.register("zone", lambda v: self.draw_zone_badge(*v))
+        r.register("time", lambda t: self.time_label.config(text=t))
+        r.register("remaining", lambda t: self.remaining_label.config(text=t))
+        r.register("status", lambda v: self.general_status.config(text=v[0], fg=v[1]))
+        r.register("export", self._show_export_progress)
+        r.register("period", lambda v: self.period_label.config(text=v[0], fg=v[1]))
+        r.register("summary", lambda t: self.summary_label.config(text=t))
+        r.register("slider_color", lambda c: self.vol_slider.configure(progress_color=c))
+        r.register("slider", self._set_slider_widget)
+        r.register("vol_label", lambda t: self.vol_label.configure(text=t))
+        r.register("chart", lambda _: self._draw_history_chart())
+        r.register("clock", self._show_clock)
+
+    def _register_diag_sources(self):
+        self.diag.add_source("render", self._render.stats)
+        if self._client is None:
+            self._register_core_diag_sources()
+
+    def _tcl_threaded(self):
         try:
-            while True:
-                func = self._ui_queue.get_nowait()
-                try:
-                    func()
-                except Exception as e:
-                    print("Erro ao executar função de UI:", e)
+            return bool(int(self.tk.eval(
+                "expr {[info exists tcl_platform(threaded)] ? $tcl_platform(threaded)"
+                " : [package vsatisfies [info patchlevel] 9-]}")))
         except Exception:
-            pass
-        self.after(20, self._ui_pump)
+            return False
+
+    def _schedule_render(self, func):
+        if self._render_polling and threading.current_thread() is not threading.main_thread():
+            return  # Tcl sem threads: a passada periódica de _render_poll aplica
+        self.after(0, func)
+
+    def _render_poll(self):
+        if self._render.pending():
+            self._render.render()
+            self._render_poll_ms = RENDER_POLL_MIN_MS
+        else:
+            self._render_poll_ms = min(RENDER_POLL_MAX_MS, self._render_poll_ms * 2)
+        self.after(self._render_poll_ms, self._render_poll)
+
+    def _show_clock(self, clock):
+        self._clock = clock
+        self._render_clock()
+
+    def _render_clock(self):
+        for slot, value in clock_view(self._clock, time.time()).items():
+            self._render.set(slot, value)
+
+    def _clock_tick(self):
+        # relógios de 1 s extrapolados aqui, sem acordar o monitor
+        if self._clock is not None and self._ui_visible:
+            self._render_clock()
+        self.after(1000, self._clock_tick)
 
     def _on_ui(self, func):
-        self._ui_queue.put(func)
+        """Ação pontual na thread do Tk (alertas, bloqueio, volume)."""
+        self._render.post(func)
+
+    def _ui_set(self, slot, value):
+        """Atualiza um slot de tela (último valor vence), de qualquer thread."""
+        self._render.set(slot, value)
+
+    def _alert(self, kind, title, text):
+        self._on_ui(lambda: _MESSAGEBOXES[kind](title, text))
+
+    def _set_status(self, text, fg):
+        self._render.apply_now("status", (text, fg))
+
+    def _set_vol_label(self, v):
+        self._render.apply_now("vol_label", f"{round_pct_ui(v)}%")
+
+    def _on_visibility(self, event):
+        if event.widget is not self:
+            return
+        self._ui_visible = event.type == EventType.Map
+        self._wake_monitor()
 
     # --- Helpers ---
     def _round_slider_label(self, v):
         return round_pct_ui(v)
 
-    def _quantize_pct(self, pct: float) -> float:
-        q = float(self._volume_quantum) if getattr(self, "_volume_quantum", None) else 1.0
-        return max(0.0, min(100.0, round(float(pct) / q) * q))
+    def _safe_set_slider(self, v):
+        self._render.apply_now("slider", float(v))
+
+    def _set_slider_widget(self, v):
+        self._slider_updating = True
+        try:
+            self.vol_slider.set(float(v))
+        finally:
+            self._slider_updating = False
 
     def _format_profile_text(self):
-        hours = self.cfg["base_time_sec"] / 3600.0
-        er_val = self.cfg["exchange_rate_db"]
-        er = int(er_val) if float(er_val).is_integer() else er_val
-        return f"Perfil diário: {self.cfg['ref_db']:.0f} dB / {hours:g}h ({er} dB)"
+        prof = self.engine.profile
+        hours = prof.base_time_sec / 3600.0
+        er_val = prof.exchange_rate_db
+        er = int(er_val) if er_val.is_integer() else er_val
+        return f"Perfil diário: {prof.ref_db:.0f} dB / {hours:g}h ({er} dB)"
 
     def _refresh_profile_label(self):
         self.profile_label.config(text=self._format_profile_text())
 
     def _draw_history_chart(self):
-        """Wrapper para redimensionamento do canvas de histórico."""
         try:
-            draw_history_chart(self.chart_canvas, self.chart_points, self.cfg, self.chart_window_sec)
+            self.history_chart.update(self.chart_points, self.cfg, self.chart_window_sec)
         except Exception as e:
             print("Erro ao redesenhar gráfico:", e)
 
-    # --- Áudio ---
-    def _get_system_volume_percent(self):
-        if not self._audio_backend.available():
-            raise RuntimeError("Sem backend de áudio")
-        return float(self._audio_backend.get_percent())
-
-    def _set_system_volume_percent(self, pct):
-        if not self._audio_backend.available():
-            raise RuntimeError("Sem backend de áudio")
-        self._audio_backend.set_percent(pct)
-
     # --- Persistência ---
-    def _settings_payload(self):
-        return {
-            "mode": self.mode,
-            "volume": float(self._vol_cache),
-            "cfg": self.cfg,
-            "hard_lock_enabled": self.hard_lock_enabled,
-            "lock_on_autoadjust": self.lock_on_autoadjust,
-            "dynamic_strategy": self.dynamic_strategy,
-            "dynamic_softlock_enabled": self.dynamic_softlock_enabled,
-        }
-
     def _load_settings(self):
         try:
-            data = load_settings(self._defaults_cfg)
-            if isinstance(data.get("cfg"), dict):
-                for k, v in self._defaults_cfg.items():
-                    self.cfg[k] = data["cfg"].get(k, v)
-            self.hard_lock_enabled = bool(data.get("hard_lock_enabled", True))
-            self.lock_on_autoadjust = bool(data.get("lock_on_autoadjust", True))
-            self.dynamic_softlock_enabled = bool(data.get("dynamic_softlock_enabled", True))
-            self.dynamic_strategy = data.get("dynamic_strategy", "reserva")
-            if self.dynamic_strategy not in ("reserva", "zona_segura"):
-                self.dynamic_strategy = "reserva"
-            mode = data.get("mode")
-            if mode in ("prefixado", "dinamico"):
-                self.set_mode(mode, silent=True)
-            vol = float(data.get("volume", self.cfg["default_volume"]))
-            self._safe_set_slider(vol)
-            self.vol_label.configure(text=f"{round_pct_ui(vol)}%")
-            self._vol_cache = vol
-        except Exception as e:
-            print("Falha ao carregar settings:", e)
+            super()._load_settings()
         finally:
             self._refresh_profile_label()
             self.gauge.set_bounds(self.cfg["min_db"], self.cfg["max_db"])
 
     def _save_settings(self):
-        try:
-            save_settings(self._settings_payload())
-        except Exception as e:
-            print("Falha ao salvar settings:", e)
-
-    # --- Bloqueio ---
-    def _lock_volume(self, target_pct: float, reason: str = ""):
-        self.locked = True
-        self.lock_target_pct = max(self.cfg["min_enforced_volume"], float(target_pct))
-        self.lock_reason = reason
-        self.vol_slider.configure(state="disabled")
-        self.btn_dinamico.configure(state="disabled")
-        self.btn_prefixado.configure(state="disabled")
-        self.pause_btn.configure(state="disabled")
-        self._safe_set_slider(self.lock_target_pct)
-        self._apply_system_volume_from_slider(show_install_hint=True)
-        self.general_status.config(text=f"Status: bloqueado ({reason})", fg=DISCORD_ERROR)
-        self._start_lock_enforcer()
-
-    def _unlock_volume(self):
-        self.locked = False
-        self.lock_target_pct = None
-        self.lock_reason = ""
-        self._stop_lock_enforcer()
-        self.vol_slider.configure(state="normal")
-        self.btn_dinamico.configure(state="normal")
-        self.btn_prefixado.configure(state="normal")
-        self.pause_btn.configure(state="normal")
-        self.general_status.config(text="Status: normal", fg="#bbb")
-
-    def _start_lock_enforcer(self):
-        if self._lock_enforcer and self._lock_enforcer.is_alive():
+        if self._client is not None:
+            self._remote("configure", settings=self._settings_payload())
             return
-        self._lock_enforcer_stop.clear()
-        self._lock_enforcer = VolumeEnforcer(
-            self._audio_backend,
-            target_fn=lambda: self.lock_target_pct if self.lock_target_pct is not None else self._vol_cache,
-            stop_event=self._lock_enforcer_stop,
-            interval=0.07,
-        )
-        self._lock_enforcer.start()
+        super()._save_settings()
 
-    def _stop_lock_enforcer(self):
-        self._lock_enforcer_stop.set()
+    # --- Bloqueio ---
+    def _set_controls_locked(self, locked):
+        state = "disabled" if locked else "normal"
+        self.vol_slider.configure(state=state)
+        self.btn_dinamico.configure(state=state)
+        self.btn_prefixado.configure(state=state)
+        self.pause_btn.configure(state=state)
 
     # --- Modo ---
     def set_mode(self, mode, silent=False):
-        if mode not in ("prefixado", "dinamico"):
-            return
-        self.mode = mode
-        self.time_at_current_level = 0.0
-        self._last_L_for_timer = None
-        self._last_vol_key = None
-        self.dynamic_limiting_active = False
-        self.dynamic_decay_active = False
-        self.last_dynamic_adjust_ts = 0.0
-        self.dynamic_ceiling_pct = None
-        self._dynamic_upper_ok_since = None
+        if self._client is not None:
+            self._remote("set_mode", mode=mode, silent=silent)
+            return False
+        if not super().set_mode(mode, silent):
+            return False
+        self._show_mode(mode)
+        return True
+
+    def _show_mode(self, mode):
         def set_btn_colors(p="#444", d="#444"):
             self.btn_prefixado.configure(fg_color=p)
             self.btn_dinamico.configure(fg_color=d)
@@ -284,150 +246,195 @@ class SoundMonitorApp(ctk.CTk):
         else:
             set_btn_colors(d=DISCORD_ACCENT)
             self.mode_info.configure(text="Dinâmico (Reserva/Zona Segura): reduz suavemente até manter folga ou entrar no verde.")
-        if not silent:
-            self.general_status.config(text="Status: normal", fg="#bbb")
         self._refresh_profile_label()
 
     # --- Slider ---
     def on_vol_slider_change(self, value):
-        if self.locked:
-            self._safe_set_slider(self.lock_target_pct)
-            self._apply_system_volume_from_slider(show_install_hint=False)
-            return
-        if getattr(self, "_slider_updating", False):
-            return
-        v = self._quantize_pct(float(value))
-        if self.dynamic_decay_active and v > self._vol_cache + 0.01:
-            self._safe_set_slider(self._vol_cache)
+        if self._slider_updating:
             return
-        if self.dynamic_softlock_enabled and self.dynamic_ceiling_pct is not None and v > self.dynamic_ceiling_pct + 0.01:
-            self._safe_set_slider(self.dynamic_ceiling_pct)
-            self._apply_system_volume_from_slider(show_install_hint=False)
+        if self._client is not None:
+            self._render.invalidate("slider")
+            self._remote("set_volume", value=float(value))
             return
-        if self.mode == "prefixado":
-            cap = self._calc_prefix_volume_cap_pct(self.session_dose)
-            if cap is not None and v > cap + 0.1:
-                safe_v = max(self.cfg["min_enforced_volume"], cap)
-                self._safe_set_slider(safe_v)
-                self._vol_cache = safe_v
-                self._apply_system_volume_from_slider(show_install_hint=True)
-                self.general_status.config(text="Status: ajustado p/ seguro", fg="#F0B232")
-                if self.hard_lock_enabled and self.lock_on_autoadjust:
-                    self._lock_volume(safe_v, reason="ajuste de segurança")
-                self.vol_label.configure(text=f"{round_pct_ui(safe_v)}%")
-                return
-        self._vol_cache = v
-        self.vol_label.configure(text=f"{round_pct_ui(v)}%")
-        self._apply_system_volume_from_slider(show_install_hint=True)
+        if not self.engine.locked:
+            self._render.invalidate("slider")  # usuário moveu o widget diretamente
+        self.set_volume(value, show_install_hint=True)
 
     # --- Ações UI ---
     def _toggle_pause(self):
-        self.paused = not self.paused
-        if self.paused:
-            self.general_status.config(text="Status: pausado", fg="#F0B232")
-            self.pause_btn.configure(text="Retomar")
-        else:
-            self.general_status.config(text="Status: normal", fg="#bbb")
-            self.pause_btn.configure(text="Pausar")
+        if self._client is not None:
+            self._remote("pause", paused=not self.engine.paused)
+            return
+        self.set_paused(not self.engine.paused)
+        self.pause_btn.configure(text="Retomar" if self.engine.paused else "Pausar")
 
     def reset_session(self):
-        self.session_dose = 0.0
-        self.prev_session_dose = 0.0
-        self.alert_50_fired = False
-        self.alert_100_fired = False
-        self.time_at_current_level = 0.0
-        self.session_start_ts = time.time()
-        self.history = []
-        self.chart_points = []
-        self._last_hist_log = 0.0
-        self._last_chart_draw = 0.0
-        self._last_update = time.time()
-        self._last_L_for_timer = None
-        self._last_vol_key = None
-        self.dynamic_limiting_active = False
-        self.dynamic_decay_active = False
-        self.last_dynamic_adjust_ts = 0.0
-        self.dynamic_ceiling_pct = None
-        self._dynamic_upper_ok_since = None
-        self.general_status.config(text="Status: normal", fg="#bbb")
-        self._on_ui(lambda: self.remaining_label.config(text="Tempo restante (neste volume) até 100%: --:--:--"))
-        self._unlock_volume()
+        if self._client is not None:
+            self._remote("reset_session")
+        else:
+            super().reset_session()
         messagebox.showinfo("Sessão reiniciada", "Dose e histórico foram resetados.")
 
+    # --- Anexada a um daemon ---
+    def _attach(self, client):
+        snap = client.call("subscribe")
+        self._apply_remote_state(snap["state"])
+        for slot, value in snap["slots"].items():
+            self._ui_set(slot, value)
+        for row in snap["rows"]:
+            _record_sample(self, tuple(row), None, None)
+        self.title(self.title() + " (daemon)")
+        start_attach_thread(self, client)
+
+    def _remote(self, cmd, **args):
+        try:
+            self._client.send(cmd, **args)
+        except DaemonError as e:
+            print("Daemon:", e)
+
+    def _apply_remote_state(self, st):
+        """Espelha o estado publicado pelo daemon no motor local e nos controles."""
+        settings = st["settings"]
+        for k, v in self._defaults_cfg.items():
+            self.cfg[k] = settings["cfg"].get(k, v)
+        eng = self.engine
+        eng.cfg_changed()
+        eng.hard_lock_enabled = bool(settings.get("hard_lock_enabled", True))
+        eng.lock_on_autoadjust = bool(settings.get("lock_on_autoadjust", True))
+        eng.dynamic_softlock_enabled = bool(settings.get("dynamic_softlock_enabled", True))
+        eng.dynamic_strategy = settings.get("dynamic_strategy", DYNAMIC_STRATEGIES[0])
+        if eng.dynamic_strategy not in DYNAMIC_STRATEGIES:
+            eng.dynamic_strategy = DYNAMIC_STRATEGIES[0]
+        eng.set_mode(st["mode"])
+        eng.paused = bool(st["paused"])
+        if st["locked"]:
+            eng.lock(st["lock_target"], st["lock_reason"])
+        else:
+            eng.unlock()
+        self._show_mode(eng.mode)
+        self._set_controls_locked(eng.locked)
+        self.pause_btn.configure(text="Retomar" if eng.paused else "Pausar")
+        self._vol_cache = float(st["volume"])
+        self._safe_set_slider(self._vol_cache)
+        self._set_vol_label(self._vol_cache)
+        self.gauge.set_bounds(self.cfg["min_db"], self.cfg["max_db"])
+
+    def _clear_session_view(self):
+        self.history.clear()
+        self.session_stats.reset()
+        self.chart_points.clear()
+        self._last_chart_draw = 0.0
+
+    def _daemon_lost(self):
+        messagebox.showerror("Daemon encerrado", "A conexão com o daemon foi perdida; a janela será fechada.")
+        self._on_close()
+
     # --- Relatório ---
     def save_report(self):
-        if not has_openpyxl():
-            messagebox.showerror("Dependência ausente", "Para exportar Excel (.xlsx): pip install openpyxl")
+        if self._export_job is not None:
             return
-        if not self.history and not messagebox.askyesno("Sem dados", "Ainda não há histórico. Salvar mesmo assim?"):
+        # anexada, o histórico local é só a janela do gráfico: quem sabe se há dados é o daemon
+        if self._client is None and not self.history and not messagebox.askyesno("Sem dados", "Ainda não há histórico. Salvar mesmo assim?"):
             return
+        filetypes = [(label, "*" + suffix) for suffix, label, _w, available in EXPORTERS if available()]
+        if not has_openpyxl():
+            filetypes.append(("Excel (pip install openpyxl)", "*.xlsx"))
         filename = filedialog.asksaveasfilename(
-            title="Salvar relatório Excel",
-            defaultextension=".xlsx",
-            filetypes=[("Pasta de trabalho do Excel", "*.xlsx")],
-            initialfile=f"relatorio_som_{time.strftime('%Y%m%d_%H%M%S')}.xlsx"
+            title="Salvar relatório",
+            defaultextension=".xlsx" if has_openpyxl() else ".csv",
+            filetypes=filetypes,
+            initialfile=f"relatorio_som_{time.strftime('%Y%m%d_%H%M%S')}"
         )
         if not filename:
             return
         try:
-            wb = make_workbook(self.history, self.cfg)
-            wb.save(filename)
-            messagebox.showinfo("Relatório salvo", f"Relatório Excel exportado em:\n{filename}")
-        except Exception as e:
-            messagebox.showerror("Erro ao salvar", f"Ocorreu um erro ao salvar o Excel:\n{e}")
-
-    # --- Cálculo do teto (prefixado) ---
-    def _calc_prefix_volume_cap_pct(self, dose):
-        base = self.cfg["base_time_sec"]
-        ref = self.cfg["ref_db"]
-        er = float(self.cfg.get("exchange_rate_db", 3.0))
-        target = 10 * 60
-        if (1.0 - dose) * base >= target:
-            return None
-        arg = max(1e-9, ((1.0 - dose) * base) / target)
-        Lmax = ref + er * math.log(arg, 2)
-        vol_cap = db_to_percent(Lmax, self.cfg)
-        if vol_cap >= 100.0:
-            return None
-        if vol_cap <= 0.0:
-            return 0.0
-        return vol_cap
-
-    # --- SO volume sync ---
-    def _apply_system_volume_from_slider(self, show_install_hint=False):
-        if self._audio_backend.available():
-            try:
-                target = self._quantize_pct(self._vol_cache)
-                self._set_system_volume_percent(target)
-                sys_pct = self._quantize_pct(self._get_system_volume_percent())
-                if abs(sys_pct - target) > 0.5:
-                    self._vol_cache = sys_pct
-                    disp = round_pct_ui(sys_pct)
-                    self._on_ui(lambda v=sys_pct: self._safe_set_slider(v))
-                    self._on_ui(lambda t=disp: self.vol_label.configure(text=f"{t}%"))
-                return
-            except Exception:
-                pass
-        if platform.system() == "Windows" and show_install_hint and not self._audio_warned:
-            self._audio_warned = True
-            messagebox.showinfo(
-                "Controlar volume do Windows",
-                "Para o slider controlar (e travar) o volume do PC, instale: pip install pycaw comtypes"
-            )
+            _suffix, _label, _write, available = exporter_for(filename)
+        except ValueError as e:
+            messagebox.showerror("Formato não suportado", str(e))
+            return
+        if not available():
+            messagebox.showerror("Dependência ausente", "Para exportar Excel (.xlsx): pip install openpyxl")
+            return
+        if self._client is not None:
+            self._start_remote_export(os.path.abspath(filename))
+            return
+        snap = self.history.snapshot()
+        summary = self.session_stats.summary()
+        self._export_job = ReportExport(
+            snap, self.cfg, filename, summary=summary,
+            on_progress=lambda done, total: self._ui_set("export", (done, total)),
+            on_done=lambda err: self._on_ui(lambda: self._export_finished(filename, err)),
+        ).start()
+        self._open_export_progress(len(snap))
+
+    def _start_remote_export(self, filename):
+        try:
+            res = self._client.call("export", filename=filename)
+        except DaemonError as e:
+            messagebox.showerror("Erro ao salvar", f"Ocorreu um erro ao salvar o relatório:\n{e}")
+            return
+        self._export_job = _RemoteExport(self._client)
+        self._open_export_progress(res["rows"])
+
+    def _remote_export_finished(self, ev):
+        if self._export_job is None:
+            return
+        err = ev.get("error")
+        if ev.get("cancelled"):
+            err = ExportCancelled()
+        elif err is not None:
+            err = RuntimeError(err)
+        self._export_finished(ev["filename"], err)
+
+    def _open_export_progress(self, total):
+        top = ctk.CTkToplevel(self)
+        top.title("Exportando relatório")
+        top.geometry("360x140")
+        top.attributes("-topmost", True)
+        top.protocol("WM_DELETE_WINDOW", self._cancel_export)
+        ctk.CTkLabel(top, text=f"Gravando {total} linhas...").pack(pady=(16, 6))
+        top.bar = ctk.CTkProgressBar(top, width=300)
+        top.bar.set(0.0)
+        top.bar.pack(pady=6)
+        ctk.CTkButton(top, text="Cancelar", fg_color=DISCORD_ERROR, command=self._cancel_export).pack(pady=(6, 12))
+        self._export_top = top
+        self._render.invalidate("export")
+
+    def _show_export_progress(self, v):
+        done, total = v
+        top = self._export_top
+        if top is not None and top.winfo_exists():
+            top.bar.set(done / total if total else 1.0)
+
+    def _cancel_export(self):
+        if self._export_job is not None:
+            self._export_job.cancel()
+
+    def _export_finished(self, filename, err):
+        self._export_job = None
+        top, self._export_top = self._export_top, None
+        if top is not None and top.winfo_exists():
+            top.destroy()
+        if err is None:
+            messagebox.showinfo("Relatório salvo", f"Relatório exportado em:\n{filename}")
+        elif not isinstance(err, ExportCancelled):
+            messagebox.showerror("Erro ao salvar", f"Ocorreu um erro ao salvar o relatório:\n{err}")
 
     # --- Settings modal ---
     def _open_settings_modal(self):
         open_settings_modal(self)
 
+    def _open_diagnostics_panel(self):
+        open_diagnostics_panel(self)
+
     # --- Close ---
     def _on_close(self):
-        self._stop_event.set()
-        try:
-            self._save_settings()
-        except Exception:
-            pass
-        try:
-            self._stop_lock_enforcer()
-        except Exception:
-            pass
+        if self._export_job is not None:
+            self._export_job.cancel()
+        if self._client is not None:
+            # o daemon segue rodando; a janela só se desanexa
+            self._stop_event.set()
+            self._client.close()
+        else:
+            self._close_core()
         self.destroy()
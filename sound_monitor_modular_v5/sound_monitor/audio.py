@@ -1,4 +1,4 @@
-import platform, time, threading
+import os, platform, time, threading
 from ctypes import POINTER, cast
 
 try:
@@ -8,52 +8,594 @@ try:
 except Exception:
     _PYCAW_IMPORTED = False
 
+try:
+    from comtypes import COMObject  # type: ignore
+    from pycaw.pycaw import IAudioEndpointVolumeCallback, IMMNotificationClient  # type: ignore
+
+    class _EndpointVolumeCallback(COMObject):
+        """Recebe IAudioEndpointVolumeCallback::OnNotify (thread do COM) e repassa o volume em %."""
+        _com_interfaces_ = [IAudioEndpointVolumeCallback]
+
+        def __init__(self, fn):
+            super().__init__()
+            self._fn = fn
+
+        def OnNotify(self, pNotify):
+            try:
+                self._fn(float(pNotify.contents.fMasterVolume) * 100.0)
+            except Exception:
+                pass
+            return 0
+
+    class _DeviceNotificationClient(COMObject):
+        """IMMNotificationClient: só marca o backend para religar (nada de COM nesta thread)."""
+        _com_interfaces_ = [IMMNotificationClient]
+
+        def __init__(self, backend):
+            super().__init__()
+            self._backend = backend
+
+        def OnDefaultDeviceChanged(self, flow, role, device_id):
+            if flow == E_RENDER and role == E_MULTIMEDIA:
+                self._backend._device_event(device_id)
+            return 0
+
+        def OnDeviceRemoved(self, device_id):
+            if device_id == self._backend._device_id:
+                self._backend._device_event(None)
+            return 0
+
+        def OnDeviceStateChanged(self, device_id, state):
+            if device_id == self._backend._device_id and state != DEVICE_STATE_ACTIVE:
+                self._backend._device_event(None)
+            return 0
+
+        def OnDeviceAdded(self, device_id):
+            return 0
+
+        def OnPropertyValueChanged(self, device_id, key):
+            return 0
+
+    _PYCAW_CALLBACKS = True
+except Exception:
+    _PYCAW_CALLBACKS = False
+
 from .com_guard import ComGuard
 
+# Core Audio: eRender / eMultimedia (o mesmo papel de AudioUtilities.GetSpeakers)
+E_RENDER = 0
+E_MULTIMEDIA = 1
+DEVICE_STATE_ACTIVE = 1
+
 class AudioBackend:
+    """Backend PyCAW que acompanha o dispositivo de saída padrão.
+
+    Interfaces de volume ficam em cache por id de dispositivo. A troca do
+    padrão (IMMNotificationClient) ou um erro de chamada fazem religar no
+    próximo uso. Depois de uma falha, as chamadas falham na hora, sem tocar no
+    COM, até passar o backoff (0,5 s dobrando até 30 s).
+    """
+    BACKOFF_MIN = 0.5
+    BACKOFF_MAX = 30.0
+
     def __init__(self):
+        self._enum = None
+        self._endpoints = {}        # id do dispositivo -> IAudioEndpointVolume
+        self._names = {}
+        self._device_id = None
         self._audio_volume = None
+        self._stale = True
+        self._volume_fn = None
+        self._callback = None
+        self._callback_target = None
+        self._device_client = None
+        self._device_fns = []
+        self._failures = 0
+        self._retry_at = 0.0
+        self.rebinds = 0
+        self.backoffs = 0
+        self.device_changes = 0
+        self.last_error = None
         if platform.system() == "Windows" and _PYCAW_IMPORTED:
             try:
-                devices = AudioUtilities.GetSpeakers()
-                interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
-                self._audio_volume = cast(interface, POINTER(IAudioEndpointVolume))
-            except Exception:
-                self._audio_volume = None
+                self._enum = AudioUtilities.GetDeviceEnumerator()
+            except Exception as e:
+                self.last_error = str(e)
+                return
+            try:
+                self._bind()
+            except Exception as e:
+                self._fail(e)   # sem dispositivo agora; tenta de novo depois do backoff
 
     def available(self) -> bool:
-        return self._audio_volume is not None
+        return self._enum is not None
+
+    def device(self):
+        """(id, nome) do dispositivo em uso, ou None."""
+        if self._device_id is None:
+            return None
+        return self._device_id, self._names.get(self._device_id)
 
     def get_percent(self) -> float:
-        if not self.available():
-            raise RuntimeError("Sem backend de áudio")
-        scalar = self._audio_volume.GetMasterVolumeLevelScalar()
-        return float(scalar) * 100.0
+        return self._call(lambda v: float(v.GetMasterVolumeLevelScalar()) * 100.0)
 
     def set_percent(self, pct: float):
+        pct = max(0.0, min(100.0, float(pct)))
+        self._call(lambda v: v.SetMasterVolumeLevelScalar(pct / 100.0, None))
+
+    def watch(self, fn) -> bool:
+        """Registra `fn(pct)` nas notificações de volume do endpoint; False se não houver suporte."""
+        if not (self.available() and _PYCAW_CALLBACKS):
+            return False
+        self._volume_fn = fn
+        if self._audio_volume is not None:
+            self._move_callback(self._audio_volume)
+        return True
+
+    def unwatch(self):
+        self._volume_fn = None
+        self._move_callback(None)
+        client, self._device_client = self._device_client, None
+        if client is not None:
+            try:
+                self._enum.UnregisterEndpointNotificationCallback(client)
+            except Exception:
+                pass
+
+    def watch_devices(self, fn) -> bool:
+        """Registra `fn(id ou None)` para troca/perda do dispositivo padrão."""
+        if not (self.available() and _PYCAW_CALLBACKS):
+            return False
+        if self._device_client is None:
+            try:
+                client = _DeviceNotificationClient(self)
+                self._enum.RegisterEndpointNotificationCallback(client)
+                self._device_client = client
+            except Exception:
+                return False
+        self._device_fns.append(fn)
+        return True
+
+    def stats(self):
+        dev = self.device()
+        return {
+            "device_id": dev[0] if dev else None, "device_name": dev[1] if dev else None,
+            "cached_endpoints": len(self._endpoints), "rebinds": self.rebinds,
+            "device_changes": self.device_changes, "backoffs": self.backoffs,
+            "retry_in_s": max(0.0, self._retry_at - time.monotonic()), "last_error": self.last_error,
+        }
+
+    def _call(self, op):
         if not self.available():
             raise RuntimeError("Sem backend de áudio")
+        if time.monotonic() < self._retry_at:
+            raise RuntimeError("dispositivo de áudio indisponível (aguardando nova tentativa)")
+        try:
+            if self._stale or self._audio_volume is None:
+                self._bind()
+            result = op(self._audio_volume)
+        except Exception as e:
+            self._fail(e)
+            raise
+        self._failures = 0
+        return result
+
+    def _fail(self, err):
+        self.last_error = str(err)
+        self._failures += 1
+        self._stale = True
+        self._endpoints.pop(self._device_id, None)   # interface provavelmente morta
+        delay = min(self.BACKOFF_MAX, self.BACKOFF_MIN * 2 ** (self._failures - 1))
+        self._retry_at = time.monotonic() + delay
+        self.backoffs += 1
+
+    def _bind(self):
+        dev = self._enum.GetDefaultAudioEndpoint(E_RENDER, E_MULTIMEDIA)
+        dev_id = dev.GetId()
+        vol = self._endpoints.get(dev_id)
+        if vol is None:
+            iface = dev.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
+            vol = cast(iface, POINTER(IAudioEndpointVolume))
+            self._endpoints[dev_id] = vol
+        if dev_id not in self._names:
+            try:
+                self._names[dev_id] = AudioUtilities.CreateDevice(dev).FriendlyName
+            except Exception:
+                self._names[dev_id] = None
+        if self._volume_fn is not None:
+            self._move_callback(vol)
+        self._audio_volume = vol
+        self._device_id = dev_id
+        self._stale = False
+        self.rebinds += 1
+
+    def _move_callback(self, vol):
+        """Mantém o callback de volume registrado só no endpoint em uso."""
+        old = self._callback_target
+        if old is vol and (vol is None or self._callback is not None):
+            return
+        if old is not None and self._callback is not None:
+            try:
+                old.UnregisterControlChangeNotify(self._callback)
+            except Exception:
+                pass
+        self._callback = self._callback_target = None
+        if vol is not None and self._volume_fn is not None:
+            try:
+                cb = _EndpointVolumeCallback(self._volume_fn)
+                vol.RegisterControlChangeNotify(cb)
+                self._callback, self._callback_target = cb, vol
+            except Exception:
+                pass
+
+    def _device_event(self, device_id):
+        # thread de notificação do COM: só marca; quem religa é a próxima chamada
+        self._stale = True
+        self._failures = 0
+        self._retry_at = 0.0
+        self.device_changes += 1
+        for fn in list(self._device_fns):
+            try:
+                fn(device_id)
+            except Exception:
+                pass
+
+# --- Backends plugáveis ---
+# Interface: available(), get_percent(), set_percent(pct); opcionais watch(fn)/unwatch()
+BACKENDS = {}
+DEFAULT_BACKEND = "pycaw"
+
+def register_backend(name, factory):
+    """`factory(options)` devolve um backend; `options` é o texto após ':' na especificação."""
+    BACKENDS[name] = factory
+
+def _sim_backend(options):
+    from .simaudio import SimulatedEndpoint, parse_spec
+    return SimulatedEndpoint(**parse_spec(options))
+
+register_backend("pycaw", lambda options: AudioBackend())
+register_backend("sim", _sim_backend)
+
+def make_backend(spec=None):
+    """Backend por especificação ('sim:latency=0.004,jitter=0.002'); padrão: TSM_AUDIO ou pycaw."""
+    if spec is None:
+        spec = os.environ.get("TSM_AUDIO", "") or DEFAULT_BACKEND
+    name, _, options = spec.partition(":")
+    factory = BACKENDS.get(name.strip())
+    if factory is None:
+        raise ValueError(f"backend de áudio desconhecido: {name} (use um de {', '.join(BACKENDS)})")
+    return factory(options)
+
+# Prioridades de intenção de volume (maior vence)
+PRIO_USER = 0       # pedido pontual (slider, ajuste do motor)
+PRIO_CEILING = 1    # teto persistente do modo dinâmico
+PRIO_LOCK = 2       # alvo persistente do bloqueio
+
+class AudioActor:
+    """Dono único do backend: uma thread faz todas as chamadas COM.
+
+    Os demais só registram intenções com `request`: o bloqueio fixa o volume,
+    o teto limita por cima e o pedido do usuário vale se nenhum dos dois
+    impede. Escritas iguais ao último valor conhecido são descartadas e toda
+    escrita atualiza o cache (sem ler de volta). Leituras (`refresh` ou a cada
+    `poll_interval`) corrigem desvios do bloqueio/teto e avisam os assinantes
+    quando o volume mudou por fora. Se o backend tiver `watch(fn)`, cada
+    notificação de mudança vale como uma leitura e o polling cai para
+    `verify_interval`. Com `watch_devices(fn)`, a troca do dispositivo
+    padrão descarta o cache e força uma leitura (que religa no backend) e a
+    reaplicação do bloqueio; `device` guarda o (id, nome) em uso.
+    """
+    def __init__(self, backend, tolerance=0.5, poll_interval=None, verify_interval=30.0):
+        self.backend = backend
+        self.tolerance = float(tolerance)
+        self.poll_interval = poll_interval
+        self.verify_interval = float(verify_interval)
+        self.notifications = False     # backend entrega notificações de mudança
+        self.device = None             # (id, nome) do dispositivo, se o backend souber
+        self._cond = threading.Condition()
+        self._notified = None
+        self._device_changed = False
+        self._user = None
+        self._lock_target = None
+        self._ceiling = None
+        self._dirty = False
+        self._read_req = False
+        self._reads_started = 0
+        self._reads_done = 0
+        self._cached = None
+        self._read_at = 0.0          # monotonic da última leitura/notificação
+        self._subscribers = []
+        self._device_subscribers = []
+        self._stop = False
+        self._thread = None
+        self.gets = 0
+        self.sets = 0
+        self.skipped = 0        # escritas descartadas (já no valor)
+        self.corrections = 0    # escritas que desfizeram um desvio do bloqueio/teto
+        self.published = 0
+        self.notified = 0
+        self.device_changes = 0
+        self.errors = 0
+        self.last_error = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="audio", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def available(self) -> bool:
+        return self.backend.available()
+
+    def device_label(self):
+        """Nome (ou id) do dispositivo em uso, para atribuir dose por saída."""
+        dev = self.device
+        return (dev[1] or dev[0]) if dev else None
+
+    @property
+    def cached(self):
+        """Último volume conhecido (lido ou escrito), ou None."""
+        return self._cached
+
+    def subscribe(self, fn):
+        """`fn(pct)` roda na thread do ator quando uma leitura difere do valor conhecido."""
+        self._subscribers.append(fn)
+
+    def subscribe_devices(self, fn):
+        """`fn((id, nome))` roda na thread do ator depois que ela religou num dispositivo novo."""
+        self._device_subscribers.append(fn)
+
+    def request(self, pct, priority=PRIO_USER):
         pct = max(0.0, min(100.0, float(pct)))
-        self._audio_volume.SetMasterVolumeLevelScalar(pct / 100.0, None)
+        with self._cond:
+            if priority == PRIO_LOCK:
+                self._lock_target = pct
+            elif priority == PRIO_CEILING:
+                self._ceiling = pct
+            else:
+                self._user = pct
+            self._dirty = True
+            self._cond.notify()
+
+    def release(self, priority):
+        """Remove a intenção persistente (bloqueio ou teto)."""
+        with self._cond:
+            if priority == PRIO_LOCK:
+                self._lock_target = None
+            elif priority == PRIO_CEILING:
+                self._ceiling = None
+
+    def set_ceiling(self, pct):
+        """Teto dinâmico (None remove); só acorda o ator se o valor mudou."""
+        if pct is None:
+            if self._ceiling is not None:
+                self.release(PRIO_CEILING)
+        elif self._ceiling is None or abs(self._ceiling - pct) > 1e-9:
+            self.request(pct, PRIO_CEILING)
+
+    def set_poll_interval(self, sec):
+        if sec != self.poll_interval:
+            with self._cond:
+                self.poll_interval = sec
+                self._cond.notify()
+
+    def refresh(self, wait=False, timeout=1.0, max_age=0.0):
+        """Pede uma leitura; com `wait`, espera por ela e devolve o valor (ou None).
+
+        Se o valor conhecido veio de uma leitura há menos de `max_age` s, não lê de novo.
+        """
+        if not self.available():
+            return None
+        with self._cond:
+            if max_age and self._cached is not None and time.monotonic() - self._read_at < max_age:
+                return self._cached
+            want = self._reads_started + 1
+            self._read_req = True
+            self._cond.notify()
+            if wait:
+                self._cond.wait_for(lambda: self._reads_done >= want or self._stop, timeout)
+            return self._cached
+
+    def stats(self):
+        return {
+            "gets": self.gets, "sets": self.sets, "skipped": self.skipped,
+            "corrections": self.corrections, "published": self.published, "notified": self.notified,
+            "errors": self.errors, "last_error": self.last_error, "notifications": self.notifications,
+            "device": self.device_label(), "device_changes": self.device_changes,
+            "cached": self._cached, "lock": self._lock_target, "ceiling": self._ceiling,
+        }
+
+    def _on_change(self, pct):
+        """Notificação do backend (qualquer thread): só entrega o valor ao ator."""
+        with self._cond:
+            self._notified = float(pct)
+            self.notified += 1
+            self._cond.notify()
+
+    def _on_device(self, device_id):
+        """Troca/perda do dispositivo padrão (qualquer thread)."""
+        with self._cond:
+            self._device_changed = True
+            self._cond.notify()
+
+    def _poll_every(self):
+        if self.poll_interval is None or not self.available():
+            return None
+        if self.notifications:
+            return max(self.poll_interval, self.verify_interval)
+        return self.poll_interval
+
+    def _run(self):
+        next_poll = time.monotonic()
+        with ComGuard():
+            watch = getattr(self.backend, "watch", None)
+            self.notifications = bool(watch is not None and self.available() and watch(self._on_change))
+            watch_devices = getattr(self.backend, "watch_devices", None)
+            if watch_devices is not None and self.available():
+                watch_devices(self._on_device)
+            try:
+                self._loop(next_poll)
+            finally:
+                if self.notifications:
+                    self.backend.unwatch()
+
+    def _loop(self, next_poll):
+        while True:
+            with self._cond:
+                while True:
+                    if self._stop:
+                        return
+                    every = self._poll_every()
+                    timeout = None if every is None else next_poll - time.monotonic()
+                    poll_due = timeout is not None and timeout <= 0
+                    if self._dirty or self._read_req or poll_due or self._notified is not None or self._device_changed:
+                        break
+                    self._cond.wait(timeout)
+                dev_changed, self._device_changed = self._device_changed, False
+                do_read = self._read_req or poll_due or dev_changed
+                if do_read:
+                    self._reads_started += 1
+                    read_id = self._reads_started
+                notified, self._notified = self._notified, None
+                user, self._user = self._user, None
+                lock, ceiling = self._lock_target, self._ceiling
+                self._dirty = self._read_req = False
+            changed = None
+            if dev_changed:
+                # outro dispositivo: o valor conhecido não vale mais
+                self._cached = None
+                self.device_changes += 1
+            if self.available():
+                if do_read:
+                    changed = self._read()
+                    next_poll = time.monotonic() + (self._poll_every() or 0.0)
+                elif notified is not None:
+                    changed = self._observe(notified)
+                self._enforce(user, lock, ceiling, do_read or notified is not None)
+            if do_read:
+                with self._cond:
+                    self._reads_done = read_id
+                    self._cond.notify_all()
+            if changed is not None:
+                self._publish(changed)
+            if dev_changed:
+                for fn in list(self._device_subscribers):
+                    try:
+                        fn(self.device)
+                    except Exception:
+                        pass
+
+    def _read(self):
+        """Lê o volume; devolve o valor se mudou por fora do que o ator sabia."""
+        try:
+            pct = float(self.backend.get_percent())
+        except Exception as e:
+            self.errors += 1
+            self.last_error = str(e)
+            self._cached = None
+            return None
+        self.gets += 1
+        device = getattr(self.backend, "device", None)
+        if device is not None:
+            self.device = device()
+        return self._observe(pct)
+
+    def _observe(self, pct):
+        self._read_at = time.monotonic()
+        prev, self._cached = self._cached, pct
+        if prev is None or abs(pct - prev) > self.tolerance:
+            return pct
+        return None
+
+    def _enforce(self, user, lock, ceiling, after_read):
+        tol = self.tolerance
+        if lock is not None:
+            self._write(lock, tol, after_read)
+        elif user is not None:
+            self._write(user if ceiling is None else min(user, ceiling), 0.01, False)
+        elif ceiling is not None and self._cached is not None and self._cached > ceiling + tol:
+            self._write(ceiling, tol, after_read)
+
+    def _write(self, target, tol, corrective):
+        cur = self._cached
+        if cur is not None and abs(cur - target) <= tol:
+            if not corrective:
+                self.skipped += 1
+            return
+        try:
+            self.backend.set_percent(target)
+        except Exception as e:
+            self.errors += 1
+            self.last_error = str(e)
+            self._cached = None
+            return
+        self.sets += 1
+        if corrective:
+            self.corrections += 1
+        self._cached = target
+
+    def _publish(self, pct):
+        self.published += 1
+        for fn in list(self._subscribers):
+            try:
+                fn(pct)
+            except Exception as e:
+                print("Erro ao notificar volume do sistema:", e)
 
 class VolumeEnforcer(threading.Thread):
-    """Mantém o volume travado em um alvo retornado por uma função (target_fn)."""
-    def __init__(self, backend: AudioBackend, target_fn, stop_event: threading.Event, interval=0.07):
+    """Enquanto o bloqueio durar, mantém a intenção no ator e pede verificações.
+
+    Com notificações do backend o ator já corrige cada mudança assim que ela
+    acontece; aqui sobra só uma verificação a cada `verify_interval`. Sem
+    notificações, verifica a cada `poll_interval`.
+    """
+    def __init__(self, audio: AudioActor, target_fn, stop_event: threading.Event,
+                 poll_interval=0.5, verify_interval=10.0, diag=None):
         super().__init__(daemon=True)
-        self.backend = backend
+        self.audio = audio
         self.target_fn = target_fn
         self.stop_event = stop_event
-        self.interval = interval
+        self.poll_interval = poll_interval
+        self.verify_interval = verify_interval
+        self.diag = diag
+        self.checks = 0
+        self.corrections = 0
 
     def run(self):
-        with ComGuard():
-            while not self.stop_event.is_set():
-                try:
-                    if self.backend.available():
-                        target = float(self.target_fn())
-                        current = self.backend.get_percent()
-                        if abs(current - target) > 0.5:
-                            self.backend.set_percent(target)
-                except Exception:
-                    pass
-                time.sleep(self.interval)
+        d = self.diag
+        last = None
+        while not self.stop_event.is_set():
+            try:
+                if self.audio.available():
+                    target = self.target_fn()
+                    # sem alvo (ou parado enquanto calculava) o bloqueio já foi liberado
+                    if target is None or self.stop_event.is_set():
+                        break
+                    target = float(target)
+                    if target != last:
+                        self.audio.request(target, PRIO_LOCK)
+                        last = target
+                        if self.stop_event.is_set():
+                            # o host liberou entre a checagem e o pedido: desfaz
+                            self.audio.release(PRIO_LOCK)
+                            break
+                    before = self.audio.corrections
+                    # uma leitura recente do próprio ator (polling da UI) já serve de verificação
+                    self.audio.refresh(wait=True, max_age=1.5 * self.poll_interval)
+                    self.checks += 1
+                    if self.audio.corrections > before:
+                        self.corrections += 1
+                        if d is not None:
+                            d.count("enforcer.corrections")
+            except Exception:
+                if d is not None:
+                    d.count("enforcer.errors")
+            self.stop_event.wait(self.verify_interval if self.audio.notifications else self.poll_interval)
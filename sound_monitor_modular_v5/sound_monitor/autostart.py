@@ -0,0 +1,74 @@
+# Início automático do daemon no login do usuário (sem privilégios de admin).
+# Windows: valor na chave HKCU\...\Run; Linux/BSD: arquivo XDG em
+# ~/.config/autostart. O comando roda a partir da pasta que contém o pacote,
+# como `python -m sound_monitor.daemon` feito à mão.
+import os, platform, sys
+from pathlib import Path
+
+APP_ID = "tcc-sound-monitor-daemon"
+RUN_KEY = r"Software\Microsoft\Windows\CurrentVersion\Run"
+RUN_VALUE = "TCCSoundMonitorDaemon"
+
+def _root():
+    """Pasta que contém o pacote `sound_monitor`."""
+    return Path(__file__).resolve().parent.parent
+
+def _python(windowless):
+    exe = Path(sys.executable)
+    if windowless and exe.name.lower() == "python.exe":
+        # pythonw não abre console no login
+        w = exe.with_name("pythonw.exe")
+        if w.exists():
+            return w
+    return exe
+
+def desktop_path():
+    base = os.environ.get("XDG_CONFIG_HOME") or str(Path.home() / ".config")
+    return Path(base) / "autostart" / f"{APP_ID}.desktop"
+
+def windows_command():
+    # a chave Run não tem pasta de trabalho: o caminho do pacote vai no próprio comando
+    code = f"import sys; sys.path.insert(0, r'{_root()}'); from sound_monitor.daemon import main; sys.exit(main())"
+    return f'"{_python(True)}" -c "{code}"'
+
+def desktop_entry():
+    return "\n".join((
+        "[Desktop Entry]",
+        "Type=Application",
+        "Name=Monitor de Exposição Sonora (daemon)",
+        f'Exec="{_python(False)}" -m sound_monitor.daemon',
+        f"Path={_root()}",
+        "Terminal=false",
+        "X-GNOME-Autostart-enabled=true",
+        "",
+    ))
+
+def install():
+    """Registra o daemon para iniciar no login; devolve onde ficou registrado."""
+    if platform.system() == "Windows":
+        import winreg
+        with winreg.OpenKey(winreg.HKEY_CURRENT_USER, RUN_KEY, 0, winreg.KEY_SET_VALUE) as key:
+            winreg.SetValueEx(key, RUN_VALUE, 0, winreg.REG_SZ, windows_command())
+        return rf"HKCU\{RUN_KEY}\{RUN_VALUE}"
+    if platform.system() == "Darwin":
+        raise RuntimeError("início automático não suportado no macOS; use um LaunchAgent")
+    path = desktop_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(desktop_entry(), encoding="utf-8")
+    return str(path)
+
+def uninstall():
+    """Remove o registro; devolve False se não havia nenhum."""
+    if platform.system() == "Windows":
+        import winreg
+        try:
+            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, RUN_KEY, 0, winreg.KEY_SET_VALUE) as key:
+                winreg.DeleteValue(key, RUN_VALUE)
+        except FileNotFoundError:
+            return False
+        return True
+    try:
+        desktop_path().unlink()
+    except FileNotFoundError:
+        return False
+    return True
@@ -0,0 +1,511 @@
+import argparse, gc, json, os, platform, random, shutil, statistics, sys, tempfile, threading, time, tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from .engine import DoseEngine
+from .history import HistoryStore
+from .ringbuf import TimeWindowRing
+from .stats import SessionStats
+from .charting import HistoryChart
+from .render import RenderModel
+from .reporting import compute_summary_stats, export_report, has_openpyxl
+from .replay import DEFAULT_CFG
+from .diagnostics import Diagnostics
+from .audio import AudioActor, VolumeEnforcer, PRIO_LOCK
+from .simaudio import SimulatedEndpoint
+from .sessions import SessionIndex
+from .metering import LevelMeter, SyntheticSource, has_numpy as has_numpy_meter
+
+SIZES = (10_000, 50_000, 500_000)
+XLSX_MAX_ROWS = 50_000   # acima disso o xlsx só roda com --full (minutos em openpyxl puro)
+XLSX_QUICK_ROWS = 10_000 # limite do xlsx com --quick
+
+class StubCanvas:
+    """Canvas falso: aceita a API usada pelo HistoryChart e só conta itens/chamadas."""
+    def __init__(self, width=760, height=120):
+        self._w, self._h = width, height
+        self._next = 0
+        self.items = {}
+        self.calls = 0
+
+    def _new(self, kind, tags=None):
+        self._next += 1
+        self.items[self._next] = (kind, tags)
+        self.calls += 1
+        return self._next
+
+    def create_line(self, *coords, **kw):
+        return self._new("line", kw.get("tags"))
+
+    def create_text(self, *coords, **kw):
+        return self._new("text", kw.get("tags"))
+
+    def coords(self, item, *coords):
+        self.calls += 1
+
+    def itemconfigure(self, item, **kw):
+        self.calls += 1
+
+    def delete(self, tag):
+        self.calls += 1
+        for k in [k for k, (_kind, t) in self.items.items() if t == tag]:
+            del self.items[k]
+
+    def tag_lower(self, tag):
+        self.calls += 1
+
+    def bind(self, *a, **kw):
+        pass
+
+    def after(self, ms, func):
+        return None
+
+    def after_cancel(self, job):
+        pass
+
+    def winfo_width(self):
+        return self._w
+
+    def winfo_height(self):
+        return self._h
+
+    def cget(self, key):
+        return {"width": self._w, "height": self._h}[key]
+
+def _sample(i, t0=1.7e9):
+    L = 60.0 + (i % 300) / 10.0
+    return (t0 + i, float(i), "dinamico", 50.0, L, min(1.0, i / 86400.0), "ATENÇÃO", 0.1)
+
+def _history(n):
+    return HistoryStore.from_samples(_sample(i) for i in range(n))
+
+def measure(fn, repeat, warmup=1, setup=None):
+    """Latência por chamada (ns) e alocações (tracemalloc) de `fn`.
+
+    `setup()` (opcional) roda antes de cada chamada, fora da medição, e o
+    retorno é passado para `fn`.
+    """
+    for _ in range(warmup):
+        fn(setup()) if setup else fn()
+    times = []
+    gc_was = gc.isenabled(); gc.disable()
+    try:
+        for _ in range(repeat):
+            arg = setup() if setup else None
+            t = time.perf_counter_ns()
+            fn(arg) if setup else fn()
+            times.append(time.perf_counter_ns() - t)
+    finally:
+        if gc_was:
+            gc.enable()
+    # alocações numa passada separada (tracemalloc distorce o tempo)
+    k = max(1, min(repeat, 1000))
+    args = [setup() for _ in range(k)] if setup else None
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    for j in range(k):
+        fn(args[j]) if setup else fn()
+    cur, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    r = _summary(times)
+    r["alloc_peak_bytes"] = max(0, peak - base)
+    r["alloc_net_bytes_per_op"] = (cur - base) / k
+    return r
+
+def _summary(times):
+    """Percentis (us) de uma lista de tempos em ns."""
+    times = sorted(times) or [0]
+    q = lambda p: times[min(len(times) - 1, int(p * len(times)))]
+    return {
+        "n": len(times),
+        "mean_us": statistics.fmean(times) / 1e3,
+        "p50_us": q(0.50) / 1e3,
+        "p90_us": q(0.90) / 1e3,
+        "p99_us": q(0.99) / 1e3,
+        "max_us": times[-1] / 1e3,
+    }
+
+def _wait_for(cond, timeout=5.0):
+    end = time.perf_counter() + timeout
+    while not cond():
+        if time.perf_counter() > end:
+            return False
+        time.sleep(0.0005)
+    return True
+
+@contextmanager
+def _temp_data_dir():
+    """`data_dir()` apontando para uma pasta temporária durante o caso.
+
+    Trocar HOME não basta: no Windows a pasta do usuário vem de USERPROFILE e
+    o caso gravaria nos settings/checkpoint reais. Os módulos que importaram
+    `data_dir` pelo nome são trocados também.
+    """
+    from . import persistence, journal, diagnostics, daemon
+    d = Path(tempfile.mkdtemp(prefix="tsm_bench_data_"))
+    mods = (persistence, journal, diagnostics, daemon)
+    saved = [m.data_dir for m in mods]
+    for m in mods:
+        m.data_dir = lambda: d
+    try:
+        yield d
+    finally:
+        for m, fn in zip(mods, saved):
+            m.data_dir = fn
+        shutil.rmtree(d, ignore_errors=True)
+
+# --- casos ---
+def bench_engine_step(repeat):
+    eng = DoseEngine(dict(DEFAULT_CFG), now=1.7e9)
+    eng.set_mode("dinamico")
+    clock = [1.7e9]
+    def tick():
+        clock[0] += 0.2
+        eng.step(clock[0], 62.0)
+    return measure(tick, repeat)
+
+def bench_engine_step_deadline(repeat):
+    eng = DoseEngine(dict(DEFAULT_CFG), now=1.7e9)
+    clock = [1.7e9]
+    def tick():
+        clock[0] += 1.0
+        eng.step(clock[0], 62.0)
+        eng.next_deadline(clock[0])
+    return measure(tick, repeat)
+
+def bench_history_append_at_cap(repeat, cap=50_000):
+    h = _history(cap)   # já cheio: cada append descarta o mais antigo
+    i = [cap]
+    def op():
+        i[0] += 1
+        h.append_sample(_sample(i[0]))
+    return measure(op, repeat)
+
+def bench_chart_points(repeat):
+    ring = TimeWindowRing(300)
+    i = [0]
+    def op():
+        i[0] += 1
+        ring.append(float(i[0]), 70.0, 0.1)
+        ring.evict_before(i[0] - 122.0)
+    return measure(op, repeat)
+
+def bench_session_stats_add(repeat):
+    st = SessionStats()
+    i = [0]
+    def op():
+        i[0] += 1
+        st.add(_sample(i[0]))
+    return measure(op, repeat)
+
+def bench_chart_redraw(repeat, points=150):
+    canvas = StubCanvas()
+    chart = HistoryChart(canvas)
+    ring = TimeWindowRing(points + 16)
+    for i in range(points):
+        ring.append(float(i), 60.0 + i % 30, i / points)
+    cfg = dict(DEFAULT_CFG)
+    i = [points]
+    def op():
+        i[0] += 1
+        ring.append(float(i[0]), 70.0, 0.5)
+        ring.evict_before(i[0] - 122.0)
+        chart.update(ring, cfg, 120)
+    r = measure(op, repeat)
+    r["canvas_items"] = len(canvas.items)
+    return r
+
+def bench_render_model(repeat):
+    sink = {}
+    rm = RenderModel(lambda f: None)
+    for slot in ("gauge", "zone", "time", "remaining", "status"):
+        rm.register(slot, lambda v, slot=slot: sink.__setitem__(slot, v))
+    i = [0]
+    def op():
+        i[0] += 1
+        rm.set("gauge", (i[0] % 7, 0.1))
+        rm.set("time", str(i[0] // 10))
+        rm.render()
+    return measure(op, repeat)
+
+def bench_diag_phases(repeat, enabled):
+    """Custo das marcas de fase de um tick do monitor (coleta ligada/desligada)."""
+    diag = Diagnostics(enabled)
+    def op():
+        clk = diag.clock("tick.")
+        for name in ("step", "apply", "sync", "history", "summary", "deadline"):
+            clk.mark(name)
+        clk.total("total")
+    return measure(op, repeat)
+
+def bench_meter_block(repeat, channels=2, rate=48000, block_sec=0.1):
+    """Ponderação A + energia de um bloco de 100 ms; `core_fraction` = tempo / duração do áudio."""
+    src = SyntheticSource(freq=0, sample_rate=rate, channels=channels, block_sec=block_sec,
+                          realtime=False, seed=1)
+    src.open()
+    meter = LevelMeter(src)
+    blocks = [src.read() for _ in range(16)]
+    i = [0]
+    def op():
+        meter.feed(blocks[i[0] & 15])
+        i[0] += 1
+    r = measure(op, repeat)
+    r["core_fraction"] = r["mean_us"] / 1e6 / block_sec
+    return r
+
+def bench_session_shares(repeat, apps=12, idle_sec=1.0):
+    """`shares()` com `apps` sessões; `idle_calls_per_s` = chamadas COM do índice parado."""
+    src = SimulatedEndpoint().session_source()
+    keys = [src.add(f"app{i}.exe", volume=10 + 7 * i, active=i % 3 != 0) for i in range(apps)]
+    idx = SessionIndex(src).start()
+    _wait_for(lambda: idx.stats()["sessions"] == apps)
+    i = [0]
+    def op():
+        i[0] += 1
+        idx.shares()
+    r = measure(op, repeat)
+    calls = src.com_calls
+    time.sleep(idle_sec)
+    r["idle_calls_per_s"] = (src.com_calls - calls) / idle_sec
+    # criação/expiração de sessões: custo incremental por evento
+    calls = src.com_calls
+    for k in keys[:4]:
+        src.expire(k)
+    for j in range(4):
+        src.add(f"novo{j}.exe")
+    _wait_for(lambda: idx.stats()["created"] == 4 and idx.stats()["expired"] == 4)
+    r["calls_per_event"] = (src.com_calls - calls) / 8
+    idx.stop()
+    return r
+
+# --- áudio (endpoint simulado com latência de COM) ---
+def bench_audio_lock(repeat, latency, notifications, target=20.0, idle_sec=2.0):
+    """Convergência do bloqueio após mudanças externas e chamadas ao backend por correção/parado."""
+    ep = SimulatedEndpoint(50.0, notifications=notifications, latency=latency, jitter=latency / 2, seed=0)
+    audio = AudioActor(ep, poll_interval=0.5).start()
+    stop = threading.Event()
+    enf = VolumeEnforcer(audio, lambda: target, stop)
+    audio.refresh(wait=True)
+    audio.request(target, PRIO_LOCK)
+    enf.start()
+    rng = random.Random(0)
+    times = []
+    try:
+        _wait_for(lambda: ep.peek() == target)
+        time.sleep(0.05)
+        c0 = ep.call_count()
+        for _ in range(repeat):
+            ep.external_set(round(rng.uniform(30.0, 90.0)))
+            t = time.perf_counter_ns()
+            if not _wait_for(lambda: ep.peek() == target):
+                break
+            times.append(time.perf_counter_ns() - t)
+            time.sleep(0.05)
+        calls = ep.call_count() - c0
+        c1 = ep.call_count()
+        time.sleep(idle_sec)
+        idle = (ep.call_count() - c1) / idle_sec
+    finally:
+        stop.set(); enf.join(); audio.stop()
+    r = _summary(times)
+    r["calls_per_correction"] = calls / max(1, len(times))
+    r["idle_calls_per_s"] = idle
+    return r
+
+def bench_audio_slider(events, latency, every=0.005):
+    """Arraste do slider: `events` pedidos seguidos; chamadas ao backend e tempo até assentar."""
+    ep = SimulatedEndpoint(30.0, latency=latency, jitter=latency / 2, seed=0)
+    audio = AudioActor(ep).start()
+    audio.refresh(wait=True)
+    c0 = ep.call_count()
+    try:
+        for i in range(events):
+            audio.request(30.0 + (i % 60))
+            time.sleep(every)
+        last = 30.0 + ((events - 1) % 60)
+        t = time.perf_counter_ns()
+        _wait_for(lambda: ep.peek() == last)
+        settle = time.perf_counter_ns() - t
+        time.sleep(0.05)
+    finally:
+        audio.stop()
+    r = _summary([settle])
+    r["requests"] = events
+    r["backend_calls"] = ep.call_count() - c0
+    r["calls_before"] = 2 * events   # set + get por evento no caminho antigo
+    return r
+
+def bench_summary_stats(n, repeat):
+    h = _history(n)
+    return measure(lambda: compute_summary_stats(h), repeat, warmup=0)
+
+def bench_export(n, suffix, repeat):
+    h = _history(n)
+    d = tempfile.mkdtemp(prefix="tsm_bench_")
+    path = os.path.join(d, "r" + suffix)
+    def op():
+        export_report(h, DEFAULT_CFG, path)
+    r = measure(op, repeat, warmup=0)
+    r["file_bytes"] = os.path.getsize(path)
+    os.remove(path); os.rmdir(d)
+    return r
+
+def bench_settings_roundtrip(repeat):
+    from . import persistence
+    with _temp_data_dir():
+        payload = {"mode": "dinamico", "volume": 40.0, "cfg": dict(DEFAULT_CFG),
+                   "hard_lock_enabled": True, "dynamic_strategy": "reserva"}
+        def op():
+            persistence.save_settings(payload)
+            persistence.load_settings(DEFAULT_CFG)
+        return measure(op, repeat)
+
+def bench_checkpoint_roundtrip(repeat):
+    """Gravação atômica do checkpoint + leitura e restore (o que o startup paga)."""
+    from . import persistence
+    with _temp_data_dir():
+        eng = DoseEngine(dict(DEFAULT_CFG))
+        eng.step(time.time(), 60.0)
+        fresh = DoseEngine(dict(DEFAULT_CFG))
+        def op():
+            persistence.save_checkpoint(eng.checkpoint())
+            fresh.restore(persistence.load_checkpoint())
+        return measure(op, repeat)
+
+def bench_daemon_import(repeat):
+    """Processo novo importando o daemon (o custo de startup sem Tk).
+
+    `import_alloc_peak_bytes`: pico de memória Python do import, medido à
+    parte com tracemalloc no processo filho.
+    """
+    import subprocess
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    run_child = lambda code: subprocess.run([sys.executable, "-c", code], cwd=root,
+                                            capture_output=True, text=True, check=True).stdout
+    r = measure(lambda: run_child("import sound_monitor.daemon, sys; sys.exit('tkinter' in sys.modules)"), repeat)
+    r["import_alloc_peak_bytes"] = int(run_child(
+        "import tracemalloc; tracemalloc.start(); import sound_monitor.daemon; "
+        "print(tracemalloc.get_traced_memory()[1])").strip())
+    return r
+
+def bench_daemon_roundtrip(repeat):
+    """Comando set_volume do cliente até a resposta (socket + thread principal do daemon)."""
+    from .daemon import SoundMonitorDaemon, DaemonClient
+    old = {k: os.environ.get(k) for k in ("TSM_AUDIO", "TSM_METER")}
+    os.environ.update(TSM_AUDIO="sim:latency=0.0005", TSM_METER="")
+    daemon = client = None
+    try:
+        with _temp_data_dir():
+            try:
+                daemon = SoundMonitorDaemon()
+                t = threading.Thread(target=daemon.run, daemon=True)
+                t.start()
+                _wait_for(lambda: DaemonClient.connect(timeout=1.0) is not None)
+                client = DaemonClient.connect()
+                vols = [20.0, 25.0]
+                i = [0]
+                def op():
+                    i[0] ^= 1
+                    client.call("set_volume", value=vols[i[0]])
+                return measure(op, repeat)
+            finally:
+                if client is not None:
+                    client.close()
+                if daemon is not None:
+                    daemon.shutdown()
+                    t.join(5.0)
+    finally:
+        for k, v in old.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+def run(quick=False, full=False, only=None, sizes=SIZES):
+    r = 2000 if quick else 20000
+    heavy = 1 if quick else 3
+    audio_n = 5 if quick else 20
+    cases = [
+        ("engine.step", lambda: bench_engine_step(r)),
+        ("engine.step+next_deadline", lambda: bench_engine_step_deadline(r)),
+        ("history.append@50k", lambda: bench_history_append_at_cap(r)),
+        ("chart_points.append+evict", lambda: bench_chart_points(r)),
+        ("session_stats.add", lambda: bench_session_stats_add(r)),
+        ("chart.redraw(stub)", lambda: bench_chart_redraw(max(200, r // 20))),
+        ("render_model.set+render", lambda: bench_render_model(r)),
+        ("diag.tick_phases(off)", lambda: bench_diag_phases(r, False)),
+        ("diag.tick_phases(on)", lambda: bench_diag_phases(r, True)),
+        ("audio.lock(notify,2ms)", lambda: bench_audio_lock(audio_n, 0.002, True)),
+        ("audio.lock(notify,10ms)", lambda: bench_audio_lock(audio_n, 0.010, True)),
+        ("audio.lock(poll,2ms)", lambda: bench_audio_lock(audio_n, 0.002, False)),
+        ("audio.slider_drag(2ms)", lambda: bench_audio_slider(200, 0.002)),
+        ("sessions.shares(12)", lambda: bench_session_shares(max(200, r // 10))),
+        ("settings.save+load", lambda: bench_settings_roundtrip(max(50, r // 100))),
+        ("checkpoint.save+restore", lambda: bench_checkpoint_roundtrip(max(50, r // 100))),
+        ("daemon.import(cold)", lambda: bench_daemon_import(heavy + 2)),
+        ("daemon.call(set_volume)", lambda: bench_daemon_roundtrip(max(100, r // 20))),
+    ]
+    if has_numpy_meter():
+        cases.append(("meter.a_weight(48k,2ch)", lambda: bench_meter_block(max(50, r // 20))))
+    for n in sizes:
+        cases.append((f"summary_stats@{n}", lambda n=n: bench_summary_stats(n, heavy)))
+        for suffix in (".tsc", ".csv", ".csv.gz"):
+            cases.append((f"export{suffix}@{n}", lambda n=n, s=suffix: bench_export(n, s, heavy)))
+        if has_openpyxl() and (full or n <= (XLSX_QUICK_ROWS if quick else XLSX_MAX_ROWS)):
+            cases.append((f"export.xlsx@{n}", lambda n=n: bench_export(n, ".xlsx", 1)))
+    results = {}
+    for name, fn in cases:
+        if only and not any(o in name for o in only):
+            continue
+        results[name] = fn()
+        print(f"{name:<28} p50={results[name]['p50_us']:>12.1f} us  p99={results[name]['p99_us']:>12.1f} us  "
+              f"peak={results[name].get('alloc_peak_bytes', 0) / 1024:>9.1f} KiB", file=sys.stderr)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+def compare(current, baseline, key="p50_us"):
+    """Linhas (nome, base, atual, razão) para casos presentes nos dois relatórios."""
+    rows = []
+    for name, cur in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base and base.get(key):
+            rows.append((name, base[key], cur[key], cur[key] / base[key]))
+    return rows
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m sound_monitor.bench",
+                                 description="Benchmarks headless (latência por operação e alocações).")
+    ap.add_argument("--json", help="grava o relatório em JSON")
+    ap.add_argument("--compare", help="JSON de uma execução anterior para comparar (p50)")
+    ap.add_argument("--quick", action="store_true", help="menos repetições")
+    ap.add_argument("--full", action="store_true", help=f"inclui xlsx acima de {XLSX_MAX_ROWS} linhas")
+    ap.add_argument("--sizes", help="tamanhos de histórico, ex.: 10000,50000")
+    ap.add_argument("--only", action="append", help="roda só casos cujo nome contém o texto")
+    args = ap.parse_args(argv)
+    sizes = tuple(int(x) for x in args.sizes.split(",")) if args.sizes else SIZES
+    random.seed(0)
+    report = run(args.quick, args.full, args.only, sizes)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2); print()
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        for name, base, cur, ratio in compare(report, baseline):
+            flag = "  <-- regressão" if ratio > 1.2 else ""
+            print(f"{name:<28} {base:>12.1f} -> {cur:>12.1f} us  x{ratio:.2f}{flag}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,43 +1,130 @@
+from .ringbuf import TimeWindowRing
+
+PAD_L, PAD_R, PAD_T, PAD_B = 40, 10, 10, 25
+DB_COLOR = "#8FD14F"
+DOSE_COLOR = "#4FC3F7"
+
+class HistoryChart:
+    """Gráfico de histórico em modo retido: itens criados uma vez e atualizados no lugar.
+
+    Cada série é uma polilinha cujas coordenadas são substituídas; eixos, grade e
+    rótulos só são recriados quando o tamanho do canvas ou o cfg mudam.
+    """
+    def __init__(self, canvas, debounce_ms=120):
+        self.canvas = canvas
+        self.debounce_ms = debounce_ms
+        self._static_key = None
+        self._resize_job = None
+        self._last = None              # (TimeWindowRing, cfg, chart_window_sec)
+        self._visible = None           # (séries, texto vazio) atualmente visíveis
+        self._db_line = canvas.create_line(0, 0, 0, 0, fill=DB_COLOR, width=2, state="hidden")
+        self._dose_line = canvas.create_line(0, 0, 0, 0, fill=DOSE_COLOR, width=2, state="hidden")
+        self._empty_text = canvas.create_text(0, 0, text="Sem dados ainda", fill="#888",
+                                              font=("Segoe UI", 10), state="hidden")
+        canvas.bind("<Configure>", self._on_configure, add="+")
+
+    def _on_configure(self, event):
+        if self._resize_job is not None:
+            self.canvas.after_cancel(self._resize_job)
+        self._resize_job = self.canvas.after(self.debounce_ms, self._on_resized)
+
+    def _on_resized(self):
+        self._resize_job = None
+        self._static_key = None
+        if self._last is not None:
+            self.update(*self._last)
+
+    def _rebuild_static(self, w, h, cfg, chart_window_sec, span):
+        c = self.canvas
+        c.delete("static")
+        min_db = cfg["min_db"]; max_db = cfg["max_db"]
+        plot_w = w - PAD_L - PAD_R
+        plot_h = h - PAD_B - PAD_T
+        c.create_line(PAD_L, h - PAD_B, w - PAD_R, h - PAD_B, fill="#555", tags="static")
+        c.create_line(PAD_L, PAD_T, PAD_L, h - PAD_B, fill="#555", tags="static")
+        c.create_text(w - 140, PAD_T + 12, text="dB", fill=DB_COLOR, font=("Segoe UI", 10, "bold"), tags="static")
+        c.create_text(w - 90, PAD_T + 12, text="Dose%", fill=DOSE_COLOR, font=("Segoe UI", 10, "bold"), tags="static")
+        span_db = max(1e-9, max_db - min_db)
+        for Lbl in (min_db, cfg["ref_db"], max_db):
+            ratio = max(0.0, min(1.0, (Lbl - min_db) / span_db))
+            y = (h - PAD_B) - plot_h * ratio
+            c.create_line(PAD_L - 5, y, w - PAD_R, y, fill="#333", tags="static")
+            c.create_text(PAD_L - 28, y, text=f"{Lbl:.0f}", fill="#aaa", font=("Segoe UI", 9), tags="static")
+        for dt in range(0, int(min(chart_window_sec, span)) + 1, 30):
+            x = PAD_L + plot_w * (1.0 - dt / span)
+            c.create_line(x, h - PAD_B, x, PAD_T, fill="#333", tags="static")
+            c.create_text(x, h - PAD_B + 12, text=f"-{dt}s", fill="#aaa", font=("Segoe UI", 9), tags="static")
+        c.tag_lower("static")
+        c.coords(self._empty_text, w // 2, h // 2)
+
+    def _set_visible(self, series, empty):
+        if self._visible == (series, empty):
+            return
+        self._visible = (series, empty)
+        c = self.canvas
+        st = "normal" if series else "hidden"
+        c.itemconfigure(self._db_line, state=st)
+        c.itemconfigure(self._dose_line, state=st)
+        c.itemconfigure(self._empty_text, state="normal" if empty else "hidden")
+
+    def update(self, chart_points, cfg, chart_window_sec=120):
+        self._last = (chart_points, cfg, chart_window_sec)
+        c = self.canvas
+        w = int(c.winfo_width() or 760)
+        h = int(c.winfo_height() or 120)
+        if w <= 1 or h <= 1:
+            w, h = int(c.cget("width") or 760), int(c.cget("height") or 120)
+        min_db = cfg["min_db"]; max_db = cfg["max_db"]
+        window = max(1e-6, float(chart_window_sec))
+        with chart_points.lock:
+            t_now = chart_points.latest_t() if len(chart_points) else 0.0
+        # como no desenho original: no início da sessão o eixo x cobre só os dados
+        t_min = max(0.0, t_now - window)
+        span = max(1e-6, t_now - t_min)
+        key = (w, h, min_db, max_db, cfg["ref_db"], chart_window_sec, span)
+        if key != self._static_key:
+            self._rebuild_static(w, h, cfg, chart_window_sec, span)
+            self._static_key = key
+
+        if not len(chart_points):
+            self._set_visible(False, True)
+            return
+
+        x0 = PAD_L; plot_w = w - PAD_L - PAD_R; sx = plot_w / span
+        y0 = h - PAD_B; plot_h = h - PAD_B - PAD_T
+        sdb = plot_h / max(1e-9, (max_db - min_db))
+        db_xy = []; dose_xy = []
+        with chart_points.lock:
+            start = chart_points.window_start(t_min)
+            # no máximo ~1 ponto por pixel: janelas longas não custam mais para desenhar
+            stride = max(1, (len(chart_points) - start) // max(1, plot_w))
+            for ts, Ls, ds in zip(chart_points.segments("t", start),
+                                  chart_points.segments("L", start),
+                                  chart_points.segments("dose", start)):
+                for t_rel, L, dose in zip(ts[::stride], Ls[::stride], ds[::stride]):
+                    x = x0 + sx * (t_rel - t_min)
+                    y_db = y0 - min(plot_h, max(0.0, (L - min_db) * sdb))
+                    y_ds = y0 - plot_h * max(0.0, min(1.0, dose))
+                    db_xy += (x, y_db); dose_xy += (x, y_ds)
+
+        if len(db_xy) >= 4:
+            c.coords(self._db_line, db_xy)
+            c.coords(self._dose_line, dose_xy)
+            self._set_visible(True, False)
+        else:
+            self._set_visible(False, False)
+
 def draw_history_chart(canvas, chart_points, cfg, chart_window_sec=120):
-    w = int(canvas.winfo_width() or 760)
-    h = int(canvas.winfo_height() or 120)
-    pad_l, pad_r, pad_t, pad_b = 40, 10, 10, 25
-    canvas.delete("all")
-    canvas.create_line(pad_l, h - pad_b, w - pad_r, h - pad_b, fill="#555")
-    canvas.create_line(pad_l, pad_t, pad_l, h - pad_b, fill="#555")
-    if not chart_points:
-        canvas.create_text(w//2, h//2, text="Sem dados ainda", fill="#888", font=("Segoe UI", 10))
-        return
-    t_now = chart_points[-1][0]
-    t_min = max(0.0, t_now - chart_window_sec)
-    t_max = t_now
-    span = max(1e-6, t_max - t_min)
-    min_db = cfg["min_db"]; max_db = cfg["max_db"]
-    def x_map(t): return pad_l + (w - pad_l - pad_r) * ((t - t_min) / span)
-    def y_map_db(L):
-        ratio = (L - min_db) / max(1e-9, (max_db - min_db))
-        ratio = max(0.0, min(1.0, ratio))
-        return (h - pad_b) - (h - pad_b - pad_t) * ratio
-    def y_map_dose(d):
-        ratio = max(0.0, min(1.0, float(d)))
-        return (h - pad_b) - (h - pad_b - pad_t) * ratio
-    last_x_db = last_y_db = last_x_ds = last_y_ds = None
-    for (t_rel, L, dose) in chart_points:
-        if t_rel < t_min: continue
-        x = x_map(t_rel); y_db = y_map_db(L); y_ds = y_map_dose(dose)
-        if last_x_db is not None:
-            canvas.create_line(last_x_db, last_y_db, x, y_db, fill="#8FD14F", width=2)
-        last_x_db, last_y_db = x, y_db
-        if last_x_ds is not None:
-            canvas.create_line(last_x_ds, last_y_ds, x, y_ds, fill="#4FC3F7", width=2)
-        last_x_ds, last_y_ds = x, y_ds
-    canvas.create_text(w - 140, pad_t + 12, text="dB", fill="#8FD14F", font=("Segoe UI", 10, "bold"))
-    canvas.create_text(w - 90, pad_t + 12, text="Dose%", fill="#4FC3F7", font=("Segoe UI", 10, "bold"))
-    for label, Lbl in [("min", min_db), ("ref", cfg["ref_db"]), ("max", max_db)]:
-        y = y_map_db(Lbl)
-        canvas.create_line(pad_l - 5, y, w - pad_r, y, fill="#333")
-        canvas.create_text(pad_l - 28, y, text=f"{Lbl:.0f}", fill="#aaa", font=("Segoe UI", 9))
-    for dt in range(0, int(chart_window_sec) + 1, 30):
-        x = x_map(t_max - dt)
-        canvas.create_line(x, h - pad_b, x, pad_t, fill="#333")
-        canvas.create_text(x, h - pad_b + 12, text=f"-{dt}s", fill="#aaa", font=("Segoe UI", 9))
+    """Compatibilidade: desenha via o HistoryChart associado ao canvas (criado sob demanda).
+
+    `chart_points` pode ser um TimeWindowRing ou uma lista de tuplas (t, L, dose).
+    """
+    if not isinstance(chart_points, TimeWindowRing):
+        ring = TimeWindowRing(len(chart_points) or 1)
+        for p in chart_points:
+            ring.append(*p)
+        chart_points = ring
+    chart = getattr(canvas, "_history_chart", None)
+    if chart is None:
+        chart = canvas._history_chart = HistoryChart(canvas)
+    chart.update(chart_points, cfg, chart_window_sec)
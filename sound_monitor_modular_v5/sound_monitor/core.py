@@ -0,0 +1,373 @@
+# Serviços e regras do monitor sem UI (dose, modos, bloqueio, persistência).
+# A janela (app.py) e o daemon (daemon.py) são hosts: herdam MonitorCore e
+# implementam os ganchos de tela. Nada aqui importa tkinter.
+import os, platform, threading, time
+
+from .constants import DISCORD_ERROR
+from .engine import DoseEngine, DYNAMIC_STRATEGIES
+from .audio import AudioBackend, AudioActor, VolumeEnforcer, PRIO_LOCK, make_backend
+from .persistence import load_settings, save_settings, load_checkpoint, save_checkpoint
+from .scheduler import TickScheduler
+from .ringbuf import TimeWindowRing
+from .history import HistoryStore
+from .stats import SessionStats
+from .journal import SessionJournal
+from .diagnostics import diagnostics_from_env, DiagnosticsDump, TimedBackend
+from .sessions import SessionIndex, make_session_source
+
+# Config padrão (8h / 3dB)
+DEFAULT_CFG = {
+    "min_db": 40.0, "max_db": 95.0, "ref_db": 85.0,
+    "base_time_sec": 8 * 3600.0, "exchange_rate_db": 3.0,
+    "min_enforced_volume": 5.0, "default_volume": 30.0,
+}
+MAX_HISTORY = 24 * 3600   # 24h a 1 Hz
+CHART_WINDOW_SEC = 120
+
+class MonitorCore:
+    """Estado e regras do monitor; o host chama `_init_core()` e sobrescreve os ganchos.
+
+    `_init_state()` sozinho monta só o estado (motor, histórico, estatísticas),
+    sem backend de áudio, journal nem medidor: é o que a janela anexada a um
+    daemon usa para espelhar o motor dele.
+
+    Ganchos de tela (padrão: sem UI): `_ui_set`, `_on_ui`, `_alert`,
+    `_set_status`, `_safe_set_slider`, `_set_vol_label`, `_set_controls_locked`
+    e `_on_sample`. O monitor (monitor.py) só conversa com o host por eles.
+    """
+
+    def _init_core(self, visible=False):
+        dump_every = self._init_state(visible)
+        self._diag_dump = DiagnosticsDump(self.diag, interval=dump_every).start() if dump_every else None
+        self.journal = SessionJournal().start()
+
+        # Volume do sistema: só a thread do AudioActor fala com o backend (TSM_AUDIO=sim:... no Linux)
+        try:
+            backend = make_backend()
+        except ValueError as e:
+            print("Backend de áudio:", e)
+            backend = AudioBackend()
+        self._audio_backend = TimedBackend(backend, self.diag)
+        self._audio = AudioActor(self._audio_backend).start()
+
+        # Sessões por aplicativo: enumera uma vez e segue as notificações do Core Audio
+        self._sessions = SessionIndex(make_session_source(backend))
+        if self._sessions.available():
+            self._sessions.start()
+            self._audio.subscribe_devices(lambda _dev: self._sessions.rebind())
+        else:
+            self._sessions = None
+
+        # Nível medido na saída (TSM_METER=loopback); metering puxa numpy, então só importa se pedido
+        meter_spec = os.environ.get("TSM_METER", "").strip()
+        if meter_spec and meter_spec != "off":
+            from .metering import make_meter
+            try:
+                self._meter = make_meter(meter_spec, diag=self.diag)
+            except (ValueError, RuntimeError) as e:
+                print("Medição de nível:", e)
+        if self._meter is not None:
+            self._meter.start()
+
+    def _init_state(self, visible=False):
+        """Estado sem serviços; devolve o intervalo do dump de diagnóstico (ou None)."""
+        self._defaults_cfg = dict(DEFAULT_CFG)
+        self.cfg = dict(self._defaults_cfg)
+
+        # Instrumentação (TSM_DIAG=1)
+        self.diag, dump_every = diagnostics_from_env()
+        self._diag_dump = None
+
+        self.engine = DoseEngine(self.cfg)
+        self._stop_event = threading.Event()
+        self._scheduler = TickScheduler()
+        self._ui_visible = visible
+
+        self.MAX_HISTORY = MAX_HISTORY
+        self.history = HistoryStore(self.MAX_HISTORY)
+        self.session_stats = SessionStats()
+        self.journal = None
+        self._last_chart_draw = 0.0
+        self._last_checkpoint = 0.0
+        self._checkpoint_lock = threading.Lock()
+        self._checkpoint_closed = False
+        self.chart_window_sec = CHART_WINDOW_SEC
+        self.chart_points = TimeWindowRing(self._chart_capacity())
+        self._vol_cache = float(self.cfg["default_volume"])
+
+        self._audio_backend = None
+        self._audio = None
+        self._audio_warned = False
+        self._sessions = None
+        self._meter = None
+        self._lock_enforcer = None
+        self._lock_enforcer_stop = threading.Event()
+        return dump_every
+
+    def _register_core_diag_sources(self):
+        d = self.diag
+        sched = self._scheduler
+        d.add_source("scheduler", lambda: {"wakeups": sched.wakeups, "external_wakes": sched.external_wakes})
+        d.add_source("journal", lambda: {
+            "written": self.journal.written, "dropped": self.journal.dropped,
+            "fsyncs": self.journal.fsyncs, "last_error": self.journal.last_error,
+        })
+        d.add_source("audio", self._audio.stats)
+        backend_stats = getattr(self._audio_backend, "stats", None)   # ex.: endpoint simulado
+        if backend_stats is not None:
+            d.add_source("backend", backend_stats)
+        d.add_source("enforcer", self._enforcer_stats)
+        if self._meter is not None:
+            d.add_source("meter", self._meter.stats)
+        if self._sessions is not None:
+            d.add_source("sessions", self._sessions.stats)
+        d.add_source("session", lambda: {
+            "history_rows": len(self.history), "chart_points": len(self.chart_points),
+            "visible": self._ui_visible, "audio_backend": self._audio_backend.available(),
+        })
+
+    def _enforcer_stats(self):
+        enf = self._lock_enforcer
+        if enf is None:
+            return {"running": False}
+        return {"running": enf.is_alive(), "checks": enf.checks, "corrections": enf.corrections}
+
+    def _chart_capacity(self):
+        # janela + folga de descarte, com margem para rajadas de amostras retroativas
+        return int(2 * (self.chart_window_sec + 2) / self.engine.hist_interval) + 16
+
+    # --- Ganchos do host (sem UI) ---
+    def _on_ui(self, func):
+        """Ação pontual do monitor (alerta, bloqueio, volume); sem UI roda na hora."""
+        func()
+
+    def _ui_set(self, slot, value):
+        """Atualiza um slot de tela (último valor vence)."""
+
+    def _alert(self, kind, title, text):
+        """Alerta do motor; `kind` é "info", "warning" ou "error"."""
+        print(f"[{title}] {text}")
+
+    def _set_status(self, text, fg):
+        self._ui_set("status", (text, fg))
+
+    def _safe_set_slider(self, v):
+        pass
+
+    def _set_vol_label(self, v):
+        pass
+
+    def _set_controls_locked(self, locked):
+        pass
+
+    def _on_sample(self, sample, device, apps):
+        """Amostra registrada no histórico (thread do monitor)."""
+
+    def _wake_monitor(self):
+        self._scheduler.wake()
+
+    # --- Persistência ---
+    def _settings_payload(self):
+        eng = self.engine
+        return {
+            "mode": eng.mode,
+            "volume": float(self._vol_cache),
+            "cfg": self.cfg,
+            "hard_lock_enabled": eng.hard_lock_enabled,
+            "lock_on_autoadjust": eng.lock_on_autoadjust,
+            "dynamic_strategy": eng.dynamic_strategy,
+            "dynamic_softlock_enabled": eng.dynamic_softlock_enabled,
+        }
+
+    def _apply_settings(self, data):
+        """Aplica um payload de settings (arquivo ou cliente do daemon)."""
+        if isinstance(data.get("cfg"), dict):
+            for k, v in self._defaults_cfg.items():
+                self.cfg[k] = data["cfg"].get(k, v)
+            self.engine.cfg_changed()
+        eng = self.engine
+        eng.hard_lock_enabled = bool(data.get("hard_lock_enabled", True))
+        eng.lock_on_autoadjust = bool(data.get("lock_on_autoadjust", True))
+        eng.dynamic_softlock_enabled = bool(data.get("dynamic_softlock_enabled", True))
+        eng.dynamic_strategy = data.get("dynamic_strategy", DYNAMIC_STRATEGIES[0])
+        if eng.dynamic_strategy not in DYNAMIC_STRATEGIES:
+            eng.dynamic_strategy = DYNAMIC_STRATEGIES[0]
+        mode = data.get("mode")
+        if mode in ("prefixado", "dinamico"):
+            self.set_mode(mode, silent=True)
+        vol = float(data.get("volume", self.cfg["default_volume"]))
+        self._safe_set_slider(vol)
+        self._set_vol_label(vol)
+        self._vol_cache = vol
+
+    def _load_settings(self):
+        try:
+            self._apply_settings(load_settings(self._defaults_cfg))
+        except Exception as e:
+            print("Falha ao carregar settings:", e)
+
+    def _save_settings(self):
+        try:
+            save_settings(self._settings_payload())
+        except Exception as e:
+            print("Falha ao salvar settings:", e)
+
+    # --- Checkpoint de dose ---
+    def _restore_checkpoint(self):
+        """Retoma a dose do dia (e o bloqueio) do último checkpoint, se for de hoje."""
+        state = load_checkpoint()
+        if state is None:
+            return
+        lock = self.engine.restore(state)
+        self._last_checkpoint = time.time()
+        if lock is not None:
+            self._lock_volume(lock[0], reason=lock[1])
+
+    def _save_checkpoint(self, now=None, clean=False):
+        """Periódico (monitor) ou final (`clean`, no fechamento); depois do final não grava mais."""
+        now = time.time() if now is None else now
+        with self._checkpoint_lock:
+            if self._checkpoint_closed:
+                return
+            self._checkpoint_closed = clean
+            try:
+                save_checkpoint(self.engine.checkpoint(now, clean), fsync=clean)
+                self._last_checkpoint = now
+            except Exception as e:
+                print("Falha ao gravar checkpoint:", e)
+
+    # --- Bloqueio ---
+    def _lock_volume(self, target_pct: float, reason: str = ""):
+        target = self.engine.lock(target_pct, reason)
+        self._set_controls_locked(True)
+        self._safe_set_slider(target)
+        self._vol_cache = target
+        self._audio.request(target, PRIO_LOCK)
+        self._apply_system_volume_from_slider(show_install_hint=True)
+        self._set_status(f"Status: bloqueado ({reason})", DISCORD_ERROR)
+        self._start_lock_enforcer()
+        self._wake_monitor()
+
+    def _unlock_volume(self):
+        self.engine.unlock()
+        self._stop_lock_enforcer()
+        self._audio.release(PRIO_LOCK)
+        self._set_controls_locked(False)
+        self._set_status("Status: normal", "#bbb")
+        self._wake_monitor()
+
+    def _start_lock_enforcer(self):
+        if self._lock_enforcer and self._lock_enforcer.is_alive():
+            return
+        self._lock_enforcer_stop.clear()
+        self._lock_enforcer = VolumeEnforcer(
+            self._audio,
+            target_fn=lambda: self.engine.lock_target_pct,
+            stop_event=self._lock_enforcer_stop,
+            diag=self.diag,
+        )
+        self._lock_enforcer.start()
+
+    def _stop_lock_enforcer(self):
+        self._lock_enforcer_stop.set()
+
+    # --- Ações ---
+    def set_mode(self, mode, silent=False) -> bool:
+        if not self.engine.set_mode(mode):
+            return False
+        if not silent:
+            self._set_status("Status: normal", "#bbb")
+        self._wake_monitor()
+        return True
+
+    def set_volume(self, value, show_install_hint=False) -> float:
+        """Volume pedido pelo usuário, passando pelas regras do modo; devolve o que valeu."""
+        eng = self.engine
+        if eng.locked:
+            self._safe_set_slider(eng.lock_target_pct)
+            self._apply_system_volume_from_slider(show_install_hint=False)
+            return eng.lock_target_pct
+        v = eng.quantize(float(value))
+        if eng.dynamic_decay_active and v > self._vol_cache + 0.01:
+            self._safe_set_slider(self._vol_cache)
+            return self._vol_cache
+        if eng.dynamic_softlock_enabled and eng.dynamic_ceiling_pct is not None and v > eng.dynamic_ceiling_pct + 0.01:
+            self._safe_set_slider(eng.dynamic_ceiling_pct)
+            self._vol_cache = eng.dynamic_ceiling_pct
+            self._apply_system_volume_from_slider(show_install_hint=False)
+            return self._vol_cache
+        if eng.mode == "prefixado":
+            cap = eng.prefix_cap_exceeded(v)
+            if cap is not None:
+                safe_v = max(eng.profile.min_enforced_volume, cap)
+                self._safe_set_slider(safe_v)
+                self._vol_cache = safe_v
+                self._apply_system_volume_from_slider(show_install_hint=show_install_hint)
+                self._set_status("Status: ajustado p/ seguro", "#F0B232")
+                if eng.hard_lock_enabled and eng.lock_on_autoadjust:
+                    self._lock_volume(safe_v, reason="ajuste de segurança")
+                self._set_vol_label(safe_v)
+                return safe_v
+        self._vol_cache = v
+        self._set_vol_label(v)
+        self._apply_system_volume_from_slider(show_install_hint=show_install_hint)
+        self._wake_monitor()
+        return v
+
+    def set_paused(self, paused):
+        self.engine.paused = bool(paused)
+        if self.engine.paused:
+            self._set_status("Status: pausado", "#F0B232")
+        else:
+            self._set_status("Status: normal", "#bbb")
+        self._wake_monitor()
+
+    def reset_session(self):
+        self.engine.reset_session()
+        self.history.clear()
+        self.session_stats.reset()
+        self._ui_set("summary", "Sessão: sem dados")
+        self.chart_points.clear()
+        self._last_chart_draw = 0.0
+        self._last_checkpoint = 0.0
+        self._set_status("Status: normal", "#bbb")
+        self._ui_set("remaining", "Tempo restante (neste volume) até 100%: --:--:--")
+        self._unlock_volume()
+
+    # --- SO volume sync ---
+    def _apply_system_volume_from_slider(self, show_install_hint=False):
+        if self._audio.available():
+            # assíncrono; se o dispositivo recusar o valor, a próxima leitura do ator corrige o slider
+            self._audio.request(self.engine.quantize(self._vol_cache))
+            return
+        if platform.system() == "Windows" and show_install_hint and not self._audio_warned:
+            self._audio_warned = True
+            self._alert(
+                "info", "Controlar volume do Windows",
+                "Para o slider controlar (e travar) o volume do PC, instale: pip install pycaw comtypes"
+            )
+
+    # --- Encerramento ---
+    def _close_core(self):
+        self._stop_event.set()
+        self._wake_monitor()
+        try:
+            self._save_settings()
+        except Exception:
+            pass
+        self._save_checkpoint(clean=True)
+        try:
+            self._stop_lock_enforcer()
+        except Exception:
+            pass
+        try:
+            self.journal.close()
+        except Exception:
+            pass
+        self._audio.stop()
+        if self._meter is not None:
+            self._meter.stop()
+        if self._sessions is not None:
+            self._sessions.stop()
+        if self._diag_dump is not None:
+            self._diag_dump.stop()
@@ -0,0 +1,612 @@
+# Modo daemon: o monitor sem janela e sem tkinter. Dose, regras dos modos,
+# bloqueio e persistência rodam aqui; a janela (ou a CLI) se anexa pelo
+# protocolo de controle: linhas JSON num socket TCP em 127.0.0.1, com porta e
+# token em ~/.tcc_sound_monitor/daemon.json.
+import argparse, json, os, queue, secrets, signal, socket, sys, threading, time
+
+from .core import MonitorCore
+from .history import MODES, ZONES
+from .monitor import start_monitor_thread
+from .persistence import data_dir
+from .reporting import ReportExport, ExportCancelled, exporter_for
+from .utils import round_pct_ui
+
+HOST = "127.0.0.1"
+PROTOCOL = 1
+CALL_TIMEOUT = 5.0       # s esperando a thread principal do daemon / a resposta do daemon
+MAX_LINE = 1 << 16       # mensagem maior que isso derruba a conexão
+SEND_QUEUE = 512         # eventos pendentes por cliente; cheio = cliente travado, desconecta
+
+class DaemonError(RuntimeError):
+    """Falha de um comando do daemon (ou daemon fora do ar)."""
+
+def endpoint_path():
+    return data_dir() / "daemon.json"
+
+def read_endpoint():
+    """(porta, token) do daemon anunciado, ou None."""
+    try:
+        with open(endpoint_path(), "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+        return int(data["port"]), str(data["token"])
+    except Exception:
+        return None
+
+def _encode(msg):
+    return (json.dumps(msg, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+class _Conn:
+    """Conexão de um cliente: leitura numa thread, escrita enfileirada em outra."""
+    __slots__ = ("sock", "out", "subscribed", "closed")
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.out = queue.Queue(SEND_QUEUE)
+        self.subscribed = False
+        self.closed = False
+
+    def send(self, msg):
+        if self.closed:
+            return
+        try:
+            self.out.put_nowait(_encode(msg))
+        except queue.Full:
+            self.close()
+
+    def close(self):
+        """Fecha depois de enviar o que já está na fila (cliente travado: na hora)."""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.out.put_nowait(None)
+        except queue.Full:
+            self._shutdown()
+
+    def _shutdown(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)   # também acorda a thread de leitura
+        except OSError:
+            pass
+
+    def writer(self):
+        try:
+            while True:
+                data = self.out.get()
+                if data is None:
+                    break
+                self.sock.sendall(data)
+        except OSError:
+            pass
+        finally:
+            self.closed = True
+            self._shutdown()
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+
+class SoundMonitorDaemon(MonitorCore):
+    """Host sem UI do MonitorCore.
+
+    A thread principal faz o papel da thread do Tk: ações do monitor
+    (`_on_ui`) e comandos dos clientes passam pela fila `_calls` e rodam
+    nela, uma por vez. Slots de tela viram eventos para os clientes
+    inscritos; sem nenhum inscrito o monitor roda como janela oculta.
+    """
+
+    def __init__(self, port=0):
+        self._calls = queue.Queue()
+        self._quit = threading.Event()
+        self._slots = {}
+        self._conns = set()
+        self._conns_lock = threading.Lock()
+        self._token = secrets.token_hex(16)
+        self._export_job = None
+        self._listener = socket.create_server((HOST, port))
+        self.port = self._listener.getsockname()[1]
+
+        self._init_core(visible=False)
+        self._register_core_diag_sources()
+        self.diag.add_source("daemon", lambda: {"clients": len(self._conns), "port": self.port})
+        self._load_settings()
+        self._restore_checkpoint()
+
+        sv = self._audio.refresh(wait=True)
+        if sv is not None and not self.engine.locked and abs(sv - self._vol_cache) > 2.0:
+            self._vol_cache = sv
+        start_monitor_thread(self)
+
+    # --- Ganchos do host ---
+    def _on_ui(self, func):
+        self._calls.put(func)
+
+    def _ui_set(self, slot, value):
+        self._slots[slot] = value
+        self._broadcast({"ev": "slot", "slot": slot, "value": value})
+
+    def _alert(self, kind, title, text):
+        print(time.strftime("%H:%M:%S"), f"[{title}] {text}", flush=True)
+        self._broadcast({"ev": "alert", "kind": kind, "title": title, "text": text})
+
+    def _safe_set_slider(self, v):
+        self._ui_set("slider", float(v))
+
+    def _set_vol_label(self, v):
+        self._ui_set("vol_label", f"{round_pct_ui(v)}%")
+
+    def _on_sample(self, sample, device, apps):
+        if self._ui_visible:
+            self._broadcast({"ev": "sample", "row": sample, "device": device, "apps": apps})
+
+    def _lock_volume(self, target_pct, reason=""):
+        super()._lock_volume(target_pct, reason)
+        self._publish_state()
+
+    def _unlock_volume(self):
+        super()._unlock_volume()
+        self._publish_state()
+
+    def reset_session(self):
+        super().reset_session()
+        self._broadcast({"ev": "reset"})
+
+    # --- Estado para os clientes ---
+    def _state(self):
+        eng = self.engine
+        return {
+            "mode": eng.mode,
+            "paused": eng.paused,
+            "locked": eng.locked,
+            "lock_target": eng.lock_target_pct,
+            "lock_reason": eng.lock_reason,
+            "volume": float(self._vol_cache),
+            "session_dose": eng.session_dose,
+            "settings": self._settings_payload(),
+            "device": self._audio.device_label(),
+            "audio_backend": self._audio.available(),
+        }
+
+    def _publish_state(self):
+        if self._conns:
+            self._broadcast({"ev": "state", "state": self._state()})
+
+    def _recent_rows(self):
+        """Amostras da janela do gráfico, para quem acabou de se anexar."""
+        h = self.history
+        with h.lock:
+            n = len(h)
+            start = max(0, n - int((self.chart_window_sec + 2) / self.engine.hist_interval) - 1)
+            return [(ts, t, MODES[m], vol, L, dose, ZONES[z], daily)
+                    for ts, t, m, vol, L, dose, z, daily in h.rows(start, n)]
+
+    def _broadcast(self, msg):
+        if not self._conns:
+            return
+        with self._conns_lock:
+            conns = [c for c in self._conns if c.subscribed]
+        for c in conns:
+            c.send(msg)
+
+    # --- Comandos (thread principal) ---
+    def _cmd_status(self, msg):
+        return {"state": self._state(), "summary": self.session_stats.summary(), "clients": len(self._conns)}
+
+    def _cmd_set_volume(self, msg):
+        return {"volume": self.set_volume(float(msg["value"]))}
+
+    def _cmd_set_mode(self, msg):
+        if msg.get("mode") not in ("prefixado", "dinamico"):
+            raise ValueError(f"modo inválido: {msg.get('mode')}")
+        self.set_mode(msg["mode"], silent=bool(msg.get("silent", False)))
+
+    def _cmd_pause(self, msg):
+        self.set_paused(msg.get("paused", not self.engine.paused))
+
+    def _cmd_reset_session(self, msg):
+        self.reset_session()
+
+    def _cmd_configure(self, msg):
+        settings = msg.get("settings")
+        if not isinstance(settings, dict):
+            raise ValueError("settings ausentes")
+        self._apply_settings(settings)
+        self._save_settings()
+
+    def _cmd_diagnostics(self, msg):
+        return self.diag.snapshot()
+
+    def _cmd_export(self, msg):
+        # o relatório sai do histórico e do resumo completos do daemon, não do espelho da janela
+        filename = str(msg.get("filename") or "")
+        if not os.path.isabs(filename):
+            raise ValueError("caminho do relatório precisa ser absoluto")
+        _suffix, label, _write, available = exporter_for(filename)
+        if not available():
+            raise ValueError(f"{label}: dependência ausente")
+        if self._export_job is not None:
+            raise ValueError("já há uma exportação em andamento")
+        snap = self.history.snapshot()
+        self._export_job = ReportExport(
+            snap, self.cfg, filename, summary=self.session_stats.summary(),
+            on_progress=lambda done, total: self._ui_set("export", (done, total)),
+            on_done=lambda err: self._on_ui(lambda: self._export_finished(filename, err)),
+        ).start()
+        return {"rows": len(snap)}
+
+    def _cmd_export_cancel(self, msg):
+        if self._export_job is not None:
+            self._export_job.cancel()
+
+    def _export_finished(self, filename, err):
+        self._export_job = None
+        self._broadcast({"ev": "export_done", "filename": filename,
+                         "cancelled": isinstance(err, ExportCancelled),
+                         "error": None if err is None else str(err)})
+
+    _COMMANDS = {
+        "status": _cmd_status,
+        "set_volume": _cmd_set_volume,
+        "set_mode": _cmd_set_mode,
+        "pause": _cmd_pause,
+        "reset_session": _cmd_reset_session,
+        "configure": _cmd_configure,
+        "diagnostics": _cmd_diagnostics,
+        "export": _cmd_export,
+        "export_cancel": _cmd_export_cancel,
+    }
+    _QUERIES = ("status", "diagnostics", "export", "export_cancel")   # não mudam o estado publicado
+
+    def _run_on_main(self, func):
+        done = threading.Event()
+        box = [None, None]
+        def call():
+            try:
+                box[0] = func()
+            except Exception as e:
+                box[1] = e
+            finally:
+                done.set()
+        self._calls.put(call)
+        if not done.wait(CALL_TIMEOUT):
+            raise DaemonError("daemon ocupado")
+        if box[1] is not None:
+            raise box[1]
+        return box[0]
+
+    def _subscribe(self, conn, mid):
+        # a resposta (retrato atual) entra na fila antes de qualquer evento
+        conn.send({"id": mid, "ok": True, "result": {
+            "state": self._state(), "slots": dict(self._slots), "rows": self._recent_rows(),
+        }})
+        conn.subscribed = True
+        self._ui_visible = True
+        self._wake_monitor()
+
+    def _dispatch(self, conn, msg):
+        cmd = msg.get("cmd")
+        handler = self._COMMANDS.get(cmd)
+        if handler is None:
+            raise ValueError(f"comando desconhecido: {cmd}")
+        def run():
+            result = handler(self, msg)
+            if cmd not in self._QUERIES:
+                self._publish_state()
+            return result
+        return self._run_on_main(run)
+
+    # --- Servidor ---
+    def _accept_loop(self):
+        while not self._quit.is_set():
+            try:
+                sock, _addr = self._listener.accept()
+            except OSError:
+                break
+            conn = _Conn(sock)
+            threading.Thread(target=conn.writer, daemon=True).start()
+            threading.Thread(target=lambda c=conn: self._serve(c), daemon=True).start()
+
+    def _serve(self, conn):
+        reader = conn.sock.makefile("rb")
+        try:
+            # primeira mensagem: hello com o token do arquivo de endpoint
+            hello = self._read_msg(reader)
+            if (not hello or hello.get("cmd") != "hello"
+                    or not secrets.compare_digest(str(hello.get("token", "")), self._token)):
+                return
+            conn.send({"id": hello.get("id"), "ok": True, "result": {"protocol": PROTOCOL, "pid": os.getpid()}})
+            with self._conns_lock:
+                self._conns.add(conn)
+            while not conn.closed:
+                msg = self._read_msg(reader)
+                if msg is None:
+                    break
+                if msg.get("cmd") == "shutdown":
+                    # responde antes: o encerramento fecha as conexões
+                    conn.send({"id": msg.get("id"), "ok": True, "result": None})
+                    self.shutdown()
+                    break
+                try:
+                    if msg.get("cmd") == "subscribe":
+                        self._run_on_main(lambda mid=msg.get("id"): self._subscribe(conn, mid))
+                        continue
+                    reply = {"id": msg.get("id"), "ok": True, "result": self._dispatch(conn, msg)}
+                except Exception as e:
+                    reply = {"id": msg.get("id"), "ok": False, "error": str(e)}
+                conn.send(reply)
+        finally:
+            with self._conns_lock:
+                self._conns.discard(conn)
+                watching = any(c.subscribed for c in self._conns)
+            if conn.subscribed and not watching:
+                self._on_ui(self._unwatched)
+            conn.close()
+            reader.close()
+
+    def _unwatched(self):
+        with self._conns_lock:
+            if any(c.subscribed for c in self._conns):
+                return
+        self._ui_visible = False
+        self._wake_monitor()
+
+    @staticmethod
+    def _read_msg(reader):
+        try:
+            line = reader.readline(MAX_LINE + 1)
+        except OSError:
+            return None
+        if not line or len(line) > MAX_LINE:
+            return None
+        try:
+            msg = json.loads(line)
+        except ValueError:
+            return None
+        return msg if isinstance(msg, dict) else None
+
+    def _write_endpoint(self):
+        # o token nunca fica legível por outros: o temporário já nasce 0600
+        path = str(endpoint_path())
+        tmp = path + ".tmp"
+        try:
+            os.remove(tmp)
+        except FileNotFoundError:
+            pass
+        fd = os.open(tmp, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump({"pid": os.getpid(), "port": self.port, "token": self._token, "protocol": PROTOCOL}, fh)
+        os.replace(tmp, path)
+
+    def _remove_endpoint(self):
+        ep = read_endpoint()
+        if ep is not None and ep[1] == self._token:
+            try:
+                os.remove(endpoint_path())
+            except OSError:
+                pass
+
+    # --- Ciclo de vida ---
+    def shutdown(self):
+        """Pede o encerramento (de qualquer thread ou handler de sinal)."""
+        self._quit.set()
+
+    def run(self):
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        self._write_endpoint()
+        try:
+            while not self._quit.is_set():
+                try:
+                    func = self._calls.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                try:
+                    func()
+                except Exception as e:
+                    print("Erro no daemon:", e)
+        finally:
+            self.close()
+
+    def close(self):
+        self._quit.set()
+        self._remove_endpoint()
+        if self._export_job is not None:
+            self._export_job.cancel()
+        try:
+            self._listener.close()
+        except OSError:
+            pass
+        with self._conns_lock:
+            conns = list(self._conns)
+        for c in conns:
+            c.close()
+        self._close_core()
+
+class DaemonClient:
+    """Cliente do protocolo de controle (usado pela janela anexada e pela CLI)."""
+
+    def __init__(self, port, token, timeout=CALL_TIMEOUT):
+        self.timeout = timeout
+        self._sock = socket.create_connection((HOST, port), timeout=timeout)
+        self._sock.settimeout(None)
+        self._reader = self._sock.makefile("rb")
+        self._send_lock = threading.Lock()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._next_id = 0
+        self._events = queue.Queue()
+        self.closed = False
+        threading.Thread(target=self._read_loop, daemon=True).start()
+        self.call("hello", token=token)
+
+    @classmethod
+    def connect(cls, timeout=CALL_TIMEOUT):
+        """Conecta ao daemon anunciado em daemon.json; None se não houver nenhum no ar."""
+        ep = read_endpoint()
+        if ep is None:
+            return None
+        try:
+            return cls(ep[0], ep[1], timeout=timeout)
+        except (OSError, DaemonError):
+            return None
+
+    def call(self, cmd, **args):
+        """Comando síncrono; devolve o `result` ou levanta DaemonError."""
+        if self.closed:
+            raise DaemonError("conexão com o daemon encerrada")
+        done = threading.Event()
+        box = [None]
+        mid = self._send(cmd, args, (done, box))
+        if not done.wait(self.timeout):
+            with self._pending_lock:
+                self._pending.pop(mid, None)
+            raise DaemonError(f"{cmd}: sem resposta do daemon")
+        reply = box[0]
+        if reply is None:
+            raise DaemonError("conexão com o daemon encerrada")
+        if not reply.get("ok"):
+            raise DaemonError(f"{cmd}: {reply.get('error')}")
+        return reply.get("result")
+
+    def send(self, cmd, **args):
+        """Comando sem esperar resposta (ações da UI); erros só vão para o log."""
+        self._send(cmd, args, None)
+
+    def events(self):
+        """Eventos após `subscribe`, até a conexão cair."""
+        while True:
+            ev = self._events.get()
+            if ev is None:
+                return
+            yield ev
+
+    def close(self):
+        self.closed = True
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+
+    def _send(self, cmd, args, waiter):
+        with self._pending_lock:
+            self._next_id += 1
+            mid = self._next_id
+            self._pending[mid] = waiter
+        msg = dict(args, id=mid, cmd=cmd)
+        try:
+            with self._send_lock:
+                self._sock.sendall(_encode(msg))
+        except OSError as e:
+            with self._pending_lock:
+                self._pending.pop(mid, None)
+            raise DaemonError(f"{cmd}: {e}") from e
+        return mid
+
+    def _read_loop(self):
+        try:
+            for line in self._reader:
+                try:
+                    msg = json.loads(line)
+                except ValueError:
+                    continue
+                if "ev" in msg:
+                    self._events.put(msg)
+                    continue
+                with self._pending_lock:
+                    waiter = self._pending.pop(msg.get("id"), None)
+                if waiter is not None:
+                    done, box = waiter
+                    box[0] = msg
+                    done.set()
+                elif not msg.get("ok"):
+                    print("Daemon:", msg.get("error"))
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.closed = True
+            with self._pending_lock:
+                waiters, self._pending = list(self._pending.values()), {}
+            for waiter in waiters:
+                if waiter is not None:
+                    waiter[0].set()
+            self._events.put(None)
+
+def _serve(args):
+    daemon = SoundMonitorDaemon(port=args.port)
+    for name in ("SIGINT", "SIGTERM", "SIGBREAK"):
+        sig = getattr(signal, name, None)
+        if sig is not None:
+            signal.signal(sig, lambda *_: daemon.shutdown())
+    print(f"Daemon ativo em {HOST}:{daemon.port} (pid {os.getpid()})", flush=True)
+    daemon.run()
+    return 0
+
+def _control(args):
+    client = DaemonClient.connect()
+    if client is None:
+        print("Nenhum daemon no ar.", file=sys.stderr)
+        return 1
+    try:
+        if args.command == "status":
+            result = client.call("status")
+        elif args.command == "stop":
+            result = client.call("shutdown")
+        elif args.command == "volume":
+            result = client.call("set_volume", value=float(args.value))
+        elif args.command == "mode":
+            result = client.call("set_mode", mode=args.value)
+        elif args.command in ("pause", "resume"):
+            result = client.call("pause", paused=args.command == "pause")
+        elif args.command == "reset":
+            result = client.call("reset_session")
+        else:
+            result = client.call("diagnostics")
+    except DaemonError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        client.close()
+    if result is not None:
+        json.dump(result, sys.stdout, ensure_ascii=False, indent=2); print()
+    return 0
+
+def _autostart(args):
+    from . import autostart
+    try:
+        if args.command == "install-autostart":
+            print("Início automático registrado em", autostart.install())
+        elif autostart.uninstall():
+            print("Início automático removido.")
+        else:
+            print("Início automático não estava registrado.")
+    except (OSError, RuntimeError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m sound_monitor.daemon",
+                                 description="Monitor de exposição sem janela (a UI pode se anexar).")
+    ap.add_argument("command", nargs="?", default="run",
+                    choices=("run", "status", "stop", "volume", "mode", "pause", "resume", "reset", "diagnostics",
+                             "install-autostart", "uninstall-autostart"),
+                    help="run (padrão) inicia o daemon; *-autostart (des)registra o início no login; "
+                         "os demais falam com o daemon no ar")
+    ap.add_argument("value", nargs="?", help="volume (%%) ou modo (prefixado/dinamico)")
+    ap.add_argument("--port", type=int, default=0, help="porta TCP em 127.0.0.1 (padrão: livre)")
+    args = ap.parse_args(argv)
+    if args.command in ("volume", "mode") and args.value is None:
+        ap.error(f"{args.command} precisa de um valor")
+    if args.command.endswith("-autostart"):
+        return _autostart(args)
+    if args.command == "run":
+        running = DaemonClient.connect()
+        if running is not None:
+            running.close()
+            print("Já há um daemon no ar.", file=sys.stderr)
+            return 1
+        return _serve(args)
+    return _control(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,290 @@
+import os, threading, time
+from time import perf_counter_ns
+from .persistence import data_dir, write_json_atomic
+
+DUMP_INTERVAL = 60.0     # s entre gravações do JSON periódico
+_SUB_BITS = 2            # 4 baldes por oitava (erro relativo <= 25%)
+
+def _bucket(v):
+    bl = v.bit_length()
+    if bl <= _SUB_BITS + 1:
+        return v
+    shift = bl - _SUB_BITS - 1
+    return (shift << _SUB_BITS) + (v >> shift)
+
+def _bucket_upper(i):
+    if i < (2 << _SUB_BITS):
+        return i
+    shift = (i >> _SUB_BITS) - 1
+    m = i - (shift << _SUB_BITS)
+    return ((m + 1) << shift) - 1
+
+class Log2Histogram:
+    """Histograma log-linear de inteiros (ns, profundidade de fila): O(1) por valor."""
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, v):
+        v = int(v) if v > 0 else 0
+        i = _bucket(v)
+        self.counts[i] = self.counts.get(i, 0) + 1
+        self.count += 1
+        self.total += v
+        if v > self.max:
+            self.max = v
+
+    def percentile(self, p):
+        """Limite superior do balde que contém o percentil `p` (0..1)."""
+        if not self.count:
+            return 0
+        rank = p * self.count
+        seen = 0
+        for i in sorted(self.counts):
+            seen += self.counts[i]
+            if seen >= rank:
+                return min(self.max, _bucket_upper(i))
+        return self.max
+
+    def summary(self, scale=1.0):
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": self.total / self.count / scale,
+            "p50": self.percentile(0.50) / scale,
+            "p90": self.percentile(0.90) / scale,
+            "p99": self.percentile(0.99) / scale,
+            "max": self.max / scale,
+        }
+
+class PhaseClock:
+    """Cronometra fases seguidas: cada `mark(nome)` registra o tempo desde a marca anterior."""
+    __slots__ = ("_diag", "_prefix", "_t0", "_t")
+
+    def __init__(self, diag, prefix=""):
+        self._diag = diag
+        self._prefix = prefix
+        self._t0 = self._t = perf_counter_ns()
+
+    def mark(self, name):
+        t = perf_counter_ns()
+        self._diag.record(self._prefix + name, t - self._t)
+        self._t = t
+
+    def skip(self):
+        """Reinicia a fase atual sem registrar (ex.: trecho que não interessa)."""
+        self._t = perf_counter_ns()
+
+    def total(self, name="total"):
+        self._diag.record(self._prefix + name, perf_counter_ns() - self._t0)
+
+class _NullClock:
+    __slots__ = ()
+
+    def mark(self, name):
+        pass
+
+    def skip(self):
+        pass
+
+    def total(self, name="total"):
+        pass
+
+NULL_CLOCK = _NullClock()
+
+class Diagnostics:
+    """Instrumentação do caminho quente: tempos por fase, profundidades e contadores.
+
+    Desligado (padrão), `clock()` devolve um relógio nulo e `record`/`observe`/
+    `count` retornam na primeira linha; o custo é uma chamada vazia por fase.
+    `add_source(nome, fn)` anexa ao snapshot os contadores que outros objetos
+    já mantêm (render, scheduler, journal).
+    """
+    def __init__(self, enabled=False):
+        self.enabled = bool(enabled)
+        self._lock = threading.Lock()
+        self._timings = {}      # nome -> Log2Histogram (ns)
+        self._values = {}       # nome -> Log2Histogram (valores brutos)
+        self._counters = {}
+        self._sources = {}
+        self._since = time.time()
+
+    def clock(self, prefix=""):
+        return PhaseClock(self, prefix) if self.enabled else NULL_CLOCK
+
+    def record(self, name, ns):
+        if not self.enabled:
+            return
+        with self._lock:
+            h = self._timings.get(name)
+            if h is None:
+                h = self._timings[name] = Log2Histogram()
+            h.add(ns)
+
+    def observe(self, name, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            h = self._values.get(name)
+            if h is None:
+                h = self._values[name] = Log2Histogram()
+            h.add(value)
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def add_source(self, name, fn):
+        self._sources[name] = fn
+
+    def reset(self):
+        with self._lock:
+            self._timings.clear()
+            self._values.clear()
+            self._counters.clear()
+            self._since = time.time()
+
+    def snapshot(self):
+        with self._lock:
+            out = {
+                "enabled": self.enabled,
+                "timestamp": time.time(),
+                "window_s": time.time() - self._since,
+                "timings_us": {k: h.summary(1e3) for k, h in sorted(self._timings.items())},
+                "values": {k: h.summary() for k, h in sorted(self._values.items())},
+                "counters": dict(sorted(self._counters.items())),
+            }
+        sources = {}
+        for name, fn in self._sources.items():
+            try:
+                sources[name] = fn()
+            except Exception as e:
+                sources[name] = {"erro": str(e)}
+        out["sources"] = sources
+        return out
+
+def dump_path():
+    return data_dir() / "diagnostics.json"
+
+def write_snapshot(diag, path=None):
+    """Grava o snapshot em JSON de forma atômica (arquivo temporário + replace)."""
+    path = str(path or dump_path())
+    write_json_atomic(path, diag.snapshot(), indent=1)
+    return path
+
+class DiagnosticsDump:
+    """Thread que grava o snapshot a cada `interval` segundos (e uma última vez no stop)."""
+    def __init__(self, diag, path=None, interval=DUMP_INTERVAL):
+        self.diag = diag
+        self.path = path
+        self.interval = float(interval)
+        self.dumps = 0
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="diagnostics", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._write()
+        self._write()
+
+    def _write(self):
+        try:
+            write_snapshot(self.diag, self.path)
+            self.dumps += 1
+        except Exception as e:
+            self.last_error = str(e)
+
+def diagnostics_from_env(environ=None):
+    """`TSM_DIAG=1` liga a coleta; `TSM_DIAG_DUMP=<s>` muda o intervalo do JSON.
+
+    Devolve (Diagnostics, intervalo do dump ou None).
+    """
+    env = os.environ if environ is None else environ
+    on = env.get("TSM_DIAG", "").strip().lower() not in ("", "0", "false", "no")
+    interval = None
+    if on:
+        try:
+            interval = float(env.get("TSM_DIAG_DUMP", DUMP_INTERVAL))
+        except ValueError:
+            interval = DUMP_INTERVAL
+        if interval <= 0:
+            interval = None
+    return Diagnostics(on), interval
+
+class TimedBackend:
+    """Envolve um backend de áudio contando chamadas, erros e latência de get/set."""
+    def __init__(self, backend, diag):
+        self._backend = backend
+        self._diag = diag
+
+    def __getattr__(self, name):
+        return getattr(self._backend, name)
+
+    def available(self):
+        return self._backend.available()
+
+    def get_percent(self):
+        d = self._diag
+        if not d.enabled:
+            return self._backend.get_percent()
+        t = perf_counter_ns()
+        try:
+            return self._backend.get_percent()
+        except Exception:
+            d.count("audio.errors")
+            raise
+        finally:
+            d.record("audio.get_percent", perf_counter_ns() - t)
+
+    def set_percent(self, pct):
+        d = self._diag
+        if not d.enabled:
+            return self._backend.set_percent(pct)
+        t = perf_counter_ns()
+        try:
+            return self._backend.set_percent(pct)
+        except Exception:
+            d.count("audio.errors")
+            raise
+        finally:
+            d.record("audio.set_percent", perf_counter_ns() - t)
+
+def format_snapshot(snap):
+    """Texto em colunas para o painel de diagnóstico."""
+    lines = [f"coleta: {'ligada' if snap['enabled'] else 'desligada'} | janela {snap['window_s']:.0f} s", ""]
+    lines.append(f"{'tempo (us)':<28}{'n':>8}{'média':>10}{'p50':>10}{'p99':>10}{'máx':>11}")
+    for name, s in snap["timings_us"].items():
+        if s["count"]:
+            lines.append(f"{name:<28}{s['count']:>8}{s['mean']:>10.1f}{s['p50']:>10.1f}{s['p99']:>10.1f}{s['max']:>11.1f}")
+    if snap["values"]:
+        lines += ["", f"{'valor':<28}{'n':>8}{'média':>10}{'p50':>10}{'p99':>10}{'máx':>11}"]
+        for name, s in snap["values"].items():
+            if s["count"]:
+                lines.append(f"{name:<28}{s['count']:>8}{s['mean']:>10.1f}{s['p50']:>10.0f}{s['p99']:>10.0f}{s['max']:>11.0f}")
+    if snap["counters"]:
+        lines += ["", "contadores:"]
+        lines += [f"  {k}: {v}" for k, v in snap["counters"].items()]
+    for name, data in snap["sources"].items():
+        lines += ["", f"{name}:"]
+        lines += [f"  {k}: {v}" for k, v in data.items()]
+    return "\n".join(lines)
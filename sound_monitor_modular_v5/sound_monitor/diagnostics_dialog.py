@@ -0,0 +1,60 @@
+import tkinter as tk
+import customtkinter as ctk
+from tkinter import messagebox
+from .constants import DISCORD_SURFACE_ALT, DISCORD_ACCENT
+from .diagnostics import format_snapshot, write_snapshot
+
+REFRESH_MS = 1000
+
+def open_diagnostics_panel(app):
+    """Painel oculto (Ctrl+Shift+D): liga a coleta enquanto aberto, se estava desligada."""
+    top = getattr(app, "_diag_top", None)
+    if top is not None and top.winfo_exists():
+        top.lift()
+        return
+    diag = app.diag
+    was_enabled = diag.enabled
+    diag.enabled = True
+
+    top = ctk.CTkToplevel(app)
+    top.title("Diagnóstico")
+    top.geometry("720x560")
+    app._diag_top = top
+
+    text = tk.Text(top, font=("Consolas", 10), bg=DISCORD_SURFACE_ALT, fg="white",
+                   relief="flat", wrap="none")
+    text.pack(fill="both", expand=True, padx=10, pady=(10, 6))
+
+    def refresh():
+        if not top.winfo_exists():
+            return
+        pos = text.yview()[0]
+        text.configure(state="normal")
+        text.delete("1.0", "end")
+        text.insert("1.0", format_snapshot(diag.snapshot()))
+        text.configure(state="disabled")
+        text.yview_moveto(pos)
+        top._job = top.after(REFRESH_MS, refresh)
+
+    def save():
+        try:
+            path = write_snapshot(diag)
+            messagebox.showinfo("Diagnóstico", f"Snapshot gravado em:\n{path}", parent=top)
+        except Exception as e:
+            messagebox.showerror("Diagnóstico", f"Falha ao gravar:\n{e}", parent=top)
+
+    def close():
+        job = getattr(top, "_job", None)
+        if job is not None:
+            top.after_cancel(job)
+        diag.enabled = was_enabled
+        app._diag_top = None
+        top.destroy()
+
+    btns = ctk.CTkFrame(top, fg_color="transparent")
+    btns.pack(pady=(0, 10))
+    ctk.CTkButton(btns, text="Zerar", width=100, fg_color="#444", command=diag.reset).pack(side="left", padx=6)
+    ctk.CTkButton(btns, text="Salvar JSON", width=120, fg_color=DISCORD_ACCENT, command=save).pack(side="left", padx=6)
+    ctk.CTkButton(btns, text="Fechar", width=100, fg_color="#444", command=close).pack(side="left", padx=6)
+    top.protocol("WM_DELETE_WINDOW", close)
+    refresh()
@@ -0,0 +1,610 @@
+import time
+from .utils import risk_zone_from_dose, risk_zone_from_level, round_pct_ui, quantize_pct, day_bounds
+from .profile import ExposureProfile
+
+# Alertas emitidos pelo motor (o consumidor decide como exibir)
+ALERT_NEW_DAY = "novo_dia"
+ALERT_DAILY_WARN = "diaria_80"
+ALERT_DAILY_BLOCK = "diaria_100"
+ALERT_DOSE_50 = "dose_50"
+ALERT_DOSE_100 = "dose_100"
+
+# Status geral sugerido para a UI
+STATUS_NORMAL = "normal"
+STATUS_PAUSED = "pausado"
+STATUS_ADJUSTED = "ajustado"
+STATUS_LIMITING = "auto_limitando"
+STATUS_LIMITING_SAFE = "auto_limitando_zona"
+
+# Folga mínima entre passos agendados por previsão (s)
+DEADLINE_MARGIN = 0.05
+
+# Checkpoint do estado de dose (sobrevive a reinícios)
+CHECKPOINT_VERSION = 1
+CHECKPOINT_INTERVAL = 30.0   # s entre checkpoints; limita o que uma queda pode perder
+
+LOCK_REASON_DAILY = "limite diário"
+LOCK_REASON_AUTOADJUST = "ajuste de segurança"
+
+# Estratégias do soft-lock dinâmico (a primeira é o padrão)
+DYNAMIC_STRATEGIES = ("reserva", "zona_segura")
+
+class TickResult:
+    """Resultado de um passo do motor: o que mostrar e quais ações tomar."""
+    __slots__ = (
+        "now", "vol_percent", "L", "session_dose", "daily_dose", "zone", "level_zone",
+        "allowed_sec", "time_at_level", "remaining_sec", "paused", "status",
+        "volume_target", "volume_hint", "lock_target", "lock_reason", "alerts",
+        "samples", "mode", "dose_rate",
+    )
+
+    def __init__(self, now, vol_percent, L):
+        self.now = now
+        self.vol_percent = vol_percent
+        self.L = L
+        self.session_dose = 0.0
+        self.daily_dose = 0.0
+        self.zone = "SEGURA"
+        self.level_zone = "SEGURA"
+        self.allowed_sec = 0.0
+        self.time_at_level = 0.0
+        self.remaining_sec = 0.0
+        self.paused = False
+        self.status = None          # None = não alterar
+        self.volume_target = None   # novo volume a aplicar (snap/decaimento)
+        self.volume_hint = False    # mostrar dica de instalação do pycaw se falhar
+        self.lock_target = None     # travar volume neste alvo
+        self.lock_reason = ""
+        self.alerts = ()
+        self.samples = ()           # amostras de histórico (ts, t_sessao, modo, vol, L, dose, zona, diária)
+        self.mode = ""
+        self.dose_rate = 0.0        # dose/s a partir de `now` (0 pausado); a UI extrapola os relógios com ela
+
+class DoseEngine:
+    """Integração de dose, EMA, alertas e regras dos modos, sem dependência de UI.
+
+    `step(now, vol_percent)` avança o estado e devolve um TickResult; quem chama
+    (thread do monitor, replay, testes) aplica as ações no volume e na tela.
+    Com `program_db` (nível medido do programa, ver `metering`), o nível
+    efetivo é o do volume mais essa diferença em vez do mapa puro do slider.
+    """
+    __slots__ = (
+        "cfg", "profile", "mode", "dynamic_strategy", "hard_lock_enabled", "lock_on_autoadjust",
+        "paused", "_was_paused", "locked", "lock_target_pct", "lock_reason",
+        "session_dose", "prev_session_dose", "daily_dose", "time_at_current_level",
+        "alert_50_fired", "alert_100_fired", "daily_warn_fired", "daily_block_fired",
+        "_day_key", "_day_end", "session_start_ts", "_last_update", "_last_hist_log",
+        "_last_L_for_timer", "_last_vol_key", "_ema_remaining_sec", "_last_remaining_sec",
+        "_held_vol", "_held_L", "_held_rate", "_program_db",
+        "timer_epsilon_db", "ema_alpha", "ema_ref_dt", "volume_quantum", "hist_interval", "max_dt",
+        "dynamic_reserve_min_sec", "dynamic_reserve_max_sec", "dynamic_reserve_fraction",
+        "dynamic_step_small", "dynamic_step_medium", "dynamic_step_large",
+        "dynamic_hysteresis_sec", "dynamic_adjust_interval", "dynamic_release_delay",
+        "dynamic_softlock_enabled", "dynamic_limiting_active", "dynamic_decay_active",
+        "last_dynamic_adjust_ts", "dynamic_ceiling_pct", "_dynamic_upper_ok_since",
+    )
+
+    def __init__(self, cfg, now=None):
+        now = time.time() if now is None else float(now)
+        self.cfg = cfg
+        self.profile = ExposureProfile(cfg)
+        self.mode = "prefixado"
+        self.dynamic_strategy = "reserva"
+        self.hard_lock_enabled = True
+        self.lock_on_autoadjust = True
+        self.paused = False
+        self._was_paused = False
+        self.locked = False
+        self.lock_target_pct = None
+        self.lock_reason = ""
+
+        self.session_dose = 0.0
+        self.prev_session_dose = 0.0
+        self.daily_dose = 0.0
+        self.time_at_current_level = 0.0
+        self.alert_50_fired = False
+        self.alert_100_fired = False
+        self.daily_warn_fired = False
+        self.daily_block_fired = False
+        self._day_key, self._day_end = day_bounds(now)
+        self.session_start_ts = now
+        self._last_update = now
+        self._last_hist_log = 0.0
+
+        self._last_L_for_timer = None
+        self._last_vol_key = None
+        self._ema_remaining_sec = None
+        self._last_remaining_sec = None
+        self._held_vol = None
+        self._held_L = 0.0
+        self._held_rate = 0.0
+        self._program_db = None
+        self.timer_epsilon_db = 1.0
+        self.ema_alpha = 0.25       # por passo de referência (ema_ref_dt)
+        self.ema_ref_dt = 0.2
+        self.volume_quantum = 2.0
+        self.hist_interval = 1.0
+        self.max_dt = 1.0
+
+        # Parâmetros dinâmicos
+        self.dynamic_reserve_min_sec = 600.0
+        self.dynamic_reserve_max_sec = 1200.0
+        self.dynamic_reserve_fraction = 0.10
+        self.dynamic_step_small = 0.5
+        self.dynamic_step_medium = 1.0
+        self.dynamic_step_large = 2.0
+        self.dynamic_hysteresis_sec = 90.0
+        self.dynamic_adjust_interval = 0.6
+        self.dynamic_release_delay = 20.0
+        self.dynamic_softlock_enabled = True
+        self._reset_dynamic()
+
+    # --- Helpers ---
+    def _reset_dynamic(self):
+        self.dynamic_limiting_active = False
+        self.dynamic_decay_active = False
+        self.last_dynamic_adjust_ts = 0.0
+        self.dynamic_ceiling_pct = None
+        self._dynamic_upper_ok_since = None
+
+    def quantize(self, pct):
+        return quantize_pct(pct, self.volume_quantum)
+
+    def prefix_cap(self, dose=None):
+        return self.profile.prefix_cap(self.session_dose if dose is None else dose)
+
+    def prefix_cap_exceeded(self, pct, dose=None):
+        """Teto do prefixado se `pct` passa dele (+tol), senão None.
+
+        A decisão usa o limiar de dose tabelado por volume; o teto exato só é
+        calculado quando há o que ajustar.
+        """
+        dose = self.session_dose if dose is None else dose
+        thr = self.profile.prefix_cap_threshold(pct)
+        if thr is None or dose <= thr:
+            return None
+        return self.profile.prefix_cap(dose)
+
+    def _lower_ceiling(self, pct):
+        self.dynamic_ceiling_pct = pct if self.dynamic_ceiling_pct is None else min(self.dynamic_ceiling_pct, pct)
+
+    # --- Comandos (chamados pela UI ou por quem dirige o motor) ---
+    def set_mode(self, mode):
+        if mode not in ("prefixado", "dinamico"):
+            return False
+        self.mode = mode
+        self.time_at_current_level = 0.0
+        self._last_L_for_timer = None
+        self._last_vol_key = None
+        self._reset_dynamic()
+        return True
+
+    def _hold(self, vol_percent, L=None):
+        p = self.profile
+        if L is None:
+            L = self._effective_level(vol_percent)
+        self._held_vol, self._held_L = float(vol_percent), L
+        self._held_rate = p.rate_for_pct(vol_percent) if self._program_db is None else p.dose_rate(L)
+
+    def _effective_level(self, vol_percent):
+        L = self.profile.level(vol_percent)
+        return L if self._program_db is None else max(0.0, L + self._program_db)
+
+    def cfg_changed(self):
+        """Troca o perfil (atômico) e recalcula o nível mantido após alteração de `cfg`."""
+        if not self.profile.matches(self.cfg):
+            self.profile = ExposureProfile(self.cfg)
+        if self._held_vol is not None:
+            self._hold(self._held_vol)
+
+    def lock(self, target_pct, reason=""):
+        self.locked = True
+        self.lock_target_pct = max(self.profile.min_enforced_volume, float(target_pct))
+        self.lock_reason = reason
+        return self.lock_target_pct
+
+    def unlock(self):
+        self.locked = False
+        self.lock_target_pct = None
+        self.lock_reason = ""
+
+    def reset_session(self, now=None):
+        now = time.time() if now is None else float(now)
+        self.session_dose = 0.0
+        self.prev_session_dose = 0.0
+        self.alert_50_fired = False
+        self.alert_100_fired = False
+        self.time_at_current_level = 0.0
+        self.session_start_ts = now
+        self._last_hist_log = 0.0
+        self._last_update = now
+        self._last_L_for_timer = None
+        self._last_vol_key = None
+        self._held_vol = None
+        self._reset_dynamic()
+
+    # --- Checkpoint ---
+    def checkpoint(self, now=None, clean=False):
+        """Estado de dose que precisa sobreviver a um reinício (dict serializável em JSON).
+
+        `clean` marca o checkpoint do fechamento normal; os periódicos não.
+        """
+        now = time.time() if now is None else float(now)
+        return {
+            "v": CHECKPOINT_VERSION,
+            "ts": now,
+            "day": self._day_key,
+            "clean": bool(clean),
+            "session_dose": self.session_dose,
+            "daily_dose": self.daily_dose,
+            # pausado não expõe: uma queda durante a pausa não credita nada
+            "rate": self._held_rate if (self._held_vol is not None and not clean and not self.paused) else 0.0,
+            "alerts": [self.alert_50_fired, self.alert_100_fired, self.daily_warn_fired, self.daily_block_fired],
+            "lock": [self.lock_target_pct, self.lock_reason] if self.locked else None,
+        }
+
+    def restore(self, state, now=None, max_gap=CHECKPOINT_INTERVAL):
+        """Retoma um checkpoint do mesmo dia; devolve (alvo, motivo) do bloqueio a reaplicar ou None.
+
+        Sem `clean` o app caiu entre dois checkpoints: o trecho até a queda
+        ainda estava sendo exposto, então credita até `max_gap` s no nível
+        mantido (sem passar da meia-noite). Checkpoint de outro dia, do futuro
+        ou malformado é ignorado e o motor segue zerado.
+        """
+        now = time.time() if now is None else float(now)
+        try:
+            if state.get("v") != CHECKPOINT_VERSION or state.get("day") != self._day_key:
+                return None
+            ts = float(state["ts"])
+            session = float(state["session_dose"])
+            daily = float(state["daily_dose"])
+            rate = float(state.get("rate") or 0.0)
+            alerts = [bool(a) for a in state["alerts"]][:4]
+            lock = state.get("lock")
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return None
+        if not (ts <= now + 1.0 and 0.0 <= session <= 1.0 and 0.0 <= daily <= 10.0 and rate >= 0.0) or len(alerts) != 4:
+            return None
+        gap = 0.0 if state.get("clean") else max(0.0, min(now, ts + max_gap, self._day_end) - ts)
+        inc = rate * gap
+        self.session_dose = min(1.0, session + inc)
+        self.prev_session_dose = self.session_dose
+        self.daily_dose = min(10.0, daily + inc)
+        self.alert_50_fired, self.alert_100_fired, self.daily_warn_fired, self.daily_block_fired = alerts
+        self._last_update = now
+        if lock:
+            try:
+                return self.lock(float(lock[0]), str(lock[1])), str(lock[1])
+            except (IndexError, TypeError, ValueError):
+                pass
+        return None
+
+    # --- Passo ---
+    def _roll_day_if_needed(self, now, alerts):
+        """Vira o dia se necessário; devolve o instante da virada (ou None)."""
+        if now < self._day_end:
+            return None
+        boundary = self._day_end
+        day_key, self._day_end = day_bounds(now)
+        if day_key != self._day_key:
+            self._day_key = day_key
+            self.daily_dose = 0.0
+            self.daily_warn_fired = False
+            self.daily_block_fired = False
+            self.alert_50_fired = False
+            self.alert_100_fired = False
+            self.session_dose = 0.0
+            alerts.append(ALERT_NEW_DAY)
+        return boundary
+
+    def _request_lock(self, res, target, reason):
+        res.lock_target = self.lock(target, reason)
+        res.lock_reason = reason
+
+    def step(self, now, vol_percent, program_db=None):
+        prof = self.profile
+        vol_percent = float(vol_percent)
+        metered_before = self._program_db is not None
+        self._program_db = program_db
+        dt = max(0.0, min(now - self._last_update, self.max_dt))
+        self._last_update = now
+        # o intervalo desde o passo anterior só conta se não estava pausado
+        was_paused, self._was_paused = self._was_paused, self.paused
+        if was_paused:
+            dt = 0.0
+
+        alerts = []
+        pre_samples = None
+        if now >= self._day_end and dt > 0.0 and self._held_vol is not None:
+            # o trecho até a meia-noite conta para o dia que termina
+            pre = min(dt, self._day_end - (now - dt))
+            if pre > 0.0:
+                d0, y0 = self.session_dose, self.daily_dose
+                inc = self._held_rate * pre
+                self.session_dose = min(1.0, d0 + inc)
+                self.daily_dose = min(10.0, y0 + inc)
+                pre_samples = self._history_samples(self._day_end, pre, self._held_rate, d0, y0)
+        boundary = self._roll_day_if_needed(now, alerts)
+        if boundary is not None:
+            # só o trecho após a meia-noite conta para o novo dia
+            dt = min(dt, max(0.0, now - boundary))
+
+        L_vol = prof.level(vol_percent)
+        L_eff = L_vol if program_db is None else max(0.0, L_vol + program_db)
+        res = TickResult(now, vol_percent, L_eff)
+        res.alerts = alerts
+        res.mode = self.mode
+
+        if self.paused:
+            if dt > 0.0 and self._held_vol is not None:
+                inc = self._held_rate * dt
+                self.session_dose = min(1.0, self.session_dose + inc)
+                self.daily_dose = min(10.0, self.daily_dose + inc)
+            res.paused = True
+            res.status = STATUS_PAUSED
+            res.session_dose = self.session_dose
+            res.daily_dose = self.daily_dose
+            res.zone = risk_zone_from_dose(self.session_dose)
+            res.level_zone = risk_zone_from_level(L_eff)
+            if pre_samples:
+                res.samples = pre_samples
+            return res
+
+        # Integra o intervalo [now - dt, now] no nível mantido desde o passo anterior
+        # (volume constante entre passos => dose linear no tempo, exata).
+        if program_db is not None:
+            # nível medido vale para o intervalo que acabou de passar, no volume mantido
+            base = self._held_vol if self._held_vol is not None else vol_percent
+            held_rate = prof.dose_rate(self._effective_level(base))
+            self._hold(vol_percent, L_eff)
+        elif self._held_vol != vol_percent or metered_before:
+            held_rate = self._held_rate if self._held_vol is not None else prof.rate_for_pct(vol_percent)
+            self._hold(vol_percent, L_eff)
+        else:
+            held_rate = self._held_rate
+        dose0, daily0 = self.session_dose, self.daily_dose
+
+        # "tempo neste volume" segue o volume, não a variação do programa medido
+        vol_key = int(round_pct_ui(vol_percent))
+        level_changed = False
+        if self._last_L_for_timer is None:
+            self._last_L_for_timer = L_vol
+            self._last_vol_key = vol_key
+        else:
+            changed_db = abs(L_vol - self._last_L_for_timer) >= self.timer_epsilon_db
+            changed_pct = (self._last_vol_key is None) or (self._last_vol_key != vol_key)
+            if changed_db or changed_pct:
+                self._last_L_for_timer = L_vol
+                self._last_vol_key = vol_key
+                self.time_at_current_level = 0.0
+                level_changed = True
+
+        self.prev_session_dose = dose0
+        inc = held_rate * dt
+        self.session_dose = min(1.0, dose0 + inc)
+        self.daily_dose = min(10.0, daily0 + inc)
+
+        if self.session_dose < 1.0:
+            if not level_changed:
+                self.time_at_current_level += dt
+        else:
+            if not self.locked and self.hard_lock_enabled:
+                self._request_lock(res, prof.min_enforced_volume, LOCK_REASON_DAILY)
+            self.time_at_current_level = 0.0
+
+        allowed_sec = prof.allowed_for_pct(vol_percent) if program_db is None else prof.allowed(L_eff)
+        remaining_sec = (1.0 - self.session_dose) * allowed_sec if self.session_dose < 1.0 else 0.0
+        self._last_remaining_sec = remaining_sec
+        if self._ema_remaining_sec is None:
+            self._ema_remaining_sec = remaining_sec
+        else:
+            # alpha vale por passo de referência; independe do intervalo real entre passos
+            a = 1.0 - (1.0 - self.ema_alpha) ** (dt / self.ema_ref_dt)
+            self._ema_remaining_sec = a * remaining_sec + (1 - a) * self._ema_remaining_sec
+        ema_remaining = self._ema_remaining_sec
+
+        level_zone = risk_zone_from_level(L_eff)
+        self._apply_mode_rules(res, now, vol_percent, ema_remaining, allowed_sec, level_zone)
+
+        # Alertas DIÁRIOS
+        daily_pct = self.daily_dose * 100.0
+        if daily_pct >= 80.0 and not self.daily_warn_fired and daily_pct < 100.0:
+            self.daily_warn_fired = True
+            alerts.append(ALERT_DAILY_WARN)
+        if daily_pct >= 100.0 and not self.daily_block_fired:
+            self.daily_block_fired = True
+            alerts.append(ALERT_DAILY_BLOCK)
+            if self.hard_lock_enabled:
+                self._request_lock(res, prof.min_enforced_volume, LOCK_REASON_DAILY)
+
+        if not self.alert_50_fired and self.session_dose >= 0.5:
+            self.alert_50_fired = True
+            alerts.append(ALERT_DOSE_50)
+        if not self.alert_100_fired and self.session_dose >= 1.0:
+            self.alert_100_fired = True
+            alerts.append(ALERT_DOSE_100)
+            if self.hard_lock_enabled:
+                self._request_lock(res, prof.min_enforced_volume, LOCK_REASON_DAILY)
+
+        # Ações de volume (inclusive os bloqueios diários acima) valem a partir de agora
+        # para a integração do próximo intervalo
+        if res.lock_target is not None:
+            self._hold(res.lock_target)
+        elif res.volume_target is not None:
+            self._hold(res.volume_target)
+
+        res.dose_rate = self._held_rate
+        res.session_dose = self.session_dose
+        res.daily_dose = self.daily_dose
+        res.zone = risk_zone_from_dose(self.session_dose)
+        res.level_zone = level_zone
+        res.allowed_sec = allowed_sec
+        res.time_at_level = self.time_at_current_level
+        res.remaining_sec = ema_remaining
+
+        # Histórico (~1s): amostras a intervalos fixos dentro do intervalo integrado
+        if (now - self._last_hist_log) >= self.hist_interval:
+            res.samples = self._history_samples(now, dt, held_rate, dose0, daily0)
+        if pre_samples:
+            res.samples = pre_samples + list(res.samples)
+        return res
+
+    def _history_samples(self, now, dt, rate, dose0, daily0):
+        hi = self.hist_interval
+        start = now - dt
+        t = self._last_hist_log + hi
+        if t < start:
+            # lacuna (primeiro passo, pausa, suspensão): realinha no intervalo atual
+            t = min(now, start + hi)
+        samples = []
+        mode, vol, L = self.mode, self._held_vol, self._held_L
+        t0 = self.session_start_ts
+        while t <= now:
+            inc = rate * (t - start)
+            dose = min(1.0, dose0 + inc)
+            samples.append((t, t - t0, mode, vol, L, dose, risk_zone_from_dose(dose), min(10.0, daily0 + inc)))
+            self._last_hist_log = t
+            t += hi
+        return samples
+
+    # --- Previsão do próximo evento ---
+    def next_deadline(self, now):
+        """Próximo instante (time.time()) em que o estado muda de forma relevante.
+
+        Com o volume constante a dose cresce linearmente, então limiares (50/80/100%),
+        teto do prefixado e virada do dia são calculados em forma fechada.
+        """
+        deadline = self._day_end
+        if self.paused or self._held_vol is None:
+            return deadline
+        rate = self._held_rate
+        dose, daily = self.session_dose, self.daily_dose
+
+        def _at(target, cur):
+            # margem para o passo cair já depois do limiar, apesar do arredondamento
+            return now + (target - cur) / rate + DEADLINE_MARGIN if (cur < target and rate > 0) else deadline
+
+        if not self.alert_50_fired:
+            deadline = min(deadline, _at(0.5, dose))
+        if dose < 1.0:
+            deadline = min(deadline, _at(1.0, dose))
+        if not self.daily_warn_fired:
+            deadline = min(deadline, _at(0.8, daily))
+        if not self.daily_block_fired:
+            deadline = min(deadline, _at(1.0, daily))
+
+        if self.locked or dose >= 1.0:
+            return deadline
+        if self.mode == "prefixado":
+            thr = self.profile.prefix_cap_threshold(self._held_vol)
+            if thr is not None:
+                deadline = min(deadline, _at(thr, dose) if dose < thr else now + self.ema_ref_dt)
+        elif self.mode == "dinamico":
+            if self.dynamic_limiting_active:
+                deadline = min(deadline, self.last_dynamic_adjust_ts + self.dynamic_adjust_interval)
+            if self.dynamic_ceiling_pct is not None:
+                if self._dynamic_upper_ok_since is None:
+                    deadline = min(deadline, now + self.ema_ref_dt)
+                else:
+                    deadline = min(deadline, self._dynamic_upper_ok_since + self.dynamic_release_delay)
+            if self.dynamic_strategy == "reserva" and self._ema_remaining_sec is not None and not self.dynamic_limiting_active:
+                ema, raw = self._ema_remaining_sec, self._last_remaining_sec
+                if abs(ema - raw) > 1.0:
+                    # EMA ainda convergindo após mudança de nível
+                    deadline = min(deadline, now + self.ema_ref_dt)
+                else:
+                    reserve = max(self.dynamic_reserve_min_sec, min(self.dynamic_reserve_max_sec,
+                                  self.dynamic_reserve_fraction * self.profile.allowed_for_pct(self._held_vol)))
+                    # o tempo restante cai 1 s por segundo no mesmo nível
+                    lead = min(ema, raw) - (reserve - self.dynamic_hysteresis_sec)
+                    deadline = min(deadline, now + max(0.0, lead))
+        return max(now + DEADLINE_MARGIN, deadline)
+
+    # --- Regras dos modos ---
+    def _apply_mode_rules(self, res, now, vol_percent, ema_remaining, allowed_sec, level_zone):
+        if self.session_dose >= 1.0 or self.locked:
+            return
+        if self.mode == "prefixado":
+            cap = self.prefix_cap_exceeded(vol_percent)
+            if cap is not None:
+                safe_v = max(self.profile.min_enforced_volume, cap)
+                res.volume_target = safe_v
+                res.volume_hint = True
+                res.status = STATUS_ADJUSTED
+                if self.hard_lock_enabled and self.lock_on_autoadjust:
+                    self._request_lock(res, safe_v, LOCK_REASON_AUTOADJUST)
+            else:
+                res.status = STATUS_NORMAL
+        elif self.mode == "dinamico":
+            if self.dynamic_strategy == "reserva":
+                self._rules_reserve(res, now, vol_percent, ema_remaining, allowed_sec)
+            else:
+                self._rules_safe_zone(res, now, vol_percent, level_zone)
+
+    def _rules_reserve(self, res, now, vol_percent, ema_remaining, allowed_sec):
+        reserve_target = max(self.dynamic_reserve_min_sec,
+                             min(self.dynamic_reserve_max_sec, self.dynamic_reserve_fraction * allowed_sec))
+        lower = reserve_target - self.dynamic_hysteresis_sec
+        upper = reserve_target + self.dynamic_hysteresis_sec
+
+        if not self.dynamic_limiting_active and ema_remaining < lower:
+            self.dynamic_limiting_active = True
+            if self.dynamic_softlock_enabled:
+                self._lower_ceiling(self.quantize(vol_percent))
+                self._dynamic_upper_ok_since = None
+        elif self.dynamic_limiting_active and ema_remaining > upper:
+            self.dynamic_limiting_active = False
+
+        if self.dynamic_limiting_active:
+            if (now - self.last_dynamic_adjust_ts) >= self.dynamic_adjust_interval:
+                deficit = reserve_target - ema_remaining
+                if deficit < 60: step = self.dynamic_step_small
+                elif deficit < 300: step = self.dynamic_step_medium
+                else: step = self.dynamic_step_large
+                target = self.quantize(vol_percent - step)
+                if target < vol_percent - 0.099:
+                    self.dynamic_decay_active = True
+                    res.volume_target = target
+                    if self.dynamic_softlock_enabled:
+                        self._lower_ceiling(target)
+                self.last_dynamic_adjust_ts = now
+            res.status = STATUS_LIMITING
+        else:
+            self.dynamic_decay_active = False
+            if self.dynamic_softlock_enabled:
+                if ema_remaining > upper:
+                    if self._dynamic_upper_ok_since is None:
+                        self._dynamic_upper_ok_since = now
+                    elif (now - self._dynamic_upper_ok_since) >= self.dynamic_release_delay:
+                        self.dynamic_ceiling_pct = None
+                else:
+                    self._dynamic_upper_ok_since = None
+            res.status = STATUS_NORMAL
+
+    def _rules_safe_zone(self, res, now, vol_percent, level_zone):
+        if level_zone != "SEGURA":
+            if not self.dynamic_limiting_active:
+                self.dynamic_limiting_active = True
+                if self.dynamic_softlock_enabled:
+                    self._lower_ceiling(self.quantize(vol_percent))
+                    self._dynamic_upper_ok_since = None
+            if (now - self.last_dynamic_adjust_ts) >= self.dynamic_adjust_interval:
+                last_L = self._last_L_for_timer
+                if last_L is None or last_L < 90: step = self.dynamic_step_small
+                else: step = self.dynamic_step_medium if last_L < 95 else self.dynamic_step_large
+                new_v = max(self.profile.min_enforced_volume, vol_percent - step)
+                if abs(new_v - vol_percent) >= 0.1:
+                    res.volume_target = new_v
+                    if self.dynamic_softlock_enabled:
+                        self._lower_ceiling(new_v)
+                self.last_dynamic_adjust_ts = now
+            res.status = STATUS_LIMITING_SAFE
+        else:
+            self.dynamic_limiting_active = False
+            self.dynamic_decay_active = False
+            if self.dynamic_softlock_enabled:
+                if self._dynamic_upper_ok_since is None:
+                    self._dynamic_upper_ok_since = now
+                elif (now - self._dynamic_upper_ok_since) >= self.dynamic_release_delay:
+                    self.dynamic_ceiling_pct = None
+            res.status = STATUS_NORMAL
@@ -4,6 +4,9 @@ from .constants import (
 )
 
 class Gauge(tk.Canvas):
+    START = -210
+    EXTENT = 240
+
     def __init__(self, master, size=250, min_db=40, max_db=95, **kwargs):
         super().__init__(master, width=size, height=size, bg=DISCORD_SURFACE, highlightthickness=0, **kwargs)
         self.size = size
@@ -13,6 +16,18 @@ class Gauge(tk.Canvas):
         self.dose = 0.0
         self.min_db = float(min_db)
         self.max_db = float(max_db)
+        self._shown = None   # (texto dB, texto dose, cor, extensão) na tela
+
+        box = (self.center - self.radius, self.center - self.radius,
+               self.center + self.radius, self.center + self.radius)
+        self._bg_arc = self.create_arc(*box, start=self.START, extent=self.EXTENT,
+                                       style="arc", width=20, outline="#444")
+        self._fill_arc = self.create_arc(*box, start=self.START, extent=0,
+                                         style="arc", width=20, outline=DISCORD_SUCCESS)
+        self._db_text = self.create_text(self.center, self.center - 15, text="",
+                                         fill="white", font=("Segoe UI", 24, "bold"))
+        self._dose_text = self.create_text(self.center, self.center + 20, text="",
+                                           fill="white", font=("Segoe UI", 14, "bold"))
 
     def set_value(self, value, dose):
         self.value = float(value)
@@ -25,32 +40,56 @@ class Gauge(tk.Canvas):
         self._draw()
 
     def _draw(self):
-        self.delete("all")
-        start = -210
-        extent = 240
-
-        # fundo
-        self.create_arc(self.center - self.radius, self.center - self.radius,
-                        self.center + self.radius, self.center + self.radius,
-                        start=start, extent=extent, style="arc", width=20, outline="#444")
+        # valores na precisão exibida: mudanças abaixo dela não geram tráfego no Tk
+        db_text = f"{self.value:.1f} dB"
+        dose_text = f"Dose: {self.dose*100:.0f}%"
+        shown_value = round(self.value, 1)
 
         # cor por dB (visual)
-        if self.value < 70:
+        if shown_value < 70:
             color = DISCORD_SUCCESS
-        elif self.value < 85:
+        elif shown_value < 85:
             color = DISCORD_WARN
         else:
             color = DISCORD_ERROR
 
-        ratio = (self.value - self.min_db) / max(1e-9, (self.max_db - self.min_db))
+        ratio = (shown_value - self.min_db) / max(1e-9, (self.max_db - self.min_db))
         ratio = max(0.0, min(1.0, ratio))
-        fill_extent = extent * ratio
+        fill_extent = round(self.EXTENT * ratio, 1)
+
+        prev = self._shown or (None, None, None, None)
+        if db_text == prev[0] and dose_text == prev[1] and color == prev[2] and fill_extent == prev[3]:
+            return
+        if db_text != prev[0]:
+            self.itemconfigure(self._db_text, text=db_text)
+        if dose_text != prev[1]:
+            self.itemconfigure(self._dose_text, text=dose_text)
+        if color != prev[2]:
+            self.itemconfigure(self._fill_arc, outline=color)
+        if fill_extent != prev[3]:
+            self.itemconfigure(self._fill_arc, extent=fill_extent)
+        self._shown = (db_text, dose_text, color, fill_extent)
 
-        self.create_arc(self.center - self.radius, self.center - self.radius,
-                        self.center + self.radius, self.center + self.radius,
-                        start=start, extent=fill_extent, style="arc", width=20, outline=color)
+class ZoneBadge(tk.Canvas):
+    """Selo arredondado da zona de risco; itens persistentes, redesenha só se texto/cor mudarem."""
+    def __init__(self, master, width=160, height=64, radius=16, **kwargs):
+        super().__init__(master, width=width, height=height, bg=DISCORD_SURFACE, highlightthickness=0, **kwargs)
+        self._shown = None
+        r = radius; x1, y1, x2, y2 = 0, 0, width, height
+        self.create_arc(x1, y1, x1 + 2*r, y1 + 2*r, start=90, extent=90, tags="shape")
+        self.create_arc(x2 - 2*r, y1, x2, y1 + 2*r, start=0, extent=90, tags="shape")
+        self.create_arc(x1, y2 - 2*r, x1 + 2*r, y2, start=180, extent=90, tags="shape")
+        self.create_arc(x2 - 2*r, y2 - 2*r, x2, y2, start=270, extent=90, tags="shape")
+        self.create_rectangle(x1 + r, y1, x2 - r, y2, tags="shape")
+        self.create_rectangle(x1, y1 + r, x2, y2 - r, tags="shape")
+        self._text = self.create_text(width // 2, height // 2, text="", font=("Segoe UI", 18, "bold"), fill="white")
 
-        self.create_text(self.center, self.center - 15, text=f"{self.value:.1f} dB",
-                         fill="white", font=("Segoe UI", 24, "bold"))
-        self.create_text(self.center, self.center + 20, text=f"Dose: {self.dose*100:.0f}%",
-                         fill="white", font=("Segoe UI", 14, "bold"))
+    def set(self, text, color):
+        prev = self._shown or (None, None)
+        if (text, color) == prev:
+            return
+        if color != prev[1]:
+            self.itemconfigure("shape", fill=color, outline=color)
+        if text != prev[0]:
+            self.itemconfigure(self._text, text=text)
+        self._shown = (text, color)
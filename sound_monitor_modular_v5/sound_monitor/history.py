@@ -0,0 +1,89 @@
+import time
+from array import array
+from .ringbuf import ColumnRing
+
+MODES = ("prefixado", "dinamico")
+ZONES = ("SEGURA", "ATENÇÃO", "PERIGO")
+_MODE_CODE = {m: i for i, m in enumerate(MODES)}
+_ZONE_CODE = {z: i for i, z in enumerate(ZONES)}
+
+# Colunas do histórico (ordem = ordem das amostras do DoseEngine)
+COLUMNS = (
+    ("ts", "d"), ("t_session", "d"), ("mode", "b"), ("vol_percent", "d"),
+    ("L", "d"), ("dose", "d"), ("zone", "b"), ("daily", "d"),
+)
+
+def encode_sample(sample):
+    """Amostra do DoseEngine -> tupla com modo/zona codificados (ordem de COLUMNS)."""
+    ts, t_session, mode, vol, L, dose, zone, daily = sample
+    return (ts, t_session, _MODE_CODE.get(mode, 0), vol, L, dose, _ZONE_CODE.get(zone, 0), daily)
+
+class _IsoFormatter:
+    """timestamp -> 'YYYY-MM-DD HH:MM:SS' com cache do prefixo por minuto."""
+    def __init__(self):
+        self._minute = None
+        self._prefix = ""
+
+    def __call__(self, ts):
+        s = int(ts)
+        minute = s // 60
+        if minute != self._minute:
+            self._minute = minute
+            self._prefix = time.strftime("%Y-%m-%d %H:%M:", time.localtime(minute * 60))
+        return f"{self._prefix}{s % 60:02d}"
+
+class HistoryStore(ColumnRing):
+    """Histórico da sessão em colunas tipadas, com descarte O(1) do mais antigo.
+
+    Modo e zona ficam como códigos pequenos; o texto ISO do timestamp só é
+    gerado na exportação.
+    """
+    def __init__(self, capacity=24 * 3600):
+        super().__init__(COLUMNS, capacity)
+
+    def append_sample(self, sample):
+        self.append(*encode_sample(sample))
+
+    def snapshot(self):
+        """Cópia contígua e consistente (para exportar enquanto o monitor segue gravando)."""
+        with self.lock:
+            n = len(self)
+            cols = tuple(self._copy_column(name) for name in self.names)
+        snap = HistoryStore(max(1, n))
+        if n:
+            snap._cols = cols
+            snap._len = n
+        return snap
+
+    @classmethod
+    def from_samples(cls, samples):
+        """Store já cheio a partir de amostras do DoseEngine (carga em bloco, sem append)."""
+        rows = [encode_sample(s) for s in samples]
+        store = cls(max(1, len(rows)))
+        if rows:
+            store._cols = tuple(array(tc, col) for (_, tc), col in zip(COLUMNS, zip(*rows)))
+            store._len = len(rows)
+        return store
+
+    def _copy_column(self, name):
+        out = array(self._cols[self._index[name]].typecode)
+        for seg in self.segments(name):
+            out.frombytes(seg.cast("B"))
+        return out
+
+    def column(self, name):
+        """Coluna inteira como `array` (cópia contígua, na ordem cronológica)."""
+        with self.lock:
+            return self._copy_column(name)
+
+    def iter_rows(self, start=0, stop=None):
+        """Linhas decodificadas: (ts_iso, t_sessao, modo, volume, L, dose, zona, diária)."""
+        iso = _IsoFormatter()
+        for ts, t_session, mode, vol, L, dose, zone, daily in self.rows(start, stop):
+            yield (iso(ts), t_session, MODES[mode], vol, L, dose, ZONES[zone], daily)
+
+    def iter_records(self, start=0, stop=None):
+        """Linhas como dicts no formato antigo de `app.history` (compatibilidade)."""
+        for ts_iso, t_session, mode, vol, L, dose, zone, daily in self.iter_rows(start, stop):
+            yield {"ts_iso": ts_iso, "t_session": t_session, "mode": mode, "vol_percent": vol,
+                   "L": L, "dose": dose, "zone": zone, "daily": daily}
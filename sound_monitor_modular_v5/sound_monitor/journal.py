@@ -0,0 +1,194 @@
+import os, struct, threading, time
+from collections import deque
+from pathlib import Path
+from .persistence import data_dir
+from .history import encode_sample, MODES, ZONES
+from .utils import day_bounds
+
+# Segmento: cabeçalho (magic + tamanho do registro) seguido de registros fixos
+MAGIC = b"TSJ1"
+HEADER = struct.Struct("<4sI")
+# ts, t_sessao, modo, volume, L, dose, zona, diária (mesma ordem de history.COLUMNS)
+RECORD = struct.Struct("<ddbdddbd")
+SUFFIX = ".tsj"
+READ_CHUNK = 4096   # registros por leitura sequencial
+
+def journal_dir(base=None) -> Path:
+    d = Path(base) if base is not None else data_dir() / "journal"
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+def segment_paths(base=None):
+    """Segmentos diários em ordem cronológica."""
+    return sorted(journal_dir(base).glob("*" + SUFFIX))
+
+def _open_segment(path):
+    """Abre para append; cria o cabeçalho ou corta um registro parcial deixado por queda."""
+    fh = open(path, "a+b")
+    fh.seek(0, os.SEEK_END)
+    size = fh.tell()
+    if size < HEADER.size:
+        fh.truncate(0)
+        fh.write(HEADER.pack(MAGIC, RECORD.size))
+    else:
+        tail = (size - HEADER.size) % RECORD.size
+        if tail:
+            fh.truncate(size - tail)
+    fh.seek(0, os.SEEK_END)
+    return fh
+
+def read_segment(path, decode=False):
+    """Leitura sequencial em blocos; ignora um registro final incompleto.
+
+    Devolve tuplas na ordem de `history.COLUMNS` (modo/zona como códigos, ou
+    texto se `decode`).
+    """
+    with open(path, "rb") as fh:
+        head = fh.read(HEADER.size)
+        if len(head) < HEADER.size:
+            return
+        magic, rec_size = HEADER.unpack(head)
+        if magic != MAGIC or rec_size != RECORD.size:
+            raise ValueError(f"segmento de journal inválido: {path}")
+        while True:
+            buf = fh.read(READ_CHUNK * RECORD.size)
+            usable = len(buf) - len(buf) % RECORD.size
+            if not usable:
+                return
+            if decode:
+                for ts, t, mode, vol, L, dose, zone, daily in RECORD.iter_unpack(buf[:usable]):
+                    yield (ts, t, MODES[mode], vol, L, dose, ZONES[zone], daily)
+            else:
+                yield from RECORD.iter_unpack(buf[:usable])
+            if usable < len(buf):
+                return
+
+def read_journal(base=None, day=None, decode=False):
+    """Todos os registros (ou só os do dia 'YYYY-MM-DD'), em ordem."""
+    for path in segment_paths(base):
+        if day is None or path.stem == day:
+            yield from read_segment(path, decode)
+
+class SessionJournal:
+    """Journal append-only do histórico, gravado por uma thread própria.
+
+    `append` só enfileira (nunca toca o disco); a thread grava em lotes a cada
+    `flush_interval` e faz fsync no máximo a cada `fsync_interval`. Um segmento
+    por dia local; registros de tamanho fixo, então uma queda perde no máximo o
+    que ainda não foi sincronizado e o final parcial é descartado ao reabrir.
+    """
+    def __init__(self, base=None, flush_interval=1.0, fsync_interval=10.0, max_pending=100_000):
+        self.base = base
+        self.flush_interval = float(flush_interval)
+        self.fsync_interval = float(fsync_interval)
+        self.max_pending = int(max_pending)
+        self._cond = threading.Condition()
+        self._pending = deque()
+        self._stop = False
+        self._thread = None
+        self._fh = None
+        self._day_key = None
+        self._day_end = 0.0
+        self._last_fsync = 0.0
+        self._dirty = False
+        self.written = 0
+        self.dropped = 0
+        self.fsyncs = 0
+        self.last_error = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="journal", daemon=True)
+            self._thread.start()
+        return self
+
+    def append(self, sample):
+        rec = RECORD.pack(*encode_sample(sample))
+        with self._cond:
+            if len(self._pending) >= self.max_pending:
+                # disco travado: descarta o mais antigo em vez de crescer sem limite
+                self._pending.popleft()
+                self.dropped += 1
+            self._pending.append((sample[0], rec))
+
+    def flush(self):
+        """Pede uma gravação imediata (não espera terminar)."""
+        with self._cond:
+            self._cond.notify()
+
+    def close(self, timeout=5.0):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        else:
+            self._drain(final=True)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stop:
+                    self._cond.wait(self.flush_interval)
+                stop = self._stop
+            self._drain(final=stop)
+            if stop:
+                return
+
+    def _drain(self, final=False):
+        with self._cond:
+            batch, self._pending = self._pending, deque()
+        try:
+            if batch:
+                self._write(batch)
+            now = time.monotonic()
+            if self._dirty and (final or now - self._last_fsync >= self.fsync_interval):
+                self._sync()
+            if final and self._fh is not None:
+                self._fh.close()
+                self._fh = None
+        except OSError as e:
+            self.last_error = str(e)
+            self.dropped += len(batch)
+            try:
+                if self._fh is not None:
+                    self._fh.close()
+            except OSError:
+                pass
+            self._fh = None   # reabre (e corta registro parcial) no próximo lote
+
+    def _write(self, batch):
+        chunk = []
+        for ts, rec in batch:
+            if self._fh is None or ts >= self._day_end:
+                self._emit(chunk); chunk = []
+                self._rotate(ts)
+            chunk.append(rec)
+        self._emit(chunk)
+
+    def _emit(self, chunk):
+        if chunk:
+            self._fh.write(b"".join(chunk))
+            self._fh.flush()
+            self.written += len(chunk)
+            self._dirty = True
+
+    def _rotate(self, ts):
+        day_key, day_end = day_bounds(ts)
+        if self._fh is not None and day_key == self._day_key:
+            self._day_end = day_end
+            return
+        if self._fh is not None:
+            self._sync()
+            self._fh.close()
+        self._day_key, self._day_end = day_key, day_end
+        self._fh = _open_segment(journal_dir(self.base) / (day_key + SUFFIX))
+
+    def _sync(self):
+        if self._fh is not None:
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self.fsyncs += 1
+        self._last_fsync = time.monotonic()
+        self._dirty = False
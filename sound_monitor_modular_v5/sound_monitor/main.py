@@ -2,10 +2,13 @@ import customtkinter as ctk
 # Permite rodar tanto como pacote (-m sound_monitor.main) quanto como script (python sound_monitor/main.py)
 try:
     from .app import SoundMonitorApp  # quando executado como pacote
+    from .daemon import DaemonClient
 except ImportError:  # quando executado diretamente
     from sound_monitor.app import SoundMonitorApp  # fallback absoluto
+    from sound_monitor.daemon import DaemonClient
 
 if __name__ == "__main__":
     ctk.set_appearance_mode("dark")
-    app = SoundMonitorApp()
+    # com um daemon no ar a janela se anexa a ele em vez de rodar um segundo motor
+    app = SoundMonitorApp(client=DaemonClient.connect())
     app.mainloop()
@@ -0,0 +1,410 @@
+# Medição do nível real de saída: blocos de áudio (loopback ou sinal sintético)
+# passam pela ponderação A e viram Leq por intervalo, que substitui o nível
+# derivado do slider na integração de dose.
+import math, os, threading, time
+from time import perf_counter_ns
+
+_NUMPY_AVAILABLE = False
+try:
+    import numpy as np
+    _NUMPY_AVAILABLE = True
+except Exception:
+    _NUMPY_AVAILABLE = False
+
+_SOUNDCARD_AVAILABLE = False
+try:
+    import soundcard as _sc
+    _SOUNDCARD_AVAILABLE = True
+except Exception:
+    _SOUNDCARD_AVAILABLE = False
+
+def has_numpy() -> bool:
+    return _NUMPY_AVAILABLE
+
+def has_soundcard() -> bool:
+    return _SOUNDCARD_AVAILABLE
+
+def _require_numpy():
+    if not _NUMPY_AVAILABLE:
+        raise RuntimeError("numpy não disponível")
+
+SAMPLE_RATE = 48000
+BLOCK_SEC = 0.1              # duração de cada bloco lido da fonte
+CHUNK = 256                  # amostras por passo do filtro em bloco
+REF_DBFS = -18.0             # nível de programa (dBFS, A) que corresponde ao mapa do volume
+FLOOR_DBFS = -120.0
+STALE_SEC = 2.0              # sem blocos há mais que isto: volta para o nível do slider
+REOPEN_SEC = 1.0
+
+# Polos da curva A (IEC 61672), Hz
+_A_POLES_HZ = (20.598997, 107.65265, 737.86223, 12194.217)
+
+def a_weighting_sos(fs=SAMPLE_RATE):
+    """Ponderação A em 3 biquads (transformação bilinear), ganho 0 dB em 1 kHz.
+
+    Cada seção é (b0, b1, b2, a1, a2) com a0 = 1: zeros em z=1 (4) e z=-1 (2);
+    polos duplos de 20,6 Hz e 12,2 kHz e simples de 107,7 Hz e 737,9 Hz. O polo
+    de 12,2 kHz é pré-distorcido; a 48 kHz o erro fica abaixo de 0,7 dB até
+    12,5 kHz (sem isso passa de 2,5 dB).
+    """
+    k = 2.0 * fs
+    f1, f2, f3, f4 = _A_POLES_HZ
+    p1, p2, p3 = ((k - 2 * math.pi * f) / (k + 2 * math.pi * f) for f in (f1, f2, f3))
+    w4 = k * math.tan(math.pi * min(f4, 0.45 * fs) / fs)
+    p4 = (k - w4) / (k + w4)
+    sos = [
+        [1.0, -2.0, 1.0, -2.0 * p1, p1 * p1],
+        [1.0, -2.0, 1.0, -(p2 + p3), p2 * p3],
+        [1.0, 2.0, 1.0, -2.0 * p4, p4 * p4],
+    ]
+    w = 2 * math.pi * 1000.0 / fs
+    z = complex(math.cos(w), math.sin(w))
+    h = 1.0
+    for b0, b1, b2, a1, a2 in sos:
+        h *= (b0 + b1 / z + b2 / z ** 2) / (1.0 + a1 / z + a2 / z ** 2)
+    g = 1.0 / abs(h)
+    sos[0] = [c * g for c in sos[0][:3]] + sos[0][3:]
+    return sos
+
+def sos_response_db(sos, freq, fs=SAMPLE_RATE):
+    """Resposta (dB) das seções em `freq` Hz; serve para conferir o projeto."""
+    w = 2 * math.pi * float(freq) / fs
+    z = complex(math.cos(w), math.sin(w))
+    h = 1.0
+    for b0, b1, b2, a1, a2 in sos:
+        h *= (b0 + b1 / z + b2 / z ** 2) / (1.0 + a1 / z + a2 / z ** 2)
+    return 20.0 * math.log10(max(abs(h), 1e-300))
+
+class BlockFilter:
+    """Cascata de biquads com estado, aplicada `chunk` amostras por vez com álgebra matricial.
+
+    As seções viram um único sistema em espaço de estados (2 estados por
+    seção). Para cada trecho de `chunk` amostras a saída é
+    T·x + O·s (T = Toeplitz da resposta ao impulso, O = resposta ao estado) e o
+    estado avança com s' = A^chunk·s + G·x. Todos os trechos de um bloco são
+    multiplicados de uma vez; só a propagação do estado (6 valores por canal)
+    fica num laço curto em Python. O resultado é o mesmo da filtragem amostra
+    a amostra, e o estado segue de um bloco para o outro.
+    """
+    def __init__(self, sos, chunk=CHUNK):
+        _require_numpy()
+        self.chunk = m = int(chunk)
+        A, B, C, D = self._state_space(sos)
+        n = A.shape[0]
+        powers = [np.eye(n)]
+        for _ in range(m):
+            powers.append(A @ powers[-1])
+        self._powers = powers
+        self._O = np.array([C @ powers[i] for i in range(m)])                  # (m, n)
+        self._G = np.stack([powers[m - 1 - i] @ B for i in range(m)], axis=1)  # (n, m)
+        h = np.empty(m)
+        h[0] = D
+        h[1:] = self._O[:-1] @ B
+        idx = np.arange(m)
+        lag = idx[:, None] - idx[None, :]
+        self._T = np.where(lag >= 0, h[np.clip(lag, 0, m - 1)], 0.0)          # (m, m)
+        self._Tt = np.ascontiguousarray(self._T.T)
+        self._Gt = np.ascontiguousarray(self._G.T)
+        self._Ot = np.ascontiguousarray(self._O.T)
+        self._Amt = np.ascontiguousarray(powers[m].T)
+        self._n = n
+        self._state = None
+
+    @staticmethod
+    def _state_space(sos):
+        # forma direta II transposta por seção; a saída de uma alimenta a próxima
+        A = np.zeros((0, 0)); B = np.zeros(0); C = np.zeros(0); D = 1.0
+        for b0, b1, b2, a1, a2 in sos:
+            As = np.array([[-a1, 1.0], [-a2, 0.0]])
+            Bs = np.array([b1 - a1 * b0, b2 - a2 * b0])
+            Cs = np.array([1.0, 0.0])
+            k = A.shape[0]
+            An = np.zeros((k + 2, k + 2))
+            An[:k, :k] = A
+            An[k:, :k] = np.outer(Bs, C)
+            An[k:, k:] = As
+            A = An
+            B = np.concatenate([B, Bs * D])
+            C = np.concatenate([b0 * C, Cs])
+            D = b0 * D
+        return A, B, C, D
+
+    def reset(self):
+        self._state = None
+
+    def process(self, x):
+        """Filtra um bloco (amostras,) ou (amostras, canais); devolve o mesmo formato."""
+        x = np.asarray(x, dtype=np.float64)
+        mono = x.ndim == 1
+        xc = x[None, :] if mono else x.T                         # (canais, amostras)
+        ch, total = xc.shape
+        if self._state is None or self._state.shape[0] != ch:
+            self._state = np.zeros((ch, self._n))
+        m = self.chunk
+        k = total // m
+        full = k * m
+        y = np.empty((ch, total))
+        s = self._state
+        if k:
+            X = xc[:, :full].reshape(ch, k, m)
+            W = X @ self._Gt                                     # (canais, k, n)
+            S = np.empty((ch, k, self._n))
+            Am = self._Amt
+            for j in range(k):
+                S[:, j] = s
+                s = s @ Am + W[:, j]
+            y[:, :full] = (X @ self._Tt + S @ self._Ot).reshape(ch, full)
+        r = total - full
+        if r:
+            xr = xc[:, full:]
+            y[:, full:] = xr @ self._Tt[:r, :r] + s @ self._Ot[:, :r]
+            s = s @ self._powers[r].T + xr @ self._Gt[m - r:]
+        self._state = s
+        return y[0] if mono else y.T
+
+class LevelMeter:
+    """Leq ponderado A do áudio de saída, acumulado em energia entre leituras.
+
+    Uma thread lê blocos da fonte e filtra; `take()` devolve o nível do programa
+    desde a leitura anterior em dB relativos a `ref_dbfs` (o motor soma ao
+    nível do volume atual), ou None se a fonte parou de entregar blocos.
+    """
+    def __init__(self, source, ref_dbfs=REF_DBFS, chunk=CHUNK, diag=None):
+        _require_numpy()
+        self.source = source
+        self.ref_dbfs = float(ref_dbfs)
+        self.diag = diag
+        self._filter = BlockFilter(a_weighting_sos(source.sample_rate), chunk)
+        self._lock = threading.Lock()
+        self._energy = 0.0
+        self._frames = 0
+        self._last_block_at = 0.0
+        self.last_dbfs = None
+        self.blocks = 0
+        self.frames = 0
+        self.busy_ns = 0
+        self.errors = 0
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="level-meter", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def feed(self, block):
+        """Filtra um bloco e acumula a energia (chamado pela thread ou direto em testes)."""
+        t = perf_counter_ns()
+        y = self._filter.process(block)
+        n = y.shape[0]
+        # energia por quadro: média dos canais
+        energy = float(np.vdot(y, y)) * n / y.size if n else 0.0
+        dt = perf_counter_ns() - t
+        if n:
+            ms = energy / n
+            dbfs = 10.0 * math.log10(ms) if ms > 0 else FLOOR_DBFS
+            with self._lock:
+                self._energy += energy
+                self._frames += n
+                self._last_block_at = time.monotonic()
+                self.last_dbfs = max(FLOOR_DBFS, dbfs)
+                self.blocks += 1
+                self.frames += n
+                self.busy_ns += dt
+        if self.diag is not None:
+            self.diag.record("meter.block", dt)
+
+    def take(self, now=None):
+        """Nível do programa (dB acima de `ref_dbfs`) desde a última chamada; None sem dados."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            energy, frames = self._energy, self._frames
+            self._energy, self._frames = 0.0, 0
+            fresh = (now - self._last_block_at) <= STALE_SEC
+        if not frames or not fresh:
+            return None
+        ms = energy / frames
+        dbfs = max(FLOOR_DBFS, 10.0 * math.log10(ms)) if ms > 0 else FLOOR_DBFS
+        return dbfs - self.ref_dbfs
+
+    def stats(self):
+        with self._lock:
+            audio_sec = self.frames / float(self.source.sample_rate)
+            busy = self.busy_ns / 1e9
+            return {
+                "source": type(self.source).__name__, "blocks": self.blocks, "audio_sec": audio_sec,
+                "busy_sec": busy, "core_fraction": (busy / audio_sec) if audio_sec else 0.0,
+                "last_dbfs": self.last_dbfs, "errors": self.errors, "last_error": self.last_error,
+            }
+
+    def _run(self):
+        src = self.source
+        while not self._stop.is_set():
+            try:
+                src.open()
+                while not self._stop.is_set():
+                    block = src.read()
+                    if block is None:
+                        return
+                    self.feed(block)
+            except Exception as e:
+                # dispositivo trocado/removido: reabre a fonte após uma pausa
+                self.errors += 1
+                self.last_error = str(e)
+                self._stop.wait(REOPEN_SEC)
+            finally:
+                try:
+                    src.close()
+                except Exception:
+                    pass
+
+class SyntheticSource:
+    """Sinal de teste: senoide (ou ruído branco com `freq=0`) em `level_dbfs` RMS.
+
+    `segments` é uma lista de (segundos, freq, nível) tocada em sequência e
+    repetida; `realtime=False` entrega os blocos sem esperar (testes, bench).
+    """
+    def __init__(self, freq=1000.0, level_dbfs=REF_DBFS, sample_rate=SAMPLE_RATE, channels=2,
+                 block_sec=BLOCK_SEC, segments=None, realtime=True, seed=None):
+        _require_numpy()
+        self.sample_rate = int(sample_rate)
+        self.channels = int(channels)
+        self.block = max(1, int(round(block_sec * self.sample_rate)))
+        self.segments = list(segments) if segments else [(float("inf"), float(freq), float(level_dbfs))]
+        self.realtime = realtime
+        self._rng = np.random.default_rng(seed)
+        self._seg = 0
+        self._seg_left = None
+        self._phase = 0.0
+        self._next_at = None
+
+    def open(self):
+        self._next_at = time.monotonic()
+
+    def close(self):
+        pass
+
+    def read(self):
+        if self.realtime:
+            self._next_at += self.block / self.sample_rate
+            delay = self._next_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        out = np.empty((self.block, self.channels))
+        pos = 0
+        while pos < self.block:
+            dur, freq, level = self.segments[self._seg]
+            if self._seg_left is None:
+                self._seg_left = int(round(dur * self.sample_rate)) if math.isfinite(dur) else None
+            n = self.block - pos if self._seg_left is None else min(self.block - pos, self._seg_left)
+            out[pos:pos + n] = self._generate(n, freq, level)[:, None]
+            pos += n
+            if self._seg_left is not None:
+                self._seg_left -= n
+                if self._seg_left <= 0:
+                    self._seg = (self._seg + 1) % len(self.segments)
+                    self._seg_left = None
+                    self._phase = 0.0
+        return out
+
+    def _generate(self, n, freq, level):
+        rms = 10.0 ** (level / 20.0) if level > FLOOR_DBFS else 0.0
+        if freq <= 0:
+            return self._rng.standard_normal(n) * rms
+        w = 2 * math.pi * freq / self.sample_rate
+        x = np.sin(self._phase + w * np.arange(n)) * (rms * math.sqrt(2.0))
+        self._phase = (self._phase + w * n) % (2 * math.pi)
+        return x
+
+class LoopbackSource:
+    """Captura em loopback do alto-falante padrão (WASAPI via `soundcard`).
+
+    O loopback recebe a mixagem antes do volume do endpoint, por isso o motor
+    soma o nível do programa ao nível mapeado do volume. Reaberta a cada erro,
+    segue o dispositivo padrão atual.
+    """
+    def __init__(self, sample_rate=SAMPLE_RATE, block_sec=BLOCK_SEC):
+        if not _SOUNDCARD_AVAILABLE:
+            raise RuntimeError("soundcard não disponível")
+        self.sample_rate = int(sample_rate)
+        self.block = max(1, int(round(block_sec * self.sample_rate)))
+        self._ctx = None
+        self._rec = None
+
+    def open(self):
+        mic = _sc.get_microphone(str(_sc.default_speaker().name), include_loopback=True)
+        self._ctx = mic.recorder(samplerate=self.sample_rate, blocksize=self.block)
+        self._rec = self._ctx.__enter__()
+
+    def read(self):
+        return self._rec.record(numframes=self.block)
+
+    def close(self):
+        ctx, self._ctx, self._rec = self._ctx, None, None
+        if ctx is not None:
+            ctx.__exit__(None, None, None)
+
+# --- Fontes plugáveis (mesmo esquema dos backends de áudio) ---
+SOURCES = {}
+
+def register_source(name, factory):
+    """`factory(options)` devolve uma fonte com sample_rate, open(), read() e close()."""
+    SOURCES[name] = factory
+
+def _parse_options(options):
+    kw = {}
+    for part in filter(None, (p.strip() for p in (options or "").split(","))):
+        key, _, value = part.partition("=")
+        kw[key.strip()] = value.strip()
+    return kw
+
+def _synth_source(options):
+    kw = _parse_options(options)
+    names = {"freq": "freq", "level": "level_dbfs", "rate": "sample_rate", "channels": "channels",
+             "block": "block_sec", "seed": "seed"}
+    args = {}
+    for key, value in kw.items():
+        if key == "ref":
+            continue
+        if key not in names:
+            raise ValueError(f"opção desconhecida da fonte sintética: {key}")
+        args[names[key]] = int(value) if key in ("rate", "channels", "seed") else float(value)
+    return SyntheticSource(**args)
+
+def _loopback_source(options):
+    kw = _parse_options(options)
+    args = {}
+    if "rate" in kw:
+        args["sample_rate"] = int(kw["rate"])
+    if "block" in kw:
+        args["block_sec"] = float(kw["block"])
+    return LoopbackSource(**args)
+
+register_source("synth", _synth_source)
+register_source("loopback", _loopback_source)
+
+def make_meter(spec=None, diag=None):
+    """Medidor pela especificação ('loopback', 'synth:freq=1000,level=-18', 'off').
+
+    Padrão: TSM_METER; vazio ou 'off' desliga (nível vem do slider). A opção
+    `ref=<dBFS>` muda a calibração. Devolve None quando desligado.
+    """
+    if spec is None:
+        spec = os.environ.get("TSM_METER", "")
+    spec = spec.strip()
+    if not spec or spec == "off":
+        return None
+    name, _, options = spec.partition(":")
+    factory = SOURCES.get(name.strip())
+    if factory is None:
+        raise ValueError(f"fonte de medição desconhecida: {name} (use um de {', '.join(SOURCES)})")
+    ref = float(_parse_options(options).get("ref", REF_DBFS))
+    return LevelMeter(factory(options), ref_dbfs=ref, diag=diag)
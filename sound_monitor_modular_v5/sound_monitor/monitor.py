@@ -1,282 +1,243 @@
 import time
-from datetime import datetime
-from tkinter import messagebox
-from .utils import (
-    map_percent_to_db, dose_increment_per_second, allowed_time_seconds_for_level,
-    risk_zone_from_dose, risk_zone_from_level, fmt_hms, round_pct_ui
-)
+from .utils import fmt_hms, round_pct_ui
 from .constants import DISCORD_SUCCESS, DISCORD_WARN, DISCORD_ERROR
-from .charting import draw_history_chart
 from .com_guard import ComGuard
+from .engine import (
+    CHECKPOINT_INTERVAL, ALERT_NEW_DAY, ALERT_DAILY_WARN, ALERT_DAILY_BLOCK, ALERT_DOSE_50, ALERT_DOSE_100,
+    STATUS_NORMAL, STATUS_PAUSED, STATUS_ADJUSTED, STATUS_LIMITING, STATUS_LIMITING_SAFE
+)
+
+# (tipo, título, texto); o host decide como mostrar (messagebox na janela, evento no daemon)
+_ALERTS = {
+    ALERT_NEW_DAY: ("info", "Novo dia", "Dose diária reiniciada."),
+    ALERT_DAILY_WARN: ("warning", "Atenção diária", "Dose diária ≥ 80%."),
+    ALERT_DAILY_BLOCK: ("error", "Bloqueio diário", "Dose diária atingiu 100%. Volume mínimo imposto."),
+    ALERT_DOSE_50: ("warning", "Atenção", "Você atingiu 50% da dose diária."),
+    ALERT_DOSE_100: ("error", "Risco crítico", "Limite de dose diária ultrapassado!"),
+}
+
+_STATUS = {
+    STATUS_NORMAL: ("Status: normal", "#bbb"),
+    STATUS_PAUSED: ("Status: pausado", DISCORD_WARN),
+    STATUS_ADJUSTED: ("Status: ajustado p/ seguro", "#F0B232"),
+    STATUS_LIMITING: ("Status: auto-limitando", "#F0B232"),
+    STATUS_LIMITING_SAFE: ("Status: auto-limitando (até zona segura)", "#F0B232"),
+}
+
+def zone_color(zone):
+    return DISCORD_SUCCESS if zone == "SEGURA" else DISCORD_WARN if zone == "ATENÇÃO" else DISCORD_ERROR
 
 def start_monitor_thread(app):
     import threading
+    app._audio.subscribe(lambda pct: _on_system_volume(app, pct))
     t = threading.Thread(target=lambda: _monitor_loop(app), daemon=True)
     t.start()
 
+# Cadências (s) que não vêm do motor
+VISIBLE_INTERVAL = 10.0      # janela visível: gráfico e resumo; os relógios de 1 s a própria UI extrapola (clock_view)
+CHART_INTERVAL = 0.8
+SYNC_INTERVAL = 0.5          # leitura do volume do sistema (pelo AudioActor) com a janela visível
+SYNC_INTERVAL_HIDDEN = 3.0
+METER_INTERVAL = 0.5         # com medição real o nível muda sem aviso; integra em passos curtos
+
 def _monitor_loop(app):
+    eng = app.engine
+    sched = app._scheduler
+    diag = app.diag
+    eng.max_dt = sched.max_sleep + 1.0
     with ComGuard():
         while not app._stop_event.is_set():
+            now = time.time()
+            clk = diag.clock("tick.")
             try:
-                if app.locked:
-                    if abs(float(app._vol_cache) - float(app.lock_target_pct or 0)) > 0.1:
-                        app._on_ui(lambda: app._safe_set_slider(app.lock_target_pct))
-                    app._apply_system_volume_from_slider(show_install_hint=False)
-
-                vol_percent = float(app._vol_cache)
-                now = time.time()
-                dt = now - app._last_update
-                dt = max(0.0, min(dt, 1.0))
-                app._last_update = now
-
-                now_dt = datetime.now()
-                _roll_day_if_needed(app, now_dt)
-
-                L_eff = map_percent_to_db(vol_percent, app.cfg)
-
-                if app.paused:
-                    app._on_ui(lambda: app.gauge.set_value(L_eff, app.session_dose))
-                    app._on_ui(lambda: app.general_status.config(text="Status: pausado", fg=DISCORD_WARN))
-                    app._apply_system_volume_from_slider(show_install_hint=False)
-                    time.sleep(0.1 if app.locked else 0.2)
-                    continue
-
-                vol_key = int(round_pct_ui(app._vol_cache))
-                if app._last_L_for_timer is None:
-                    app._last_L_for_timer = L_eff
-                    app._last_vol_key = vol_key
-                else:
-                    changed_db = abs(L_eff - app._last_L_for_timer) >= app.timer_epsilon_db
-                    changed_pct = (app._last_vol_key is None) or (app._last_vol_key != vol_key)
-                    if changed_db or changed_pct:
-                        app._last_L_for_timer = L_eff
-                        app._last_vol_key = vol_key
-                        app.time_at_current_level = 0.0
-
-                app.prev_session_dose = app.session_dose
-                inc = dose_increment_per_second(L_eff, app.cfg) * dt
-                app.session_dose = min(1.0, app.session_dose + inc)
-                app.daily_dose = min(10.0, app.daily_dose + inc)
-
-                if app.session_dose < 1.0:
-                    app.time_at_current_level += dt
-                else:
-                    if not app.locked and app.hard_lock_enabled:
-                        app._on_ui(lambda: app._lock_volume(app.cfg["min_enforced_volume"], reason="limite diário"))
-                    app.time_at_current_level = 0.0
-
-                allowed_sec = allowed_time_seconds_for_level(L_eff, app.cfg)
-                time_str = fmt_hms(allowed_sec)
-                time_cur_str = fmt_hms(app.time_at_current_level)
-                remaining_sec = (1.0 - app.session_dose) * allowed_sec if app.session_dose < 1.0 else 0.0
-
-                if app._ema_remaining_sec is None:
-                    app._ema_remaining_sec = remaining_sec
-                else:
-                    a = app._ema_alpha
-                    app._ema_remaining_sec = a * remaining_sec + (1 - a) * app._ema_remaining_sec
-                ema_remaining = app._ema_remaining_sec
-                remaining_str = fmt_hms(ema_remaining)
-
-                zone = risk_zone_from_dose(app.session_dose)
-                zone_color = DISCORD_SUCCESS if zone == "SEGURA" else DISCORD_WARN if zone == "ATENÇÃO" else DISCORD_ERROR
-                level_zone = risk_zone_from_level(L_eff)
-
-                # regras dos modos
-                _apply_mode_rules(app, vol_percent, ema_remaining, allowed_sec, level_zone)
-
-                # Alertas DIÁRIOS
-                daily_pct = app.daily_dose * 100.0
-                if daily_pct >= 80.0 and not app.daily_warn_fired and daily_pct < 100.0:
-                    app.daily_warn_fired = True
-                    app._on_ui(lambda: messagebox.showwarning("Atenção diária", "Dose diária ≥ 80%."))
-                if 80.0 <= daily_pct < 100.0:
-                    app._on_ui(lambda: app.period_label.config(fg=DISCORD_WARN))
-                elif daily_pct >= 100.0:
-                    app._on_ui(lambda: app.period_label.config(fg=DISCORD_ERROR))
-                else:
-                    app._on_ui(lambda: app.period_label.config(fg="#bbb"))
-
-                if daily_pct >= 100.0 and not app.daily_block_fired:
-                    app.daily_block_fired = True
-                    app._on_ui(lambda: messagebox.showerror("Bloqueio diário", "Dose diária atingiu 100%. Volume mínimo imposto."))
-                    if app.hard_lock_enabled:
-                        app._on_ui(lambda: app._lock_volume(app.cfg["min_enforced_volume"], reason="limite diário"))
-
-                if not app.alert_50_fired and app.session_dose >= 0.5:
-                    app.alert_50_fired = True
-                    app._on_ui(lambda: messagebox.showwarning("Atenção", "Você atingiu 50% da dose diária."))
-                if not app.alert_100_fired and app.session_dose >= 1.0:
-                    app.alert_100_fired = True
-                    app._on_ui(lambda: messagebox.showerror("Risco crítico", "Limite de dose diária ultrapassado!"))
-                    if app.hard_lock_enabled:
-                        app._on_ui(lambda: app._lock_volume(app.cfg["min_enforced_volume"], reason="limite diário"))
-
-                # Atualiza UI
-                app._on_ui(lambda: app.gauge.set_value(L_eff, app.session_dose))
-                app._on_ui(lambda: app.draw_zone_badge(zone, zone_color))
-                app._on_ui(lambda: app.time_label.config(text=f"Tempo permitido: {time_str} | Tempo neste volume: {time_cur_str}"))
-                app._on_ui(lambda: app.remaining_label.config(text=f"Tempo restante (neste volume) até 100%: {remaining_str}"))
-                app._on_ui(lambda: app.vol_slider.configure(progress_color=zone_color))
-                app._on_ui(lambda: app.vol_label.configure(text=f"{round_pct_ui(app._vol_cache)}%"))
-                app._on_ui(lambda: app.period_label.config(text=f"Dose diária: {daily_pct:.0f}%"))
-
-                if app._audio_backend.available() and (now - app._last_sys_sync) >= 0.5:
-                    app._last_sys_sync = now
-                    try:
-                        sys_pct = app._quantize_pct(app._audio_backend.get_percent())
-                        if app.dynamic_softlock_enabled and app.dynamic_ceiling_pct is not None:
-                            if sys_pct > app.dynamic_ceiling_pct + 0.5:
-                                app._on_ui(lambda: app._safe_set_slider(app.dynamic_ceiling_pct))
-                                app._apply_system_volume_from_slider(show_install_hint=False)
-                                sys_pct = app.dynamic_ceiling_pct
-
-                        if app.locked:
-                            if abs(sys_pct - float(app.lock_target_pct or 0)) > 0.5:
-                                app._on_ui(lambda: app._safe_set_slider(app.lock_target_pct))
-                                app._apply_system_volume_from_slider(show_install_hint=False)
-                        else:
-                            if app.dynamic_decay_active and sys_pct > float(app._vol_cache) + 0.01:
-                                sys_pct = app._vol_cache
-                            if abs(sys_pct - float(app._vol_cache)) > 1.0:
-                                app._on_ui(lambda v=sys_pct: app._safe_set_slider(v))
-                    except Exception:
-                        pass
-
-                # Histórico (~1s)
-                if (now - app._last_hist_log) >= 1.0:
-                    app._last_hist_log = now
-                    t_rel = now - app.session_start_ts
-                    app.history.append({
-                        "ts_iso": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)),
-                        "t_session": t_rel,
-                        "mode": app.mode,
-                        "vol_percent": float(app._vol_cache),
-                        "L": L_eff,
-                        "dose": app.session_dose,
-                        "zone": zone,
-                        "daily": app.daily_dose,
-                    })
-                    if len(app.history) > app.MAX_HISTORY:
-                        del app.history[:len(app.history) - app.MAX_HISTORY]
-                    app.chart_points.append((t_rel, L_eff, app.session_dose))
-                    cutoff = t_rel - app.chart_window_sec - 2
-                    app.chart_points = [p for p in app.chart_points if p[0] >= cutoff]
-
-                # Redesenha gráfico (~0.8s)
-                if (now - app._last_chart_draw) >= 0.8:
+                # o bloqueio em si é mantido pelo AudioActor (intenção PRIO_LOCK)
+                if eng.locked and abs(float(app._vol_cache) - float(eng.lock_target_pct or 0)) > 0.1:
+                    app._vol_cache = float(eng.lock_target_pct or 0)
+                    app._ui_set("slider", app._vol_cache)
+
+                meter = app._meter
+                res = eng.step(now, float(app._vol_cache), meter.take() if meter is not None else None)
+                clk.mark("step")
+                visible = app._ui_visible
+                _apply_tick_result(app, res, visible)
+                clk.mark("apply")
+                audio = app._audio
+                audio.set_ceiling(eng.dynamic_ceiling_pct if eng.dynamic_softlock_enabled else None)
+                audio.set_poll_interval(SYNC_INTERVAL if visible else SYNC_INTERVAL_HIDDEN)
+                clk.mark("audio")
+
+                for sample in res.samples:
+                    _log_history(app, sample)
+                if res.samples:
+                    clk.mark("history")
+                if res.samples and visible:
+                    app._ui_set("summary", _summary_text(app.session_stats.summary()))
+                    clk.mark("summary")
+
+                # checkpoint da dose: a cada CHECKPOINT_INTERVAL e logo após alerta/bloqueio
+                if res.alerts or res.lock_target is not None or (now - app._last_checkpoint) >= CHECKPOINT_INTERVAL:
+                    app._save_checkpoint(now)
+                    clk.mark("checkpoint")
+
+                if visible and (now - app._last_chart_draw) >= CHART_INTERVAL:
                     app._last_chart_draw = now
-                    app._on_ui(lambda: draw_history_chart(app.chart_canvas, app.chart_points, app.cfg, app.chart_window_sec))
-
+                    app._ui_set("chart", now)
+
+                deadline = eng.next_deadline(now)
+                if visible and not res.paused:
+                    deadline = min(deadline, now + VISIBLE_INTERVAL)
+                if meter is not None and not res.paused:
+                    deadline = min(deadline, now + METER_INTERVAL)
+                deadline = min(deadline, app._last_checkpoint + CHECKPOINT_INTERVAL)
+                clk.mark("deadline")
             except Exception as ex:
                 print("Erro no monitor:", ex)
-
-            time.sleep(0.2)
-
-def _roll_day_if_needed(app, now_dt):
-    day_key = now_dt.strftime("%Y-%m-%d")
-    if day_key != app._day_key:
-        app._day_key = day_key
-        app.daily_dose = 0.0
-        app.daily_warn_fired = False
-        app.daily_block_fired = False
-        app.alert_50_fired = False
-        app.alert_100_fired = False
-        app.session_dose = 0.0
-        app._on_ui(lambda: messagebox.showinfo("Novo dia", "Dose diária reiniciada."))
-
-def _apply_mode_rules(app, vol_percent, ema_remaining, allowed_sec, level_zone):
-    # prefixado
-    if app.mode == "prefixado" and app.session_dose < 1.0 and not app.locked:
-        cap = app._calc_prefix_volume_cap_pct(app.session_dose)
-        if cap is not None and vol_percent > cap + 0.1:
-            def _snap_to_safe():
-                safe_v = max(app.cfg["min_enforced_volume"], cap)
-                app._safe_set_slider(safe_v)
-                app._vol_cache = safe_v
-                app._apply_system_volume_from_slider(show_install_hint=True)
-            app._on_ui(_snap_to_safe)
-            app._on_ui(lambda: app.general_status.config(text="Status: ajustado p/ seguro", fg="#F0B232"))
-            if app.hard_lock_enabled and app.lock_on_autoadjust:
-                app._on_ui(lambda: app._lock_volume(max(app.cfg["min_enforced_volume"], cap), reason="ajuste de segurança"))
-        else:
-            app._on_ui(lambda: app.general_status.config(text="Status: normal", fg="#bbb"))
-
-    # dinamico
-    elif app.mode == "dinamico" and app.session_dose < 1.0 and not app.locked:
-        now = time.time()
-        if app.dynamic_strategy == "reserva":
-            reserve_target = max(app.dynamic_reserve_min_sec, min(app.dynamic_reserve_max_sec, app.dynamic_reserve_fraction * allowed_sec))
-            lower = reserve_target - app.dynamic_hysteresis_sec
-            upper = reserve_target + app.dynamic_hysteresis_sec
-
-            if not app.dynamic_limiting_active and ema_remaining < lower:
-                app.dynamic_limiting_active = True
-                if app.dynamic_softlock_enabled:
-                    cur = app._quantize_pct(app._vol_cache)
-                    app.dynamic_ceiling_pct = cur if app.dynamic_ceiling_pct is None else min(app.dynamic_ceiling_pct, cur)
-                    app._dynamic_upper_ok_since = None
-            elif app.dynamic_limiting_active and ema_remaining > upper:
-                app.dynamic_limiting_active = False
-
-            if app.dynamic_limiting_active:
-                if (now - app.last_dynamic_adjust_ts) >= app.dynamic_adjust_interval:
-                    deficit = reserve_target - ema_remaining
-                    if deficit < 60: step = app.dynamic_step_small
-                    elif deficit < 300: step = app.dynamic_step_medium
-                    else: step = app.dynamic_step_large
-                    def _decay():
-                        current = app._vol_cache
-                        target = app._quantize_pct(current - step)
-                        if target < current - 0.099:
-                            app.dynamic_decay_active = True
-                            app._safe_set_slider(target)
-                            if app.dynamic_softlock_enabled:
-                                app.dynamic_ceiling_pct = target if app.dynamic_ceiling_pct is None else min(app.dynamic_ceiling_pct, target)
-                    app._on_ui(_decay)
-                    app.last_dynamic_adjust_ts = now
-                app._on_ui(lambda: app.general_status.config(text="Status: auto-limitando", fg="#F0B232"))
+                diag.count("tick.errors")
+                deadline = now + 0.2
+            clk.total("total")
+
+            if diag.enabled:
+                target = min(deadline, time.time() + sched.max_sleep)
+                woken = sched.sleep_until(deadline)
+                if not woken:
+                    diag.record("tick.late", max(0.0, time.time() - target) * 1e9)
             else:
-                app.dynamic_decay_active = False
-                if app.dynamic_softlock_enabled:
-                    if ema_remaining > upper:
-                        if app._dynamic_upper_ok_since is None:
-                            app._dynamic_upper_ok_since = now
-                        elif (now - app._dynamic_upper_ok_since) >= app.dynamic_release_delay:
-                            app.dynamic_ceiling_pct = None
-                    else:
-                        app._dynamic_upper_ok_since = None
-                app._on_ui(lambda: app.general_status.config(text="Status: normal", fg="#bbb"))
+                sched.sleep_until(deadline)
+
+def _apply_tick_result(app, res, visible=True):
+    """Traduz o TickResult do motor em ações de volume e atualizações de UI."""
+    for code in res.alerts:
+        app._alert(*_ALERTS[code])
+
+    if res.volume_target is not None:
+        target, hint = res.volume_target, res.volume_hint
+        def _apply_target():
+            app._safe_set_slider(target)
+            app._vol_cache = target
+            app._apply_system_volume_from_slider(show_install_hint=hint)
+        app._on_ui(_apply_target)
+    if res.lock_target is not None:
+        app._on_ui(lambda t=res.lock_target, r=res.lock_reason: app._lock_volume(t, reason=r))
+    if res.status is not None:
+        app._ui_set("status", _STATUS[res.status])
+
+    if not visible:
+        return
+    app._ui_set("clock", (res.now, res.L, res.session_dose, res.daily_dose, res.dose_rate,
+                          res.allowed_sec, res.time_at_level, res.remaining_sec, res.paused))
+    if res.paused:
+        return
+
+    color = zone_color(res.zone)
+    app._ui_set("zone", (res.zone, color))
+    app._ui_set("slider_color", color)
+    app._ui_set("vol_label", f"{round_pct_ui(app._vol_cache)}%")
+
+def clock_view(clock, now):
+    """Relógios da tela em `now` a partir do último passo (slot "clock").
+
+    Entre passos o volume é constante: a dose cresce a `dose_rate` e os
+    tempos andam 1 s por segundo, então a UI atualiza a cada segundo sem
+    acordar o monitor. Devolve {slot: valor} no formato dos slots antigos.
+    """
+    ts, L, dose, daily, rate, allowed, at_level, remaining, paused = clock
+    view = {}
+    if paused:
+        view["gauge"] = (L, dose)
+        return view
+    el = max(0.0, now - ts)
+    if dose < 1.0:
+        at_level += el
+        remaining = max(0.0, remaining - el)
+    dose = min(1.0, dose + rate * el)
+    daily_pct = min(10.0, daily + rate * el) * 100.0
+    daily_fg = DISCORD_ERROR if daily_pct >= 100.0 else DISCORD_WARN if daily_pct >= 80.0 else "#bbb"
+    view["gauge"] = (L, dose)
+    view["time"] = f"Tempo permitido: {fmt_hms(allowed)} | Tempo neste volume: {fmt_hms(at_level)}"
+    view["remaining"] = f"Tempo restante (neste volume) até 100%: {fmt_hms(remaining)}"
+    view["period"] = (f"Dose diária: {daily_pct:.0f}%", daily_fg)
+    return view
+
+def _on_system_volume(app, pct):
+    """Assinante do AudioActor: o volume do sistema mudou por fora (roda na thread do ator)."""
+    eng = app.engine
+    try:
+        if eng.paused:
+            app._apply_system_volume_from_slider(show_install_hint=False)
+            return
+        sys_pct = eng.quantize(pct)
+        if eng.locked:
+            # o ator já reimpôs o alvo do bloqueio
+            app._ui_set("slider", eng.lock_target_pct)
+            return
+        if eng.dynamic_softlock_enabled and eng.dynamic_ceiling_pct is not None:
+            if sys_pct > eng.dynamic_ceiling_pct + 0.5:
+                # idem para o teto dinâmico; só acompanha no slider
+                app._vol_cache = eng.dynamic_ceiling_pct
+                app._ui_set("slider", eng.dynamic_ceiling_pct)
+                return
+        if eng.dynamic_decay_active and sys_pct > float(app._vol_cache) + 0.01:
+            return
+        if abs(sys_pct - float(app._vol_cache)) > 1.0:
+            app._vol_cache = sys_pct
+            app._ui_set("slider", sys_pct)
+            app._wake_monitor()
+    except Exception:
+        pass
+
+def _log_history(app, sample):
+    app.journal.append(sample)
+    sessions = app._sessions
+    device = app._audio.device_label()
+    apps = sessions.shares() if sessions is not None else None
+    _record_sample(app, sample, device, apps)
+    app._on_sample(sample, device, apps)
+
+def _record_sample(app, sample, device, apps):
+    app.history.append_sample(sample)
+    app.session_stats.add(sample, device, apps)
+    t_rel, L, dose = sample[1], sample[4], sample[5]
+    app.chart_points.append(t_rel, L, dose)
+    app.chart_points.evict_before(t_rel - app.chart_window_sec - 2)
+
+def start_attach_thread(app, client):
+    """Janela anexada a um daemon: espelha os eventos dele no host, sem motor local."""
+    import threading
+    t = threading.Thread(target=lambda: _attach_loop(app, client), daemon=True)
+    t.start()
 
-        else:
-            if level_zone != "SEGURA":
-                if not app.dynamic_limiting_active:
-                    app.dynamic_limiting_active = True
-                    if app.dynamic_softlock_enabled:
-                        cur = app._quantize_pct(app._vol_cache)
-                        app.dynamic_ceiling_pct = cur if app.dynamic_ceiling_pct is None else min(app.dynamic_ceiling_pct, cur)
-                        app._dynamic_upper_ok_since = None
-                if (now - app.last_dynamic_adjust_ts) >= app.dynamic_adjust_interval:
-                    if app._last_L_for_timer is None or app._last_L_for_timer < 90: step = app.dynamic_step_small
-                    else: step = app.dynamic_step_medium if app._last_L_for_timer < 95 else app.dynamic_step_large
-                    def _decay2():
-                        new_v = max(app.cfg["min_enforced_volume"], app._vol_cache - step)
-                        if abs(new_v - app._vol_cache) >= 0.1:
-                            app._safe_set_slider(new_v)
-                            if app.dynamic_softlock_enabled:
-                                app.dynamic_ceiling_pct = new_v if app.dynamic_ceiling_pct is None else min(app.dynamic_ceiling_pct, new_v)
-                    app._on_ui(_decay2)
-                    app.last_dynamic_adjust_ts = now
-                app._on_ui(lambda: app.general_status.config(text="Status: auto-limitando (até zona segura)", fg="#F0B232"))
-            else:
-                app.dynamic_limiting_active = False
-                app.dynamic_decay_active = False
-                if app.dynamic_softlock_enabled:
-                    if level_zone == "SEGURA":
-                        if app._dynamic_upper_ok_since is None:
-                            app._dynamic_upper_ok_since = now
-                        elif (now - app._dynamic_upper_ok_since) >= app.dynamic_release_delay:
-                            app.dynamic_ceiling_pct = None
-                    else:
-                        app._dynamic_upper_ok_since = None
-                app._on_ui(lambda: app.general_status.config(text="Status: normal", fg="#bbb"))
+def _attach_loop(app, client):
+    for ev in client.events():
+        try:
+            kind = ev.get("ev")
+            if kind == "slot":
+                app._ui_set(ev["slot"], ev["value"])
+            elif kind == "sample":
+                _record_sample(app, tuple(ev["row"]), ev.get("device"), ev.get("apps"))
+            elif kind == "alert":
+                app._alert(ev["kind"], ev["title"], ev["text"])
+            elif kind == "state":
+                app._on_ui(lambda st=ev["state"]: app._apply_remote_state(st))
+            elif kind == "reset":
+                app._on_ui(app._clear_session_view)
+            elif kind == "export_done":
+                app._on_ui(lambda ev=ev: app._remote_export_finished(ev))
+        except Exception as ex:
+            print("Erro no evento do daemon:", ex)
+    if not app._stop_event.is_set():
+        app._on_ui(app._daemon_lost)
+
+def _summary_text(st):
+    if not st["total_time_s"]:
+        return "Sessão: sem dados"
+    z = st["zone_time_s"]
+    text = (f"Leq {st['leq_db']:.1f} dB | média {st['avg_db']:.1f} dB | pico {st['peak_db']:.1f} dB | "
+            f"dose máx. {st['max_dose']*100:.0f}%\n"
+            f"Segura {fmt_hms(z['SEGURA'])} | Atenção {fmt_hms(z['ATENÇÃO'])} | Perigo {fmt_hms(z['PERIGO'])}")
+    devices = st.get("device_dose") or {}
+    if len(devices) > 1:
+        text += "\n" + " | ".join(f"{name}: {dose*100:.0f}%" for name, dose in devices.items())
+    apps = sorted((st.get("app_dose") or {}).items(), key=lambda kv: -kv[1])[:3]
+    if apps:
+        text += "\nApps: " + " | ".join(f"{name} {dose*100:.0f}%" for name, dose in apps)
+    return text
@@ -1,10 +1,13 @@
-import json
+import json, os
 from pathlib import Path
 
-def settings_path() -> Path:
+def data_dir() -> Path:
     base = Path.home() / ".tcc_sound_monitor"
     base.mkdir(parents=True, exist_ok=True)
-    return base / "settings.json"
+    return base
+
+def settings_path() -> Path:
+    return data_dir() / "settings.json"
 
 def load_settings(defaults: dict) -> dict:
     cfg = dict(defaults)
@@ -22,3 +25,32 @@ def save_settings(data: dict):
     p = settings_path()
     with open(p, "w", encoding="utf-8") as fh:
         json.dump(data, fh, ensure_ascii=False, indent=2)
+
+def checkpoint_path() -> Path:
+    return data_dir() / "dose_checkpoint.json"
+
+def write_json_atomic(path, data, fsync=False, indent=None):
+    """Grava JSON num temporário e troca com `os.replace`: quem lê vê o antigo ou o novo inteiro."""
+    path = str(path)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        if indent is None:
+            json.dump(data, fh, ensure_ascii=False, separators=(",", ":"))
+        else:
+            json.dump(data, fh, ensure_ascii=False, indent=indent)
+        if fsync:
+            fh.flush()
+            os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+def save_checkpoint(state: dict, fsync=False):
+    write_json_atomic(checkpoint_path(), state, fsync)
+
+def load_checkpoint():
+    """Último checkpoint de dose, ou None se não houver (ou estiver ilegível)."""
+    try:
+        with open(checkpoint_path(), "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+        return data if isinstance(data, dict) else None
+    except Exception:
+        return None
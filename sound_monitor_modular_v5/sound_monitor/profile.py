@@ -0,0 +1,97 @@
+from .utils import (
+    map_percent_to_db, db_to_percent, allowed_time_seconds_for_level,
+    prefix_volume_cap_pct, prefix_cap_dose_threshold
+)
+
+PREFIX_TARGET_SEC = 10 * 60
+PREFIX_TOL_PCT = 0.1
+
+class ExposureProfile:
+    """Perfil de exposição imutável derivado do cfg, com tabelas por passo de volume.
+
+    Nível, tempo permitido, taxa de dose e limiar do teto prefixado ficam
+    pré-calculados em `quantum` % (0..100); valores fora da grade usam as
+    fórmulas exatas de `utils`. Trocar o perfil é uma única atribuição, então
+    quem lê um perfil nunca vê cfg pela metade.
+    """
+    __slots__ = (
+        "min_db", "max_db", "ref_db", "base_time_sec", "exchange_rate_db",
+        "min_enforced_volume", "default_volume", "quantum",
+        "_cfg", "_level", "_allowed", "_rate", "_cap_thr",
+    )
+
+    def __init__(self, cfg, quantum=1.0):
+        c = {
+            "min_db": float(cfg["min_db"]), "max_db": float(cfg["max_db"]),
+            "ref_db": float(cfg["ref_db"]), "base_time_sec": float(cfg["base_time_sec"]),
+            "exchange_rate_db": float(cfg.get("exchange_rate_db", 3.0)),
+            "min_enforced_volume": float(cfg.get("min_enforced_volume", 0.0)),
+            "default_volume": float(cfg.get("default_volume", 30.0)),
+        }
+        q = float(quantum) if quantum else 1.0
+        n = int(round(100.0 / q))
+        level = tuple(map_percent_to_db(i * q, c) for i in range(n + 1))
+        allowed = tuple(allowed_time_seconds_for_level(L, c) for L in level)
+        s = object.__setattr__
+        for k, v in c.items():
+            s(self, k, v)
+        s(self, "quantum", q)
+        s(self, "_cfg", c)
+        s(self, "_level", level)
+        s(self, "_allowed", allowed)
+        s(self, "_rate", tuple(1.0 / a for a in allowed))
+        s(self, "_cap_thr", tuple(prefix_cap_dose_threshold(i * q, c, PREFIX_TARGET_SEC, PREFIX_TOL_PCT)
+                                  for i in range(n + 1)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ExposureProfile é imutável")
+
+    def matches(self, cfg):
+        """True se o perfil ainda corresponde a `cfg` (evita reconstruir à toa)."""
+        try:
+            return all(float(cfg.get(k, v)) == v for k, v in self._cfg.items())
+        except (TypeError, ValueError):
+            return False
+
+    def _index(self, pct):
+        """Índice na tabela se `pct` cai na grade, senão None."""
+        x = pct / self.quantum
+        i = int(round(x))
+        if abs(x - i) < 1e-9 and 0 <= i < len(self._level):
+            return i
+        return None
+
+    # --- por volume (%): tabela com fallback exato ---
+    def level(self, pct):
+        i = self._index(pct)
+        return self._level[i] if i is not None else map_percent_to_db(pct, self._cfg)
+
+    def allowed_for_pct(self, pct):
+        i = self._index(pct)
+        return self._allowed[i] if i is not None else allowed_time_seconds_for_level(self.level(pct), self._cfg)
+
+    def rate_for_pct(self, pct):
+        i = self._index(pct)
+        return self._rate[i] if i is not None else 1.0 / allowed_time_seconds_for_level(self.level(pct), self._cfg)
+
+    def prefix_cap_threshold(self, pct, tol=PREFIX_TOL_PCT):
+        """Dose a partir da qual `pct` passa do teto do prefixado (+tol); None = nunca."""
+        i = self._index(pct) if tol == PREFIX_TOL_PCT else None
+        return self._cap_thr[i] if i is not None else prefix_cap_dose_threshold(pct, self._cfg, PREFIX_TARGET_SEC, tol)
+
+    # --- por nível (dB) / dose: fórmulas exatas ---
+    def allowed(self, L):
+        return allowed_time_seconds_for_level(L, self._cfg)
+
+    def dose_rate(self, L):
+        return 1.0 / allowed_time_seconds_for_level(L, self._cfg)
+
+    def percent_for_level(self, L):
+        return db_to_percent(L, self._cfg)
+
+    def prefix_cap(self, dose):
+        return prefix_volume_cap_pct(dose, self._cfg, PREFIX_TARGET_SEC)
+
+    def cfg(self):
+        """Cópia dos valores do cfg usados pelo perfil."""
+        return dict(self._cfg)
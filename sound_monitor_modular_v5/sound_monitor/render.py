@@ -0,0 +1,127 @@
+import threading
+from collections import deque
+from time import perf_counter_ns
+from .diagnostics import NULL_CLOCK
+
+class RenderModel:
+    """Estado de tela com slots "último valor vence" e uma única passada de render agendada.
+
+    Qualquer thread chama `set(slot, valor)`; só o valor mais recente de cada slot
+    é aplicado, e só se mudou desde a última passada. Ações pontuais (alertas,
+    bloqueio) vão para uma fila limitada via `post(func)`. Com `diag` ligado,
+    cada passada registra a espera desde o pedido, a profundidade da fila e o
+    tempo de cada ação/slot.
+    """
+    def __init__(self, schedule, max_actions=256, diag=None):
+        self._schedule = schedule          # agenda `render` na thread do Tk
+        self.diag = diag
+        self._requested_ns = 0
+        self._lock = threading.Lock()
+        self._renderers = {}               # slot -> função(valor)
+        self._applied = {}                 # slot -> último valor aplicado
+        self._dirty = {}
+        self._actions = deque()
+        self._max_actions = max_actions
+        self._scheduled = False
+        # contadores
+        self.frames = 0                    # passadas de render
+        self.applied = 0                   # slots efetivamente aplicados
+        self.coalesced = 0                 # valores substituídos antes de aplicar
+        self.unchanged = 0                 # valores iguais ao já aplicado
+        self.dropped = 0                   # ações descartadas (fila cheia)
+
+    def register(self, slot, func):
+        self._renderers[slot] = func
+
+    def set(self, slot, value):
+        with self._lock:
+            if slot in self._dirty:
+                self.coalesced += 1
+            self._dirty[slot] = value
+            need = not self._scheduled
+            self._scheduled = True
+        if need:
+            self._request()
+
+    def post(self, func):
+        with self._lock:
+            if len(self._actions) >= self._max_actions:
+                self._actions.popleft()
+                self.dropped += 1
+            self._actions.append(func)
+            need = not self._scheduled
+            self._scheduled = True
+        if need:
+            self._request()
+
+    def apply_now(self, slot, value):
+        """Aplica já (somente na thread do Tk); um valor pendente mais antigo é descartado."""
+        with self._lock:
+            if self._dirty.pop(slot, None) is not None:
+                self.coalesced += 1
+        self._renderers[slot](value)
+        self._applied[slot] = value
+        self.applied += 1
+
+    def invalidate(self, slot=None):
+        """Força reaplicar o slot (ou todos) na próxima passada."""
+        with self._lock:
+            if slot is None:
+                self._applied.clear()
+            else:
+                self._applied.pop(slot, None)
+
+    def pending(self):
+        with self._lock:
+            return len(self._dirty) + len(self._actions)
+
+    def _request(self):
+        d = self.diag
+        if d is not None and d.enabled:
+            self._requested_ns = perf_counter_ns()
+        try:
+            self._schedule(self.render)
+        except Exception:
+            # Tk ainda fora do mainloop: a próxima alteração tenta de novo
+            with self._lock:
+                self._scheduled = False
+
+    def render(self):
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            actions, self._actions = self._actions, deque()
+            self._scheduled = False
+        self.frames += 1
+        d = self.diag
+        clk = NULL_CLOCK
+        if d is not None and d.enabled:
+            if self._requested_ns:
+                d.record("ui.wait", perf_counter_ns() - self._requested_ns)
+                self._requested_ns = 0
+            d.observe("ui.queue", len(actions) + len(dirty))
+            clk = d.clock("ui.")
+        for func in actions:
+            try:
+                func()
+            except Exception as e:
+                print("Erro ao executar função de UI:", e)
+            clk.mark("action")
+        for slot, value in dirty.items():
+            if slot in self._applied and self._applied[slot] == value:
+                self.unchanged += 1
+                continue
+            clk.skip()
+            try:
+                self._renderers[slot](value)
+                self._applied[slot] = value
+                self.applied += 1
+            except Exception as e:
+                print(f"Erro ao renderizar '{slot}':", e)
+            clk.mark(slot)
+        clk.total("frame")
+
+    def stats(self):
+        return {
+            "frames": self.frames, "applied": self.applied, "coalesced": self.coalesced,
+            "unchanged": self.unchanged, "dropped": self.dropped, "pending": self.pending(),
+        }
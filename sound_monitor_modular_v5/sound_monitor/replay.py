@@ -0,0 +1,211 @@
+import argparse, csv, gzip, sys, time
+from .core import DEFAULT_CFG
+from .engine import DoseEngine
+from .history import HistoryStore
+from .journal import read_segment
+from .reporting import load_columnar, export_report, HEADERS
+
+def _iso_to_ts(s):
+    return time.mktime(time.strptime(str(s)[:19], "%Y-%m-%d %H:%M:%S"))
+
+def _rows_to_trace(rows):
+    """(ts ou None, t_sessao, volume) -> [(t relativo, volume)], em ordem."""
+    trace = []; t0 = None; last_t = None
+    for ts, t_session, vol in rows:
+        if ts is not None:
+            if t0 is None:
+                t0 = ts
+            t = ts - t0
+        else:
+            t = float(t_session)
+        if last_t is not None and t < last_t:
+            continue
+        vol = float(vol)
+        # só mudanças de volume importam (o motor integra o trecho constante de uma vez)
+        if not trace or vol != trace[-1][1]:
+            trace.append((t, vol))
+        last_t = t
+    if trace and last_t > trace[-1][0]:
+        trace.append((last_t, trace[-1][1]))
+    return trace, t0
+
+def _load_xlsx(path):
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    ws = wb["Relatório"] if "Relatório" in wb.sheetnames else wb.worksheets[0]
+    it = ws.iter_rows(values_only=True)
+    head = [str(h) for h in next(it)]
+    i_ts, i_t, i_v = head.index(HEADERS[0]), head.index(HEADERS[1]), head.index(HEADERS[3])
+    rows = [(_iso_to_ts(r[i_ts]) if r[i_ts] else None, r[i_t], r[i_v]) for r in it if r[i_v] is not None]
+    wb.close()
+    return rows
+
+def _load_csv(path):
+    opener = gzip.open if str(path).lower().endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", newline="") as fh:
+        r = csv.reader(fh)
+        head = next(r)
+        if HEADERS[3] in head:
+            i_ts, i_t, i_v = head.index(HEADERS[0]), head.index(HEADERS[1]), head.index(HEADERS[3])
+            return [(_iso_to_ts(row[i_ts]), row[i_t], row[i_v]) for row in r if row]
+        # CSV simples: t_segundos,volume_% (com ou sem cabeçalho)
+        rows = [] if not head or not head[0].replace(".", "", 1).isdigit() else [(None, head[0], head[1])]
+        rows += [(None, row[0], row[1]) for row in r if row]
+        return rows
+
+def load_trace(path):
+    """Lê um traço de volume: relatório .xlsx/.csv(.gz)/.tsc, segmento de journal .tsj
+    ou CSV simples `t_segundos,volume_%`. Devolve ([(t, volume)], ts inicial ou None)."""
+    name = str(path).lower()
+    if name.endswith(".xlsx"):
+        rows = _load_xlsx(path)
+    elif name.endswith(".csv") or name.endswith(".csv.gz"):
+        rows = _load_csv(path)
+    elif name.endswith(".tsc"):
+        _meta, cols = load_columnar(path)
+        rows = zip(cols["ts"], cols["t_session"], cols["vol_percent"])
+    elif name.endswith(".tsj"):
+        rows = ((r[0], r[1], r[3]) for r in read_segment(path))
+    else:
+        raise ValueError(f"formato de traço não suportado: {path}")
+    return _rows_to_trace(rows)
+
+# Constantes do motor que podem ser trocadas num replay (ajuste/varredura)
+TUNABLE_PARAMS = (
+    "dynamic_reserve_min_sec", "dynamic_reserve_max_sec", "dynamic_reserve_fraction",
+    "dynamic_step_small", "dynamic_step_medium", "dynamic_step_large",
+    "dynamic_hysteresis_sec", "dynamic_adjust_interval", "dynamic_release_delay", "ema_alpha",
+)
+
+class ReplayResult:
+    __slots__ = ("samples", "events", "steps", "final_dose", "final_daily", "max_dose",
+                 "interventions", "locked_sec", "duration_sec", "elapsed")
+
+    def __init__(self):
+        self.samples = []  # amostras de 1 s do motor (curva de dose)
+        self.events = []   # (t relativo, tipo, valor)
+        self.steps = 0
+        self.final_dose = 0.0
+        self.final_daily = 0.0
+        self.max_dose = 0.0
+        self.interventions = 0   # ajustes + bloqueios impostos pelo motor
+        self.locked_sec = 0.0
+        self.duration_sec = 0.0
+        self.elapsed = 0.0
+
+def replay(trace, cfg=None, mode="prefixado", strategy="reserva", start_ts=None,
+           hard_lock=True, lock_on_autoadjust=True, softlock=True, max_step=60.0,
+           params=None, collect=True):
+    """Passa o traço pelo DoseEngine num relógio virtual (sem Tk, sem dormir).
+
+    O volume do traço é o que o usuário pediu; o volume efetivo segue as
+    mesmas regras do monitor (bloqueio, teto dinâmico, ajustes do motor).
+    Passos só acontecem nas mudanças do traço e nos prazos de `next_deadline`.
+    `params` troca constantes de TUNABLE_PARAMS; `collect=False` não guarda a
+    curva nem os eventos (só as métricas), para varreduras.
+    """
+    t_start = time.perf_counter()
+    out = ReplayResult()
+    if not trace:
+        return out
+    t0 = time.time() if start_ts is None else float(start_ts)
+    eng = DoseEngine(dict(cfg or DEFAULT_CFG), now=t0)
+    eng.set_mode(mode)
+    eng.dynamic_strategy = strategy
+    eng.hard_lock_enabled = hard_lock
+    eng.lock_on_autoadjust = lock_on_autoadjust
+    eng.dynamic_softlock_enabled = softlock
+    eng.max_dt = max_step + 1.0
+    for name, value in (params or {}).items():
+        if name not in TUNABLE_PARAMS:
+            raise ValueError(f"parâmetro desconhecido: {name}")
+        setattr(eng, name, float(value))
+    end = t0 + trace[-1][0]
+    ev = out.events; samples = out.samples
+
+    i = 0; n = len(trace)
+    requested = vol = trace[0][1]
+    now = last = t0
+    while True:
+        # mudança de volume pedida pelo usuário no traço
+        while i < n and t0 + trace[i][0] <= now:
+            requested = trace[i][1]; i += 1
+            if not eng.locked and not (eng.dynamic_decay_active and requested > vol):
+                vol = requested
+        if eng.locked:
+            vol = eng.lock_target_pct
+        elif eng.dynamic_softlock_enabled and eng.dynamic_ceiling_pct is not None and vol > eng.dynamic_ceiling_pct + 0.5:
+            vol = eng.dynamic_ceiling_pct
+
+        if eng.locked:
+            out.locked_sec += now - last
+        last = now
+        res = eng.step(now, vol)
+        out.steps += 1
+        if res.session_dose > out.max_dose:
+            out.max_dose = res.session_dose
+        if res.volume_target is not None:
+            vol = res.volume_target
+            out.interventions += 1
+        if res.lock_target is not None:
+            vol = res.lock_target
+            out.interventions += 1
+        if collect:
+            for code in res.alerts:
+                ev.append((now - t0, "alerta", code))
+            if res.volume_target is not None:
+                ev.append((now - t0, "ajuste", res.volume_target))
+            if res.lock_target is not None:
+                ev.append((now - t0, "bloqueio", res.lock_target))
+            if res.samples:
+                samples += res.samples
+        if now >= end:
+            break
+        nxt = min(eng.next_deadline(now), now + max_step, end)
+        if i < n:
+            nxt = min(nxt, t0 + trace[i][0])
+        now = max(nxt, now + 1e-6)
+
+    out.final_dose = eng.session_dose
+    out.final_daily = eng.daily_dose
+    out.duration_sec = end - t0
+    out.elapsed = time.perf_counter() - t_start
+    return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m sound_monitor.replay",
+                                 description="Reexecuta um traço de volume pelo motor de dose (sem UI).")
+    ap.add_argument("trace", help="relatório .xlsx/.csv/.csv.gz/.tsc, journal .tsj ou CSV t,volume")
+    ap.add_argument("--mode", choices=("prefixado", "dinamico"), default="prefixado")
+    ap.add_argument("--strategy", choices=("reserva", "zona_segura"), default="reserva")
+    ap.add_argument("--ref-db", type=float, default=DEFAULT_CFG["ref_db"])
+    ap.add_argument("--exchange-rate", type=float, default=DEFAULT_CFG["exchange_rate_db"])
+    ap.add_argument("--no-hard-lock", action="store_true")
+    ap.add_argument("--no-softlock", action="store_true")
+    ap.add_argument("--out", help="curva de dose resultante (.csv/.csv.gz/.tsc/.xlsx)")
+    ap.add_argument("--events", help="eventos (ajustes, bloqueios, alertas) em CSV")
+    args = ap.parse_args(argv)
+
+    trace, ts0 = load_trace(args.trace)
+    cfg = dict(DEFAULT_CFG, ref_db=args.ref_db, exchange_rate_db=args.exchange_rate)
+    res = replay(trace, cfg, args.mode, args.strategy, start_ts=ts0,
+                 hard_lock=not args.no_hard_lock, softlock=not args.no_softlock)
+
+    if args.out:
+        export_report(HistoryStore.from_samples(res.samples), cfg, args.out)
+    if args.events:
+        with open(args.events, "w", encoding="utf-8", newline="") as fh:
+            w = csv.writer(fh)
+            w.writerow(["t_s", "evento", "valor"])
+            w.writerows(res.events)
+    else:
+        for t, kind, value in res.events:
+            print(f"{t:10.1f}s  {kind:<9} {value}")
+    dur = trace[-1][0] if trace else 0.0
+    print(f"traço: {len(trace)} pontos, {dur / 3600:.2f} h | passos: {res.steps} | "
+          f"dose final: {res.final_dose * 100:.1f}% | diária: {res.final_daily * 100:.1f}% | "
+          f"{res.elapsed * 1000:.0f} ms", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,102 +1,274 @@
+import os, sys, csv, gzip, json, mmap, struct, threading
+from importlib.util import find_spec
+from array import array
 from datetime import datetime
+from .history import COLUMNS, MODES, ZONES
+from .stats import SessionStats
 
-_OPENPYXL_AVAILABLE = False
-try:
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, Alignment, numbers
-    from openpyxl.utils import get_column_letter
-    _OPENPYXL_AVAILABLE = True
-except Exception:
-    _OPENPYXL_AVAILABLE = False
+# openpyxl (e o numpy que ele puxa) só é importado na primeira exportação .xlsx:
+# o daemon e o replay não pagam ~0,5 s de import para um formato que talvez nem usem
+_OPENPYXL_AVAILABLE = find_spec("openpyxl") is not None
+Workbook = Font = Alignment = numbers = get_column_letter = WriteOnlyCell = None
 
 def has_openpyxl() -> bool:
     return _OPENPYXL_AVAILABLE
 
-def compute_summary_stats(history: list) -> dict:
-    n = len(history)
-    total_time_s = 0.0; weighted_sum_L = 0.0
-    peak_db = float("-inf"); peak_vol = float("-inf")
-    max_dose = 0.0
-    t_to_50 = None; t_to_100 = None
-    if n >= 1:
-        for i in range(n - 1):
-            cur, nxt = history[i], history[i+1]
-            dt = max(0.0, float(nxt["t_session"]) - float(cur["t_session"]))
-            total_time_s += dt
-            L = float(cur["L"]); weighted_sum_L += L * dt
-            peak_db = max(peak_db, L)
-            peak_vol = max(peak_vol, float(cur["vol_percent"]))
-            max_dose = max(max_dose, float(cur["dose"]))
-            if t_to_50 is None and float(cur["dose"]) >= 0.5: t_to_50 = float(cur["t_session"])
-            if t_to_100 is None and float(cur["dose"]) >= 1.0: t_to_100 = float(cur["t_session"])
-        last = history[-1]
-        peak_db = max(peak_db, float(last["L"]))
-        peak_vol = max(peak_vol, float(last["vol_percent"]))
-        max_dose = max(max_dose, float(last["dose"]))
-        if t_to_50 is None and float(last["dose"]) >= 0.5: t_to_50 = float(last["t_session"])
-        if t_to_100 is None and float(last["dose"]) >= 1.0: t_to_100 = float(last["t_session"])
-    avg_db = (weighted_sum_L / total_time_s) if total_time_s > 0 else 0.0
-    return {
-        "points": n,
-        "total_time_s": total_time_s,
-        "total_time_days": total_time_s / 86400.0,
-        "avg_db": avg_db,
-        "peak_db": peak_db if peak_db != float("-inf") else 0.0,
-        "peak_vol": peak_vol if peak_vol != float("-inf") else 0.0,
-        "max_dose": max_dose,
-        "t_to_50_days": (t_to_50 / 86400.0) if t_to_50 is not None else 0.0,
-        "t_to_100_days": (t_to_100 / 86400.0) if t_to_100 is not None else 0.0,
-    }
-
-def make_workbook(history: list, cfg: dict):
+def _load_openpyxl():
+    global Workbook, Font, Alignment, numbers, get_column_letter, WriteOnlyCell
+    if Workbook is not None:
+        return
+    try:
+        from openpyxl import Workbook as _wb
+        from openpyxl.styles import Font, Alignment, numbers
+        from openpyxl.utils import get_column_letter
+        from openpyxl.cell import WriteOnlyCell
+    except Exception as e:
+        raise RuntimeError("openpyxl não disponível") from e
+    Workbook = _wb
+
+def compute_summary_stats(history) -> dict:
+    """Estatísticas recalculadas a partir do histórico (o app usa o SessionStats ao vivo)."""
+    st = SessionStats()
+    for ts, t, mode, vol, L, dose, zone, daily in history.rows():
+        st.add((ts, t, MODES[mode], vol, L, dose, ZONES[zone], daily))
+    return st.summary()
+
+HEADERS = ["timestamp_iso","t_sessao_s","modo","volume_%","nivel_dB","dose_0a1","zona","dose_diaria"]
+WIDTHS = [20,14,12,12,12,12,16,16]
+PROGRESS_EVERY = 2000   # linhas entre avisos de progresso / checagens de cancelamento
+
+class ExportCancelled(Exception):
+    pass
+
+def _cell(ws, value, number_format=None, font=None, alignment=None):
+    c = WriteOnlyCell(ws, value=value)
+    if number_format is not None: c.number_format = number_format
+    if font is not None: c.font = font
+    if alignment is not None: c.alignment = alignment
+    return c
+
+def make_workbook(history, cfg: dict, progress=None, cancel=None, summary=None):
+    """Workbook em modo write-only: as linhas vão direto para o arquivo temporário
+    do openpyxl, com formato por célula, então a memória não cresce com o histórico.
+
+    `history` deve ser um snapshot (não é alterado durante a escrita).
+    `progress(feitas, total)` é chamado a cada PROGRESS_EVERY linhas; se `cancel`
+    (threading.Event) for acionado, levanta ExportCancelled. `summary` (de
+    SessionStats.summary) evita recalcular o Resumo a partir do histórico.
+    """
     if not _OPENPYXL_AVAILABLE:
         raise RuntimeError("openpyxl não disponível")
-    wb = Workbook()
-    ws = wb.active; ws.title = "Relatório"
-    headers = ["timestamp_iso","t_sessao_s","modo","volume_%","nivel_dB","dose_0a1","zona","dose_diaria"]
-    ws.append(headers)
-    for c in range(1, len(headers)+1):
-        cell = ws.cell(row=1, column=c); cell.font = Font(bold=True); cell.alignment = Alignment(horizontal="center")
-    for row in history:
-        ws.append([
-            row["ts_iso"], float(row["t_session"]), row["mode"],
-            int(round(float(row["vol_percent"]))),
-            float(row["L"]), float(row["dose"]), row["zone"], float(row["daily"])
-        ])
-    for r in range(2, ws.max_row + 1):
-        ws.cell(r, 2).number_format = "0.0"
-        ws.cell(r, 5).number_format = "0.00"
-        ws.cell(r, 6).number_format = numbers.FORMAT_PERCENTAGE_00
-        ws.cell(r, 8).number_format = numbers.FORMAT_PERCENTAGE_00
-    widths = [20,14,12,12,12,12,16,16]
-    for idx, w in enumerate(widths, start=1):
+    _load_openpyxl()
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title="Relatório")
+    for idx, w in enumerate(WIDTHS, start=1):
         ws.column_dimensions[get_column_letter(idx)].width = w
-    ws.auto_filter.ref = f"A1:H{ws.max_row}"; ws.freeze_panes = "A2"
+    ws.freeze_panes = "A2"
+    total = len(history)
+    ws.auto_filter.ref = f"A1:H{total + 1}"
+    bold = Font(bold=True); center = Alignment(horizontal="center")
+    ws.append([_cell(ws, h, font=bold, alignment=center) for h in HEADERS])
+    pct = numbers.FORMAT_PERCENTAGE_00
+    for ts_iso, t_session, mode, vol, L, dose, zone, daily in _iter_export_rows(history, progress, cancel):
+        ws.append([ts_iso, _cell(ws, t_session, "0.0"), mode, vol,
+                   _cell(ws, L, "0.00"), _cell(ws, dose, pct), zone, _cell(ws, daily, pct)])
 
     ws2 = wb.create_sheet(title="Resumo")
-    from .reporting import compute_summary_stats as _css
-    if not history:
-        ws2["A1"] = "Sem dados na sessão."; ws2["A1"].font = Font(bold=True)
+    ws2.column_dimensions["A"].width = 26
+    ws2.column_dimensions["B"].width = 18
+    if not total:
+        ws2.append([_cell(ws2, "Sem dados na sessão.", font=bold)])
     else:
-        summary = _css(history)
-        ws2["A1"] = "Resumo da Sessão"; ws2["A1"].font = Font(bold=True)
-        ws2["A2"] = f"Gerado em: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-        ws2["A3"] = f"Perfil diário: {cfg['ref_db']:.0f} dB / 8h (3 dB)"
+        if summary is None:
+            summary = compute_summary_stats(history)
+        ws2.append([_cell(ws2, "Resumo da Sessão", font=bold)])
+        ws2.append([f"Gerado em: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"])
+        ws2.append([f"Perfil diário: {cfg['ref_db']:.0f} dB / 8h (3 dB)"])
         labels = [
             ("Tempo total",          summary["total_time_days"], "[h]:mm:ss"),
             ("Média de dB",          summary["avg_db"],          "0.00"),
+            ("Leq (dB)",             summary["leq_db"],          "0.00"),
             ("Pico de dB",           summary["peak_db"],         "0.00"),
             ("Pico de volume (%)",   summary["peak_vol"],        "0"),
-            ("Maior dose (sessão)",  summary["max_dose"],        numbers.FORMAT_PERCENTAGE_00),
+            ("Maior dose (sessão)",  summary["max_dose"],        pct),
             ("Tempo até 50% dose",   summary["t_to_50_days"],    "[h]:mm:ss"),
             ("Tempo até 100% dose",  summary["t_to_100_days"],   "[h]:mm:ss"),
         ]
-        ws2["A5"] = "Métricas gerais"; ws2["A5"].font = Font(bold=True)
-        row = 6
+        ws2.append([])
+        ws2.append([_cell(ws2, "Métricas gerais", font=bold)])
         for label, value, fmt in labels:
-            ws2.cell(row=row, column=1, value=label)
-            cval = ws2.cell(row=row, column=2, value=value); cval.number_format = fmt
-            row += 1
-        ws2.column_dimensions["A"].width = 26
-        ws2.column_dimensions["B"].width = 18
+            ws2.append([label, _cell(ws2, value, fmt)])
+        ws2.append([])
+        ws2.append([_cell(ws2, "Tempo por zona", font=bold)])
+        for zone, sec in summary["zone_time_s"].items():
+            ws2.append([zone, _cell(ws2, sec / 86400.0, "[h]:mm:ss")])
+        ws2.append([])
+        ws2.append([_cell(ws2, "Tempo por modo", font=bold)])
+        for mode, sec in summary["mode_time_s"].items():
+            ws2.append([mode, _cell(ws2, sec / 86400.0, "[h]:mm:ss")])
+        if summary.get("device_time_s"):
+            ws2.append([])
+            ws2.append([_cell(ws2, "Por dispositivo de saída", font=bold), _cell(ws2, "Tempo", font=bold),
+                        _cell(ws2, "Dose", font=bold)])
+            for dev, sec in summary["device_time_s"].items():
+                ws2.append([dev, _cell(ws2, sec / 86400.0, "[h]:mm:ss"),
+                            _cell(ws2, summary["device_dose"].get(dev, 0.0), pct)])
+        if summary.get("app_time_s"):
+            ws2.append([])
+            ws2.append([_cell(ws2, "Por aplicativo", font=bold), _cell(ws2, "Tempo tocando", font=bold),
+                        _cell(ws2, "Dose", font=bold)])
+            for name, sec in sorted(summary["app_time_s"].items(), key=lambda kv: -summary["app_dose"].get(kv[0], 0.0)):
+                ws2.append([name, _cell(ws2, sec / 86400.0, "[h]:mm:ss"),
+                            _cell(ws2, summary["app_dose"].get(name, 0.0), pct)])
     return wb
+
+def _write_xlsx(history, cfg, path, progress=None, cancel=None, summary=None):
+    make_workbook(history, cfg, progress, cancel, summary).save(path)
+
+def _iter_export_rows(history, progress=None, cancel=None):
+    """Linhas no esquema de HEADERS (o mesmo da planilha), com progresso/cancelamento."""
+    total = len(history); done = 0
+    for ts_iso, t_session, mode, vol, L, dose, zone, daily in history.iter_rows():
+        yield (ts_iso, t_session, mode, int(round(vol)), L, dose, zone, daily)
+        done += 1
+        if done % PROGRESS_EVERY == 0:
+            if cancel is not None and cancel.is_set():
+                raise ExportCancelled()
+            if progress is not None:
+                progress(done, total)
+    if progress is not None:
+        progress(total, total)
+
+def _write_csv(history, cfg, path, progress=None, cancel=None, summary=None, compress=False):
+    if compress:
+        fh = gzip.open(path, "wt", encoding="utf-8", newline="", compresslevel=6)
+    else:
+        fh = open(path, "w", encoding="utf-8", newline="")
+    with fh:
+        w = csv.writer(fh)
+        w.writerow(HEADERS)
+        w.writerows(_iter_export_rows(history, progress, cancel))
+
+def _write_csv_gz(history, cfg, path, progress=None, cancel=None, summary=None):
+    _write_csv(history, cfg, path, progress, cancel, compress=True)
+
+# Formato colunar: MAGIC, tamanho do cabeçalho JSON (u32), cabeçalho, e as colunas
+# brutas (little-endian) alinhadas a 8 bytes, nos deslocamentos do cabeçalho.
+COLUMNAR_MAGIC = b"TSC1"
+
+def _write_columnar(history, cfg, path, progress=None, cancel=None, summary=None):
+    n = len(history)
+    cols = []; offset = 0
+    for name, tc in COLUMNS:
+        size = array(tc).itemsize * n
+        cols.append({"name": name, "header": HEADERS[len(cols)], "type": tc, "offset": offset})
+        offset += (size + 7) & ~7
+    meta = {"rows": n, "columns": cols, "modes": list(MODES), "zones": list(ZONES),
+            "cfg": {k: cfg[k] for k in ("ref_db", "exchange_rate_db", "base_time_sec") if k in cfg}}
+    head = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+    head += b" " * (-(len(COLUMNAR_MAGIC) + 4 + len(head)) % 8)
+    with open(path, "wb") as fh:
+        fh.write(COLUMNAR_MAGIC + struct.pack("<I", len(head)) + head)
+        for i, (name, _tc) in enumerate(COLUMNS):
+            if cancel is not None and cancel.is_set():
+                raise ExportCancelled()
+            data = history.column(name)
+            if sys.byteorder != "little":
+                data.byteswap()
+            fh.write(data.tobytes())
+            fh.write(b"\0" * (-len(data) * data.itemsize % 8))
+            if progress is not None:
+                progress(n * (i + 1) // len(COLUMNS), n)
+
+def load_columnar(path):
+    """Abre um arquivo colunar via mmap: devolve (meta, {coluna: memoryview tipada}).
+
+    As colunas não são copiadas; o mmap fica vivo enquanto houver views.
+    Modo e zona vêm como códigos (ver meta["modes"] / meta["zones"]).
+    """
+    with open(path, "rb") as fh:
+        mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    if mm[:4] != COLUMNAR_MAGIC:
+        mm.close()
+        raise ValueError(f"arquivo colunar inválido: {path}")
+    (hlen,) = struct.unpack_from("<I", mm, 4)
+    meta = json.loads(bytes(mm[8:8 + hlen]))
+    base = 8 + hlen
+    n = meta["rows"]
+    mv = memoryview(mm)
+    cols = {}
+    for c in meta["columns"]:
+        size = array(c["type"]).itemsize
+        cols[c["name"]] = mv[base + c["offset"]: base + c["offset"] + size * n].cast(c["type"])
+    return meta, cols
+
+# (sufixo, rótulo, escritor, disponível)
+EXPORTERS = []
+
+def register_exporter(suffix, label, write, available=None):
+    """Registra um formato; `write(history, cfg, path, progress, cancel, summary)`."""
+    EXPORTERS.append((suffix, label, write, available or (lambda: True)))
+
+register_exporter(".xlsx", "Pasta de trabalho do Excel", _write_xlsx, has_openpyxl)
+register_exporter(".csv.gz", "CSV compactado (gzip)", _write_csv_gz)
+register_exporter(".csv", "CSV", _write_csv)
+register_exporter(".tsc", "Binário colunar (mmap)", _write_columnar)
+
+def exporter_for(filename):
+    name = str(filename).lower()
+    for suffix, label, write, available in EXPORTERS:
+        if name.endswith(suffix):
+            return suffix, label, write, available
+    raise ValueError(f"formato de exportação não suportado: {filename}")
+
+def export_report(history, cfg: dict, filename, progress=None, cancel=None, summary=None):
+    """Exporta no formato indicado pela extensão; grava num temporário e renomeia
+    (sem arquivo parcial)."""
+    _suffix, label, write, available = exporter_for(filename)
+    if not available():
+        raise RuntimeError(f"{label}: dependência ausente")
+    tmp = f"{filename}.part"
+    try:
+        write(history, cfg, tmp, progress, cancel, summary)
+        if cancel is not None and cancel.is_set():
+            raise ExportCancelled()
+        os.replace(tmp, filename)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+class ReportExport:
+    """Exportação em thread própria sobre um snapshot do histórico.
+
+    `on_progress(feitas, total)` e `on_done(erro)` são chamados na thread de
+    exportação (erro é None, ExportCancelled ou a exceção ocorrida).
+    """
+    def __init__(self, history, cfg, filename, on_progress=None, on_done=None, summary=None):
+        self.history = history
+        self.summary = summary
+        self.cfg = dict(cfg)
+        self.filename = filename
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self._cancel = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="export", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        err = None
+        try:
+            export_report(self.history, self.cfg, self.filename, self.on_progress, self._cancel, self.summary)
+        except Exception as e:
+            err = e
+        if self.on_done is not None:
+            self.on_done(err)
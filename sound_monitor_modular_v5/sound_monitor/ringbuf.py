@@ -0,0 +1,124 @@
+import threading
+from array import array
+
+class ColumnRing:
+    """Buffer circular de colunas tipadas (`array`) com capacidade fixa.
+
+    append e descarte do mais antigo são O(1); leituras devolvem fatias
+    `memoryview` (no máximo duas por coluna, por causa da volta do anel) sem copiar.
+    Quem lê enquanto outra thread escreve deve segurar `lock`.
+    """
+    def __init__(self, columns, capacity):
+        self.capacity = max(1, int(capacity))
+        self.names = tuple(name for name, _ in columns)
+        self._cols = tuple(array(tc, [0]) * self.capacity for _, tc in columns)
+        self._index = {name: i for i, name in enumerate(self.names)}
+        self._head = 0
+        self._len = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self._len
+
+    def clear(self):
+        with self.lock:
+            self._head = 0
+            self._len = 0
+
+    def append(self, *values):
+        with self.lock:
+            cap = self.capacity
+            if self._len == cap:
+                pos = self._head
+                self._head = (self._head + 1) % cap
+            else:
+                pos = (self._head + self._len) % cap
+                self._len += 1
+            for col, v in zip(self._cols, values):
+                col[pos] = v
+
+    def drop_oldest(self, n=1):
+        with self.lock:
+            n = max(0, min(int(n), self._len))
+            self._head = (self._head + n) % self.capacity
+            self._len -= n
+
+    def _pos(self, i):
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError("índice fora do buffer")
+        return (self._head + i) % self.capacity
+
+    def value(self, name, i):
+        return self._cols[self._index[name]][self._pos(i)]
+
+    def row(self, i):
+        p = self._pos(i)
+        return tuple(col[p] for col in self._cols)
+
+    def __getitem__(self, i):
+        return self.row(i)
+
+    def segments(self, name, start=0, stop=None):
+        """Fatias memoryview (sem cópia) do intervalo lógico [start, stop) da coluna."""
+        stop = self._len if stop is None else min(stop, self._len)
+        n = stop - start
+        if n <= 0:
+            return ()
+        mv = memoryview(self._cols[self._index[name]])
+        p = (self._head + start) % self.capacity
+        if p + n <= self.capacity:
+            return (mv[p:p + n],)
+        k = self.capacity - p
+        return (mv[p:], mv[:n - k])
+
+    def rows(self, start=0, stop=None):
+        """Itera tuplas (uma por linha) sobre as fatias do intervalo, sem copiar as colunas."""
+        stop = self._len if stop is None else min(stop, self._len)
+        if stop <= start:
+            return
+        p = (self._head + start) % self.capacity
+        n = stop - start
+        if p + n <= self.capacity:
+            spans = ((p, p + n),)
+        else:
+            spans = ((p, self.capacity), (0, n - (self.capacity - p)))
+        for a, b in spans:
+            yield from zip(*(memoryview(col)[a:b] for col in self._cols))
+
+    def __iter__(self):
+        return self.rows()
+
+    def bisect_left(self, name, x):
+        """Primeiro índice lógico com coluna >= x (coluna crescente)."""
+        col = self._cols[self._index[name]]
+        cap, head = self.capacity, self._head
+        lo, hi = 0, self._len
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if col[(head + mid) % cap] < x:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+class TimeWindowRing(ColumnRing):
+    """Pontos (t, L, dose) do gráfico indexados pelo tempo de sessão, com janela deslizante."""
+    def __init__(self, capacity):
+        super().__init__((("t", "d"), ("L", "d"), ("dose", "d")), capacity)
+
+    def evict_before(self, t_min):
+        """Descarta pontos com t < t_min (O(1) amortizado: cada ponto sai uma vez)."""
+        with self.lock:
+            t = self._cols[0]
+            cap = self.capacity
+            while self._len and t[self._head] < t_min:
+                self._head = (self._head + 1) % cap
+                self._len -= 1
+
+    def latest_t(self):
+        return self.value("t", -1) if self._len else None
+
+    def window_start(self, t_min):
+        return self.bisect_left("t", t_min)
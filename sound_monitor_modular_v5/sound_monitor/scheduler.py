@@ -0,0 +1,28 @@
+import time, threading
+
+class TickScheduler:
+    """Dorme até o próximo prazo previsto ou até um `wake()` externo (sem polling)."""
+    def __init__(self, max_sleep=60.0):
+        self.max_sleep = float(max_sleep)
+        self._cond = threading.Condition()
+        self._pending = False
+        self.wakeups = 0
+        self.external_wakes = 0
+
+    def wake(self):
+        with self._cond:
+            self._pending = True
+            self._cond.notify()
+
+    def sleep_until(self, deadline):
+        """Bloqueia até `deadline` (time.time()); devolve True se acordado externamente."""
+        with self._cond:
+            timeout = min(self.max_sleep, deadline - time.time())
+            if not self._pending and timeout > 0:
+                self._cond.wait(timeout)
+            woken = self._pending
+            self._pending = False
+        self.wakeups += 1
+        if woken:
+            self.external_wakes += 1
+        return woken
@@ -0,0 +1,413 @@
+# Índice das sessões de áudio por aplicativo (player, navegador, chamada) no
+# dispositivo padrão. Enumera uma vez e depois só segue as notificações de
+# sessão criada/expirada e de volume; por tick não há chamada COM nenhuma.
+import threading, time
+from collections import deque
+from .com_guard import ComGuard
+from .audio import E_RENDER, E_MULTIMEDIA
+
+try:
+    from comtypes import CLSCTX_ALL, COMObject  # type: ignore
+    from pycaw.pycaw import (  # type: ignore
+        AudioUtilities, IAudioSessionControl2, IAudioSessionEvents, IAudioSessionManager2,
+        IAudioSessionNotification, ISimpleAudioVolume,
+    )
+
+    class _SessionCreatedClient(COMObject):
+        """IAudioSessionNotification: entrega a sessão nova ao índice (sem enumerar de novo)."""
+        _com_interfaces_ = [IAudioSessionNotification]
+
+        def __init__(self, sink):
+            super().__init__()
+            self._sink = sink
+
+        def OnSessionCreated(self, new_session):
+            try:
+                # QueryInterface fica com uma referência própria para a thread do índice
+                self._sink._on_created(new_session.QueryInterface(IAudioSessionControl2))
+            except Exception:
+                pass
+            return 0
+
+    class _SessionEventsClient(COMObject):
+        """IAudioSessionEvents de uma sessão: volume/mudo e estado vão direto ao cache."""
+        _com_interfaces_ = [IAudioSessionEvents]
+
+        def __init__(self, sink, key):
+            super().__init__()
+            self._sink = sink
+            self._key = key
+
+        def OnSimpleVolumeChanged(self, new_volume, new_mute, event_context):
+            self._sink._on_volume(self._key, float(new_volume) * 100.0, bool(new_mute))
+            return 0
+
+        def OnStateChanged(self, new_state):
+            self._sink._on_state(self._key, int(new_state))
+            return 0
+
+        def OnSessionDisconnected(self, reason):
+            self._sink._on_gone(self._key)
+            return 0
+
+        def OnDisplayNameChanged(self, name, event_context):
+            return 0
+
+        def OnIconPathChanged(self, path, event_context):
+            return 0
+
+        def OnChannelVolumeChanged(self, count, volumes, changed, event_context):
+            return 0
+
+        def OnGroupingParamChanged(self, param, event_context):
+            return 0
+
+    _PYCAW_SESSIONS = True
+except Exception:
+    _PYCAW_SESSIONS = False
+
+try:
+    import psutil  # type: ignore  (dependência do pycaw)
+except Exception:
+    psutil = None
+
+# AudioSessionState
+STATE_INACTIVE = 0
+STATE_ACTIVE = 1
+STATE_EXPIRED = 2
+
+REFRESH_INTERVAL = 10.0     # reenumeração só quando não há notificações
+SYSTEM_SOUNDS = "Sons do sistema"
+
+class AudioSession:
+    """Sessão de um processo no endpoint: volume (%) do ISimpleAudioVolume e estado."""
+    __slots__ = ("key", "pid", "name", "state", "volume", "muted")
+
+    def __init__(self, key, pid, name, state=STATE_INACTIVE, volume=100.0, muted=False):
+        self.key = key
+        self.pid = pid
+        self.name = name
+        self.state = state
+        self.volume = float(volume)
+        self.muted = bool(muted)
+
+    def as_dict(self):
+        return {"pid": self.pid, "name": self.name, "state": self.state,
+                "volume": self.volume, "muted": self.muted}
+
+def _process_name(pid):
+    if not pid:
+        return SYSTEM_SOUNDS
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).name()
+        except Exception:
+            pass
+    return f"pid {pid}"
+
+class PycawSessions:
+    """Fonte de sessões do Core Audio (IAudioSessionManager2 do dispositivo padrão).
+
+    Todos os métodos rodam na thread do `SessionIndex`; os objetos de
+    notificação só chamam os métodos `_on_*` do índice.
+    """
+    def __init__(self):
+        self._mgr = None
+        self._created = None
+        self._ctls = {}         # chave -> (IAudioSessionControl2, ISimpleAudioVolume, eventos)
+        self.com_calls = 0
+
+    def available(self) -> bool:
+        return _PYCAW_SESSIONS
+
+    def open(self, sink):
+        """Enumera as sessões atuais e registra as notificações; devolve (sessões, notifica?)."""
+        if not _PYCAW_SESSIONS:
+            raise RuntimeError("pycaw não disponível")
+        dev = AudioUtilities.GetDeviceEnumerator().GetDefaultAudioEndpoint(E_RENDER, E_MULTIMEDIA)
+        mgr = dev.Activate(IAudioSessionManager2._iid_, CLSCTX_ALL, None).QueryInterface(IAudioSessionManager2)
+        self._mgr = mgr
+        # a enumeração precisa vir antes do registro para o OnSessionCreated funcionar
+        enum = mgr.GetSessionEnumerator()
+        count = enum.GetCount()
+        self.com_calls += 4
+        found = []
+        for i in range(count):
+            self.com_calls += 1
+            s = self.describe(enum.GetSession(i).QueryInterface(IAudioSessionControl2), sink)
+            if s is not None:
+                found.append(s)
+        watching = False
+        try:
+            self._created = _SessionCreatedClient(sink)
+            mgr.RegisterSessionNotification(self._created)
+            watching = True
+        except Exception:
+            self._created = None
+        self.com_calls += 1
+        return found, watching
+
+    def describe(self, ctl, sink):
+        """Lê uma sessão (id, pid, estado, volume) e registra os eventos dela."""
+        try:
+            key = ctl.GetSessionInstanceIdentifier()
+            if key in self._ctls:
+                self.forget(key)
+            state = int(ctl.GetState())
+            if state == STATE_EXPIRED:
+                return None
+            pid = int(ctl.GetProcessId())
+            simple = ctl.QueryInterface(ISimpleAudioVolume)
+            volume = float(simple.GetMasterVolume()) * 100.0
+            muted = bool(simple.GetMute())
+            name = ctl.GetDisplayName()
+            self.com_calls += 7
+            if not name or name.startswith("@"):
+                name = _process_name(pid)
+            events = _SessionEventsClient(sink, key)
+            ctl.RegisterAudioSessionNotification(events)
+            self.com_calls += 1
+        except Exception:
+            return None
+        self._ctls[key] = (ctl, simple, events)
+        return AudioSession(key, pid, name, state, volume, muted)
+
+    def set_volume(self, key, pct):
+        entry = self._ctls.get(key)
+        if entry is None:
+            raise KeyError(key)
+        self.com_calls += 1
+        entry[1].SetMasterVolume(max(0.0, min(100.0, float(pct))) / 100.0, None)
+
+    def forget(self, key):
+        entry = self._ctls.pop(key, None)
+        if entry is not None:
+            self.com_calls += 1
+            try:
+                entry[0].UnregisterAudioSessionNotification(entry[2])
+            except Exception:
+                pass
+
+    def close(self):
+        for key in list(self._ctls):
+            self.forget(key)
+        if self._mgr is not None and self._created is not None:
+            self.com_calls += 1
+            try:
+                self._mgr.UnregisterSessionNotification(self._created)
+            except Exception:
+                pass
+        self._mgr = self._created = None
+
+def make_session_source(backend=None):
+    """Fonte que acompanha o backend: o endpoint simulado traz a própria; senão Core Audio."""
+    factory = getattr(backend, "session_source", None) if backend is not None else None
+    return factory() if factory is not None else PycawSessions()
+
+class SessionIndex:
+    """Índice das sessões de áudio por aplicativo, com uma thread dona da fonte.
+
+    A thread enumera uma vez e depois aplica sessões criadas/expiradas à medida
+    que as notificações chegam; volume e estado de cada sessão são atualizados
+    direto no cache pelos eventos, então `sessions`, `get_volume` e `shares`
+    não fazem chamada COM. Escritas de volume são enfileiradas (write-through
+    no cache). Sem notificações, reenumera a cada `refresh_interval`.
+    """
+    def __init__(self, source, refresh_interval=REFRESH_INTERVAL):
+        self.source = source
+        self.refresh_interval = float(refresh_interval)
+        self.watching = False
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._sessions = {}
+        self._pending = deque()
+        self._next_refresh = 0.0
+        self._stop = False
+        self._thread = None
+        self.enumerations = 0
+        self.created = 0
+        self.expired = 0
+        self.volume_events = 0
+        self.sets = 0
+        self.skipped = 0
+        self.errors = 0
+        self.last_error = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="audio-sessions", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def available(self) -> bool:
+        return self.source.available()
+
+    # --- leitura (cache) ---
+    def sessions(self):
+        """{chave: dict(pid, name, state, volume, muted)} das sessões vivas."""
+        with self._lock:
+            return {k: s.as_dict() for k, s in self._sessions.items()}
+
+    def get_volume(self, key):
+        with self._lock:
+            s = self._sessions.get(key)
+            return None if s is None else s.volume
+
+    def find(self, name):
+        """Chaves das sessões de um aplicativo (mesmo nome de processo)."""
+        with self._lock:
+            return [k for k, s in self._sessions.items() if s.name == name]
+
+    def shares(self):
+        """Fração da exposição atual por aplicativo.
+
+        Sessões ativas e sem mudo pesam pela energia do ganho da sessão
+        (volume²); o programa de cada uma é tratado como de mesmo nível, já
+        que o endpoint só mede a mixagem. Vazio se nenhuma sessão toca.
+        """
+        weights = {}
+        with self._lock:
+            for s in self._sessions.values():
+                if s.state == STATE_ACTIVE and not s.muted and s.volume > 0:
+                    weights[s.name] = weights.get(s.name, 0.0) + (s.volume / 100.0) ** 2
+        total = sum(weights.values())
+        return {name: w / total for name, w in weights.items()} if total > 0 else {}
+
+    def offender(self):
+        """Aplicativo com maior fração da exposição (ou None)."""
+        shares = self.shares()
+        return max(shares, key=shares.get) if shares else None
+
+    # --- escrita ---
+    def set_volume(self, key, pct):
+        pct = max(0.0, min(100.0, float(pct)))
+        with self._cond:
+            s = self._sessions.get(key)
+            if s is None:
+                return False
+            if abs(s.volume - pct) < 0.01:
+                self.skipped += 1
+                return True
+            s.volume = pct
+            self._pending.append(("set", key, pct))
+            self._cond.notify()
+        return True
+
+    def rebind(self):
+        """Dispositivo padrão mudou: reenumera no novo endpoint."""
+        self._post(("rebind",))
+
+    def stats(self):
+        with self._lock:
+            active = sum(1 for s in self._sessions.values() if s.state == STATE_ACTIVE)
+            out = {
+                "sessions": len(self._sessions), "active": active, "watching": self.watching,
+                "enumerations": self.enumerations, "created": self.created, "expired": self.expired,
+                "volume_events": self.volume_events, "sets": self.sets, "skipped": self.skipped,
+                "errors": self.errors, "last_error": self.last_error,
+            }
+        out["com_calls"] = getattr(self.source, "com_calls", None)
+        return out
+
+    # --- notificações (threads do COM) ---
+    def _on_created(self, handle):
+        self._post(("add", handle))
+
+    def _on_volume(self, key, pct, muted):
+        with self._lock:
+            s = self._sessions.get(key)
+            if s is not None:
+                s.volume, s.muted = float(pct), bool(muted)
+                self.volume_events += 1
+
+    def _on_state(self, key, state):
+        if state == STATE_EXPIRED:
+            self._post(("remove", key))
+            return
+        with self._lock:
+            s = self._sessions.get(key)
+            if s is not None:
+                s.state = state
+
+    def _on_gone(self, key):
+        self._post(("remove", key))
+
+    def _post(self, op):
+        with self._cond:
+            self._pending.append(op)
+            self._cond.notify()
+
+    # --- thread do índice ---
+    def _run(self):
+        with ComGuard():
+            self._open()
+            try:
+                self._loop()
+            finally:
+                try:
+                    self.source.close()
+                except Exception:
+                    pass
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stop:
+                    timeout = None if self.watching else self._next_refresh - time.monotonic()
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+                if self._stop:
+                    return
+                batch, self._pending = self._pending, deque()
+            for op in batch:
+                try:
+                    self._apply(op)
+                except Exception as e:
+                    self.errors += 1
+                    self.last_error = str(e)
+            if not self.watching and time.monotonic() >= self._next_refresh:
+                self._open()
+
+    def _apply(self, op):
+        kind = op[0]
+        if kind == "add":
+            s = self.source.describe(op[1], self)
+            if s is not None:
+                with self._lock:
+                    if s.key not in self._sessions:
+                        self.created += 1
+                    self._sessions[s.key] = s
+        elif kind == "remove":
+            self.source.forget(op[1])
+            with self._lock:
+                if self._sessions.pop(op[1], None) is not None:
+                    self.expired += 1
+        elif kind == "set":
+            self.source.set_volume(op[1], op[2])
+            self.sets += 1
+        elif kind == "rebind":
+            self._open()
+
+    def _open(self):
+        src = self.source
+        try:
+            src.close()
+            found, watching = src.open(self) if src.available() else ([], False)
+        except Exception as e:
+            found, watching = [], False
+            self.errors += 1
+            self.last_error = str(e)
+        self.enumerations += 1
+        self.watching = watching
+        self._next_refresh = time.monotonic() + self.refresh_interval
+        with self._lock:
+            self._sessions = {s.key: s for s in found}
@@ -2,12 +2,13 @@ import tkinter as tk
 import customtkinter as ctk
 from tkinter import messagebox
 from .constants import DISCORD_SURFACE, DISCORD_SURFACE_ALT, DISCORD_ACCENT
-from .utils import allowed_time_seconds_for_level, round_pct_ui, map_percent_to_db
+from .profile import ExposureProfile
 
 def open_settings_modal(app):
     def _cfg_preview_text(tmp_cfg):
-        t85 = allowed_time_seconds_for_level(85, tmp_cfg)
-        t90 = allowed_time_seconds_for_level(90, tmp_cfg)
+        prof = ExposureProfile(tmp_cfg)
+        t85 = prof.allowed(85)
+        t90 = prof.allowed(90)
         def pretty(sec):
             s = int(max(0, sec)); h = s // 3600; m = (s % 3600) // 60
             if h > 0: return f"{h}h {m}min"
@@ -68,7 +69,7 @@ def open_settings_modal(app):
     dyn_names = ["Reserva de tempo (10–20 min)", "Reduzir até Zona Segura"]
     dyn_map_name_to_key = {"Reserva de tempo (10–20 min)": "reserva", "Reduzir até Zona Segura": "zona_segura"}
     dyn_map_key_to_name = {v: k for k, v in dyn_map_name_to_key.items()}
-    var_dyn = tk.StringVar(value=dyn_map_key_to_name.get(app.dynamic_strategy, dyn_names[0]))
+    var_dyn = tk.StringVar(value=dyn_map_key_to_name.get(app.engine.dynamic_strategy, dyn_names[0]))
     ctk.CTkOptionMenu(basic_wrap, values=dyn_names, variable=var_dyn).pack(fill="x", pady=(0,6))
     ctk.CTkLabel(basic_wrap,
         text=("• Reserva: mantém uma folga alvo e reduz suave quando precisa.\n"
@@ -98,7 +99,7 @@ def open_settings_modal(app):
                                float(app.cfg["min_enforced_volume"]),
                                lambda v: tmp_min.__setitem__(0, v), max_to=60)
 
-    var_dyn_softlock = tk.BooleanVar(value=app.dynamic_softlock_enabled)
+    var_dyn_softlock = tk.BooleanVar(value=app.engine.dynamic_softlock_enabled)
     ctk.CTkCheckBox(
         basic_wrap,
         text="Travar aumentos enquanto o Dinâmico reduz (soft-lock)",
@@ -169,15 +170,16 @@ def open_settings_modal(app):
                 "min_enforced_volume": min_vol,
                 "default_volume": def_vol,
             })
-            app.dynamic_softlock_enabled = bool(var_dyn_softlock.get())
-            app.dynamic_strategy = dyn_key
+            app.engine.cfg_changed()
+            app.engine.dynamic_softlock_enabled = bool(var_dyn_softlock.get())
+            app.engine.dynamic_strategy = dyn_key
 
             app._refresh_profile_label()
             app.gauge.set_bounds(app.cfg["min_db"], app.cfg["max_db"])
-            L_eff = map_percent_to_db(app._vol_cache, app.cfg)
-            app.gauge.set_value(L_eff, app.session_dose)
-            app.vol_label.configure(text=f"{round_pct_ui(app._vol_cache)}%")
-            app.set_mode(app.mode, silent=True)
+            L_eff = app.engine.profile.level(app._vol_cache)
+            app._render.apply_now("gauge", (L_eff, app.engine.session_dose))
+            app._set_vol_label(app._vol_cache)
+            app.set_mode(app.engine.mode, silent=True)
             app._save_settings()
 
             _refresh_preview_for_profile(var_profile.get())
@@ -0,0 +1,263 @@
+import random, threading, time
+
+class SimulatedEndpoint:
+    """Endpoint de áudio em memória com a mesma interface do AudioBackend.
+
+    Serve para exercitar bloqueio, enforcer e sincronização fora do Windows e
+    para medir o custo de cada caminho sob latências parecidas com as do COM:
+    cada chamada dorme `latency` + U(0, `jitter`) s, falha com probabilidade
+    `fail_rate` e levanta erro enquanto o dispositivo estiver desconectado.
+    Toda mudança de volume (nossa ou externa) dispara os callbacks de `watch`
+    após `notify_latency`, como o IAudioEndpointVolumeCallback; com
+    `notifications=False` o endpoint só atende polling. Cada dispositivo tem
+    o próprio volume; `switch_device` troca o padrão e avisa `watch_devices`.
+    """
+    def __init__(self, volume=30.0, notifications=True, latency=0.0, jitter=0.0,
+                 fail_rate=0.0, notify_latency=0.0, seed=None,
+                 device=("sim-0", "Alto-falantes (simulado)")):
+        self._lock = threading.Lock()
+        self._device_id, name = device
+        self._names = {self._device_id: name}
+        self._volumes = {self._device_id: float(volume)}
+        self._watchers = []
+        self._device_watchers = []
+        self._connected = True
+        self._rng = random.Random(seed)
+        self.notifications = notifications
+        self.latency = float(latency)
+        self.jitter = float(jitter)
+        self.fail_rate = float(fail_rate)
+        self.notify_latency = float(notify_latency)
+        self.calls = {}         # (método, thread) -> chamadas
+        self.failures = 0
+        self.busy_sec = 0.0     # tempo total dentro de chamadas
+        self.external_changes = 0
+        self.sessions = None
+
+    # --- interface do backend ---
+    def available(self) -> bool:
+        return True
+
+    def get_percent(self) -> float:
+        self._call("get_percent")
+        with self._lock:
+            return self._volumes[self._device_id]
+
+    def set_percent(self, pct: float):
+        self._call("set_percent")
+        self._change(pct)
+
+    def watch(self, fn) -> bool:
+        if not self.notifications:
+            return False
+        with self._lock:
+            self._watchers.append(fn)
+        return True
+
+    def unwatch(self):
+        with self._lock:
+            self._watchers.clear()
+            self._device_watchers.clear()
+
+    def watch_devices(self, fn) -> bool:
+        if not self.notifications:
+            return False
+        with self._lock:
+            self._device_watchers.append(fn)
+        return True
+
+    def device(self):
+        return self._device_id, self._names.get(self._device_id)
+
+    def session_source(self):
+        """Sessões por aplicativo deste endpoint (ver `SimulatedSessions`)."""
+        if self.sessions is None:
+            self.sessions = SimulatedSessions(self.notifications)
+        return self.sessions
+
+    # --- controle da simulação ---
+    def external_set(self, pct):
+        """Simula o usuário mudando o volume por fora (mixer do SO, teclas de mídia)."""
+        self.external_changes += 1
+        self._change(pct)
+
+    def switch_device(self, device_id, name=None, volume=50.0):
+        """Troca o dispositivo padrão (ex.: fone USB conectado); mantém o volume de cada um."""
+        with self._lock:
+            self._device_id = device_id
+            if name is not None or device_id not in self._names:
+                self._names[device_id] = name
+            self._volumes.setdefault(device_id, float(volume))
+            self._connected = True
+            watchers = list(self._device_watchers)
+        for fn in watchers:
+            fn(device_id)
+
+    def disconnect(self):
+        """Dispositivo sumiu: as chamadas passam a falhar até `reconnect()`."""
+        self._connected = False
+
+    def reconnect(self):
+        self._connected = True
+
+    def peek(self):
+        """Volume atual sem contar chamada nem latência (para medições)."""
+        return self._volumes[self._device_id]
+
+    def call_count(self, method=None):
+        return sum(n for (m, _t), n in self.calls.items() if method is None or m == method)
+
+    def stats(self):
+        return {
+            "gets": self.call_count("get_percent"), "sets": self.call_count("set_percent"),
+            "failures": self.failures, "busy_sec": self.busy_sec,
+            "external_changes": self.external_changes, "connected": self._connected,
+            "device_id": self._device_id, "device_name": self._names.get(self._device_id),
+            "by_thread": {f"{m}@{t}": n for (m, t), n in sorted(self.calls.items())},
+        }
+
+    def _call(self, method):
+        key = (method, threading.current_thread().name)
+        with self._lock:
+            self.calls[key] = self.calls.get(key, 0) + 1
+            delay = self.latency + (self._rng.uniform(0.0, self.jitter) if self.jitter else 0.0)
+            fail = not self._connected or (self.fail_rate and self._rng.random() < self.fail_rate)
+            if fail:
+                self.failures += 1
+        if delay > 0:
+            time.sleep(delay)
+        with self._lock:
+            self.busy_sec += delay
+        if not self._connected:
+            raise OSError("dispositivo de áudio desconectado (simulado)")
+        if fail:
+            raise OSError("falha transitória do endpoint (simulada)")
+
+    def _change(self, pct):
+        with self._lock:
+            value = self._volumes[self._device_id] = max(0.0, min(100.0, float(pct)))
+            watchers = list(self._watchers)
+        for fn in watchers:
+            if self.notify_latency > 0:
+                t = threading.Timer(self.notify_latency, fn, (value,))
+                t.daemon = True
+                t.start()
+            else:
+                fn(value)
+
+class SimulatedSessions:
+    """Sessões de áudio por aplicativo em memória, com a interface de `sessions.PycawSessions`.
+
+    `add`/`expire`/`set_state`/`external_volume` simulam apps abrindo, fechando,
+    tocando e mudando o próprio volume; cada evento chega ao índice como as
+    notificações do Core Audio. `com_calls` conta o que seria chamada COM.
+    """
+    def __init__(self, notifications=True):
+        self.notifications = notifications
+        self._lock = threading.Lock()
+        self._sessions = {}     # chave -> [pid, nome, estado, volume, mudo]
+        self._sink = None
+        self._next = 0
+        self.com_calls = 0
+
+    # --- interface da fonte ---
+    def available(self) -> bool:
+        return True
+
+    def open(self, sink):
+        from .sessions import AudioSession
+        with self._lock:
+            self.com_calls += 2 + 5 * len(self._sessions)
+            found = [AudioSession(k, *rec) for k, rec in self._sessions.items()]
+            self._sink = sink if self.notifications else None
+        return found, self.notifications
+
+    def describe(self, key, sink):
+        from .sessions import AudioSession
+        with self._lock:
+            rec = self._sessions.get(key)
+            self.com_calls += 5
+        return None if rec is None else AudioSession(key, *rec)
+
+    def set_volume(self, key, pct):
+        with self._lock:
+            self.com_calls += 1
+            self._sessions[key][3] = max(0.0, min(100.0, float(pct)))
+
+    def forget(self, key):
+        with self._lock:
+            self.com_calls += 1
+
+    def close(self):
+        with self._lock:
+            self._sink = None
+
+    # --- controle da simulação ---
+    def add(self, name, pid=None, volume=100.0, active=True):
+        with self._lock:
+            self._next += 1
+            key = f"sim-session-{self._next}"
+            self._sessions[key] = [pid if pid is not None else 1000 + self._next, name,
+                                   1 if active else 0, float(volume), False]
+            sink = self._sink
+        if sink is not None:
+            sink._on_created(key)
+        return key
+
+    def expire(self, key):
+        with self._lock:
+            self._sessions.pop(key, None)
+            sink = self._sink
+        if sink is not None:
+            sink._on_state(key, 2)
+
+    def set_state(self, key, active):
+        with self._lock:
+            self._sessions[key][2] = 1 if active else 0
+            sink = self._sink
+        if sink is not None:
+            sink._on_state(key, 1 if active else 0)
+
+    def external_volume(self, key, pct, muted=False):
+        with self._lock:
+            rec = self._sessions[key]
+            rec[3], rec[4] = float(pct), bool(muted)
+            sink = self._sink
+        if sink is not None:
+            sink._on_volume(key, float(pct), bool(muted))
+
+    def peek(self, key):
+        return self._sessions[key][3]
+
+class UserActivity(threading.Thread):
+    """Mudanças externas aleatórias de volume (intervalos exponenciais com média `mean_interval`)."""
+    def __init__(self, endpoint, mean_interval=5.0, low=10.0, high=90.0, seed=None):
+        super().__init__(name="sim-user", daemon=True)
+        self.endpoint = endpoint
+        self.mean_interval = float(mean_interval)
+        self.low, self.high = float(low), float(high)
+        self._rng = random.Random(seed)
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.wait(self._rng.expovariate(1.0 / self.mean_interval)):
+            self.endpoint.external_set(round(self._rng.uniform(self.low, self.high)))
+
+    def stop(self):
+        self._halt.set()
+
+def parse_spec(spec):
+    """'latency=0.004,jitter=0.002,fail=0.01,notify=0' -> kwargs do SimulatedEndpoint."""
+    names = {"latency": "latency", "jitter": "jitter", "fail": "fail_rate", "fail_rate": "fail_rate",
+             "notify_latency": "notify_latency", "volume": "volume", "seed": "seed"}
+    kw = {}
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        key, _, value = part.partition("=")
+        key = key.strip()
+        if key == "notify":
+            kw["notifications"] = value.strip().lower() not in ("0", "false", "no")
+        elif key in names:
+            kw[names[key]] = int(value) if key == "seed" else float(value)
+        else:
+            raise ValueError(f"opção desconhecida do endpoint simulado: {key}")
+    return kw
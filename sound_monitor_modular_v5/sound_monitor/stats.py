@@ -0,0 +1,100 @@
+import math, threading
+from .history import MODES, ZONES
+
+class SessionStats:
+    """Estatísticas da sessão mantidas incrementalmente (O(1) por amostra).
+
+    Cada intervalo entre amostras conta com o nível/zona/modo da amostra
+    anterior (mesma convenção da média ponderada de `compute_summary_stats`).
+    Com `device`, tempo e dose ganha no intervalo também vão para o
+    dispositivo de saída em uso; com `apps` ({app: fração}, ver
+    `SessionIndex.shares`), a dose é repartida entre os aplicativos.
+    """
+    __slots__ = (
+        "lock", "points", "total_time_s", "_sum_L", "_sum_energy",
+        "peak_db", "peak_vol", "max_dose", "t_to_50", "t_to_100",
+        "zone_time", "mode_time", "device_time", "device_dose", "app_time", "app_dose",
+        "_prev_t", "_prev_L", "_prev_zone", "_prev_mode", "_prev_dose", "_prev_device", "_prev_apps",
+    )
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.points = 0
+            self.total_time_s = 0.0
+            self._sum_L = 0.0
+            self._sum_energy = 0.0
+            self.peak_db = float("-inf")
+            self.peak_vol = float("-inf")
+            self.max_dose = 0.0
+            self.t_to_50 = None
+            self.t_to_100 = None
+            self.zone_time = dict.fromkeys(ZONES, 0.0)
+            self.mode_time = dict.fromkeys(MODES, 0.0)
+            self.device_time = {}
+            self.device_dose = {}
+            self.app_time = {}
+            self.app_dose = {}
+            self._prev_t = None
+            self._prev_dose = None
+            self._prev_device = None
+            self._prev_apps = None
+            self._prev_L = None
+            self._prev_zone = None
+            self._prev_mode = None
+
+    def add(self, sample, device=None, apps=None):
+        """Amostra do DoseEngine: (ts, t_sessao, modo, volume, L, dose, zona, diária)."""
+        _ts, t, mode, vol, L, dose, zone, _daily = sample
+        with self.lock:
+            if self._prev_t is not None:
+                dt = t - self._prev_t
+                if dt > 0:
+                    self.total_time_s += dt
+                    self._sum_L += self._prev_L * dt
+                    self._sum_energy += 10.0 ** (self._prev_L / 10.0) * dt
+                    self.zone_time[self._prev_zone] = self.zone_time.get(self._prev_zone, 0.0) + dt
+                    self.mode_time[self._prev_mode] = self.mode_time.get(self._prev_mode, 0.0) + dt
+                    dev = self._prev_device
+                    if dev is not None:
+                        self.device_time[dev] = self.device_time.get(dev, 0.0) + dt
+                        self.device_dose[dev] = self.device_dose.get(dev, 0.0) + max(0.0, dose - self._prev_dose)
+                    if self._prev_apps:
+                        inc = max(0.0, dose - self._prev_dose)
+                        for app, share in self._prev_apps.items():
+                            self.app_time[app] = self.app_time.get(app, 0.0) + dt
+                            self.app_dose[app] = self.app_dose.get(app, 0.0) + inc * share
+            self._prev_t, self._prev_L, self._prev_zone, self._prev_mode = t, L, zone, mode
+            self._prev_dose, self._prev_device, self._prev_apps = dose, device, apps
+            self.points += 1
+            if L > self.peak_db: self.peak_db = L
+            if vol > self.peak_vol: self.peak_vol = vol
+            if dose > self.max_dose: self.max_dose = dose
+            if self.t_to_50 is None and dose >= 0.5: self.t_to_50 = t
+            if self.t_to_100 is None and dose >= 1.0: self.t_to_100 = t
+
+    def summary(self) -> dict:
+        """Mesmas chaves de `compute_summary_stats`, mais Leq e tempos por zona/modo."""
+        with self.lock:
+            T = self.total_time_s
+            return {
+                "points": self.points,
+                "total_time_s": T,
+                "total_time_days": T / 86400.0,
+                "avg_db": (self._sum_L / T) if T > 0 else 0.0,
+                "leq_db": (10.0 * math.log10(self._sum_energy / T)) if T > 0 else 0.0,
+                "peak_db": self.peak_db if self.peak_db != float("-inf") else 0.0,
+                "peak_vol": self.peak_vol if self.peak_vol != float("-inf") else 0.0,
+                "max_dose": self.max_dose,
+                "t_to_50_days": (self.t_to_50 / 86400.0) if self.t_to_50 is not None else 0.0,
+                "t_to_100_days": (self.t_to_100 / 86400.0) if self.t_to_100 is not None else 0.0,
+                "zone_time_s": dict(self.zone_time),
+                "mode_time_s": dict(self.mode_time),
+                "device_time_s": dict(self.device_time),
+                "device_dose": dict(self.device_dose),
+                "app_time_s": dict(self.app_time),
+                "app_dose": dict(self.app_dose),
+            }
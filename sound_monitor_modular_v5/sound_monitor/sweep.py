@@ -0,0 +1,195 @@
+import argparse, csv, itertools, os, random, statistics, sys, time
+from concurrent.futures import ProcessPoolExecutor
+from .replay import replay, load_trace, TUNABLE_PARAMS, DEFAULT_CFG
+
+# Pesos padrão do score (menor é melhor)
+W_OVERDOSE = 100.0      # por unidade de dose acima de `dose_target`
+W_INTERVENTION = 1.0    # por intervenção/hora
+W_LOCKED = 20.0         # por fração do tempo bloqueado
+
+_TRACES = None          # traços carregados uma vez por processo do pool
+
+def _init_worker(traces):
+    global _TRACES
+    _TRACES = traces
+
+def score(metrics, dose_target=1.0, w_overdose=W_OVERDOSE, w_intervention=W_INTERVENTION, w_locked=W_LOCKED):
+    return (w_overdose * max(0.0, metrics["max_dose"] - dose_target)
+            + w_intervention * metrics["interventions_per_h"]
+            + w_locked * metrics["locked_frac"])
+
+def evaluate(params, traces=None, mode="dinamico", strategy="reserva", cfg=None):
+    """Replay de todos os traços com `params`; métricas agregadas do corpus."""
+    traces = _TRACES if traces is None else traces
+    max_dose = 0.0; dose_sum = 0.0; interventions = 0; locked = 0.0; dur = 0.0
+    for trace, ts0 in traces:
+        r = replay(trace, cfg, mode, strategy, start_ts=ts0, params=params, collect=False)
+        max_dose = max(max_dose, r.max_dose)
+        dose_sum += r.max_dose
+        interventions += r.interventions
+        locked += r.locked_sec
+        dur += r.duration_sec
+    hours = max(dur / 3600.0, 1e-9)
+    return {
+        "max_dose": max_dose,
+        "mean_dose": dose_sum / max(1, len(traces)),
+        "interventions": interventions,
+        "interventions_per_h": interventions / hours,
+        "locked_frac": locked / max(dur, 1e-9),
+    }
+
+def _evaluate_task(args):
+    params, mode, strategy, cfg = args
+    return params, evaluate(params, None, mode, strategy, cfg)
+
+def parse_space(specs):
+    """'nome=v1,v2,...' (grade) ou 'nome=lo:hi' (intervalo contínuo)."""
+    space = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        name = name.strip()
+        if name not in TUNABLE_PARAMS:
+            raise ValueError(f"parâmetro desconhecido: {name} (use um de {', '.join(TUNABLE_PARAMS)})")
+        if ":" in values:
+            lo, hi = (float(x) for x in values.split(":", 1))
+            space[name] = (min(lo, hi), max(lo, hi))
+        else:
+            space[name] = [float(x) for x in values.split(",") if x.strip()]
+    return space
+
+def _as_choices(dim):
+    if isinstance(dim, tuple):
+        lo, hi = dim
+        return [lo, (lo + hi) / 2.0, hi]
+    return dim
+
+def grid_configs(space):
+    names = list(space)
+    for combo in itertools.product(*(_as_choices(space[n]) for n in names)):
+        yield dict(zip(names, combo))
+
+def random_configs(space, n, rng):
+    for _ in range(n):
+        yield {k: (rng.uniform(*d) if isinstance(d, tuple) else rng.choice(d)) for k, d in space.items()}
+
+def _refit(space, elite, rng, n):
+    """Nova população em torno da elite (média/desvio por parâmetro, limitado ao espaço)."""
+    stats = {}
+    for k, d in space.items():
+        vals = [p[k] for p in elite]
+        sd = statistics.pstdev(vals) if len(vals) > 1 else 0.0
+        lo, hi = (d if isinstance(d, tuple) else (min(d), max(d)))
+        stats[k] = (statistics.fmean(vals), max(sd, (hi - lo) * 0.02), lo, hi)
+    out = []
+    for _ in range(n):
+        cfg = {}
+        for k, (mu, sd, lo, hi) in stats.items():
+            v = min(hi, max(lo, rng.gauss(mu, sd)))
+            if not isinstance(space[k], tuple):
+                v = min(space[k], key=lambda c: abs(c - v))
+            cfg[k] = v
+        out.append(cfg)
+    return out
+
+class Sweep:
+    """Avalia configurações num pool de processos; cada tarefa roda o corpus inteiro."""
+    def __init__(self, traces, mode="dinamico", strategy="reserva", cfg=None, workers=None,
+                 dose_target=1.0, weights=(W_OVERDOSE, W_INTERVENTION, W_LOCKED)):
+        self.traces = traces
+        self.mode = mode
+        self.strategy = strategy
+        self.cfg = dict(cfg or DEFAULT_CFG)
+        self.workers = workers or os.cpu_count() or 1
+        self.dose_target = dose_target
+        self.weights = weights
+        self.results = []   # (score, params, métricas)
+        self._pool = None
+
+    def __enter__(self):
+        if self.workers > 1:
+            self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.traces,))
+        else:
+            _init_worker(self.traces)
+        return self
+
+    def __exit__(self, *exc):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def run(self, configs):
+        tasks = [(p, self.mode, self.strategy, self.cfg) for p in configs]
+        if self._pool is not None:
+            chunk = max(1, len(tasks) // (self.workers * 4))
+            done = self._pool.map(_evaluate_task, tasks, chunksize=chunk)
+        else:
+            done = map(_evaluate_task, tasks)
+        batch = []
+        for params, m in done:
+            batch.append((score(m, self.dose_target, *self.weights), params, m))
+        self.results += batch
+        return sorted(batch, key=lambda r: r[0])
+
+    def refine(self, space, population, rounds, rng, elite_frac=0.2):
+        """Busca iterativa (entropia cruzada): amostra, fica com a elite, reajusta."""
+        configs = list(random_configs(space, population, rng))
+        for _ in range(rounds):
+            ranked = self.run(configs)
+            elite = [p for _s, p, _m in ranked[:max(2, int(len(ranked) * elite_frac))]]
+            configs = _refit(space, elite, rng, population)
+        return self.ranked()
+
+    def ranked(self):
+        return sorted(self.results, key=lambda r: r[0])
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m sound_monitor.sweep",
+                                 description="Varredura de constantes do modo dinâmico sobre traços gravados.")
+    ap.add_argument("traces", nargs="+", help="traços (mesmos formatos do replay)")
+    ap.add_argument("-p", "--param", action="append", default=[], metavar="NOME=V1,V2|LO:HI",
+                    help="dimensão do espaço de busca (repetível)")
+    ap.add_argument("--search", choices=("grid", "random", "refine"), default="grid")
+    ap.add_argument("-n", "--samples", type=int, default=200, help="configurações por rodada (random/refine)")
+    ap.add_argument("--rounds", type=int, default=5, help="rodadas do refine")
+    ap.add_argument("--strategy", choices=("reserva", "zona_segura"), default="reserva")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--dose-target", type=float, default=1.0)
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--out", help="todas as avaliações em CSV")
+    args = ap.parse_args(argv)
+
+    space = parse_space(args.param)
+    if not space:
+        ap.error("informe ao menos um --param")
+    traces = [load_trace(p) for p in args.traces]
+    rng = random.Random(args.seed)
+    t = time.perf_counter()
+    with Sweep(traces, strategy=args.strategy, workers=args.workers, dose_target=args.dose_target) as sw:
+        if args.search == "grid":
+            sw.run(grid_configs(space))
+        elif args.search == "random":
+            sw.run(random_configs(space, args.samples, rng))
+        else:
+            sw.refine(space, args.samples, args.rounds, rng)
+    ranked = sw.ranked()
+    elapsed = time.perf_counter() - t
+
+    names = list(space)
+    metric_names = ("max_dose", "mean_dose", "interventions", "interventions_per_h", "locked_frac")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8", newline="") as fh:
+            w = csv.writer(fh)
+            w.writerow(["score", *names, *metric_names])
+            for sc, params, m in ranked:
+                w.writerow([sc, *(params[n] for n in names), *(m[k] for k in metric_names)])
+    for rank, (sc, params, m) in enumerate(ranked[:args.top], start=1):
+        p = " ".join(f"{k}={v:g}" for k, v in params.items())
+        print(f"{rank:3d}. score={sc:8.3f} dose_max={m['max_dose']*100:5.1f}% "
+              f"interv/h={m['interventions_per_h']:6.2f} bloqueado={m['locked_frac']*100:5.1f}% | {p}")
+    print(f"{len(ranked)} configurações x {len(traces)} traços em {elapsed:.1f} s "
+          f"({sw.workers} processos)", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
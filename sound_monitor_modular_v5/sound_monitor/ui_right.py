@@ -4,7 +4,8 @@ from .constants import (
     DISCORD_SURFACE, DISCORD_SURFACE_ALT, DISCORD_ACCENT,
     DISCORD_SUCCESS
 )
-from .gauge import Gauge
+from .gauge import Gauge, ZoneBadge
+from .charting import HistoryChart
 
 def build_right_panel(app):
     app.right_frame = ctk.CTkFrame(app, corner_radius=10, fg_color=DISCORD_SURFACE)
@@ -27,20 +28,9 @@ def build_right_panel(app):
                                    bg=DISCORD_SURFACE, fg="white")
     app.zone_text_label.pack(pady=(0, 0))
 
-    app.zone_canvas = tk.Canvas(info_frame, width=160, height=64, bg=DISCORD_SURFACE, highlightthickness=0)
+    app.zone_canvas = ZoneBadge(info_frame, width=160, height=64)
     app.zone_canvas.pack(pady=(0, 0), expand=True)
-
-    def draw_zone_badge(text, color):
-        app.zone_canvas.delete("all")
-        r = 16; x1, y1, x2, y2 = 0, 0, 160, 64
-        app.zone_canvas.create_arc(x1, y1, x1 + 2*r, y1 + 2*r, start=90, extent=90, fill=color, outline=color)
-        app.zone_canvas.create_arc(x2 - 2*r, y1, x2, y1 + 2*r, start=0, extent=90, fill=color, outline=color)
-        app.zone_canvas.create_arc(x1, y2 - 2*r, x1 + 2*r, y2, start=180, extent=90, fill=color, outline=color)
-        app.zone_canvas.create_arc(x2 - 2*r, y2 - 2*r, x2, y2, start=270, extent=90, fill=color, outline=color)
-        app.zone_canvas.create_rectangle(x1 + r, y1, x2 - r, y2, fill=color, outline=color)
-        app.zone_canvas.create_rectangle(x1, y1 + r, x2, y2 - r, fill=color, outline=color)
-        app.zone_canvas.create_text(80, 32, text=text, font=("Segoe UI", 18, "bold"), fill="white")
-    app.draw_zone_badge = draw_zone_badge
+    app.draw_zone_badge = app.zone_canvas.set
     app.draw_zone_badge("SEGURA", DISCORD_SUCCESS)
 
     app.time_label = tk.Label(app.right_frame, text="Tempo permitido: --:--:-- | Tempo neste volume: --:--:--",
@@ -61,7 +51,11 @@ def build_right_panel(app):
 
     app.period_label = tk.Label(app.right_frame, text="Dose diária: 0%",
                                 font=("Segoe UI", 12), bg=DISCORD_SURFACE, fg="#bbb")
-    app.period_label.pack(pady=(0, 10))
+    app.period_label.pack(pady=(0, 4))
+
+    app.summary_label = tk.Label(app.right_frame, text="Sessão: sem dados",
+                                 font=("Segoe UI", 10), bg=DISCORD_SURFACE, fg="#9aa0a6", justify="center")
+    app.summary_label.pack(pady=(0, 8))
 
     vol_frame = ctk.CTkFrame(app.right_frame, fg_color=DISCORD_SURFACE)
     vol_frame.pack(pady=10)
@@ -81,7 +75,7 @@ def build_right_panel(app):
     chart_frame.pack(fill="x", padx=20, pady=(8, 0))
     app.chart_canvas = tk.Canvas(chart_frame, width=760, height=120, bg=DISCORD_SURFACE_ALT, highlightthickness=0)
     app.chart_canvas.pack()
-    app.chart_canvas.bind("<Configure>", lambda e: app._on_ui(app._draw_history_chart))
+    app.history_chart = HistoryChart(app.chart_canvas)
 
     btn_frame = ctk.CTkFrame(app.right_frame, fg_color=DISCORD_SURFACE)
     btn_frame.pack(side="bottom", pady=18)
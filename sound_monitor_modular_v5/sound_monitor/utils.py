@@ -1,4 +1,5 @@
 import math
+from datetime import datetime, timedelta, time as dtime
 
 def map_percent_to_db(vol_percent, cfg):
     min_db = cfg["min_db"]; max_db = cfg["max_db"]
@@ -38,9 +39,46 @@ def risk_zone_from_level(L):
     else:
         return "PERIGO"
 
+def quantize_pct(pct, quantum):
+    q = float(quantum) if quantum else 1.0
+    return max(0.0, min(100.0, round(float(pct) / q) * q))
+
+def prefix_volume_cap_pct(dose, cfg, target_sec=10 * 60):
+    """Teto de volume do modo prefixado (mantém ≥ target_sec de folga); None = sem teto."""
+    base = cfg["base_time_sec"]
+    ref = cfg["ref_db"]
+    er = float(cfg.get("exchange_rate_db", 3.0))
+    if (1.0 - dose) * base >= target_sec:
+        return None
+    arg = max(1e-9, ((1.0 - dose) * base) / target_sec)
+    Lmax = ref + er * math.log(arg, 2)
+    vol_cap = db_to_percent(Lmax, cfg)
+    if vol_cap >= 100.0:
+        return None
+    if vol_cap <= 0.0:
+        return 0.0
+    return vol_cap
+
+def prefix_cap_dose_threshold(vol_percent, cfg, target_sec=10 * 60, tol=0.1):
+    """Dose a partir da qual `vol_percent` passa do teto do prefixado (+tol); None = nunca."""
+    v = float(vol_percent) - tol
+    if v <= 0.0:
+        return None
+    er = max(0.1, float(cfg.get("exchange_rate_db", 3.0)))
+    base = float(cfg["base_time_sec"])
+    L = map_percent_to_db(v, cfg)
+    allowed = base * (2 ** (-(L - float(cfg["ref_db"])) / er))
+    return max(1.0 - target_sec / base, 1.0 - target_sec / allowed)
+
 def fmt_hms(seconds):
     s = int(max(0, seconds)); h = s // 3600; m = (s % 3600) // 60; sec = s % 60
     return f"{h:02d}:{m:02d}:{sec:02d}"
 
 def round_pct_ui(x: float) -> int:
     return int(math.floor(float(x) + 0.5))
+
+def day_bounds(ts):
+    """Chave do dia local ('YYYY-MM-DD') e timestamp da próxima meia-noite."""
+    d = datetime.fromtimestamp(ts)
+    end = datetime.combine(d.date() + timedelta(days=1), dtime())
+    return d.strftime("%Y-%m-%d"), end.timestamp()
@@ -0,0 +1,63 @@
+import os, tempfile, time, unittest
+
+from sound_monitor.analytics import has_numpy
+
+if has_numpy():
+    import numpy as np
+    from sound_monitor.analytics import analyze_arrays, load_arrays
+    from sound_monitor.history import HistoryStore, MODES, ZONES
+    from sound_monitor.reporting import export_report
+    from sound_monitor.replay import DEFAULT_CFG
+
+def _cols(ts, L=60.0):
+    n = len(ts)
+    return {"ts": np.asarray(ts, dtype=np.float64), "t_session": np.asarray(ts, dtype=np.float64) - ts[0],
+            "mode": np.zeros(n, np.int8), "vol_percent": np.full(n, 30.0), "L": np.full(n, L),
+            "dose": np.zeros(n), "zone": np.zeros(n, np.int8), "daily": np.linspace(0.0, 0.1, n)}
+
+@unittest.skipUnless(has_numpy(), "numpy ausente")
+@unittest.skipUnless(hasattr(time, "tzset"), "fuso configurável só com time.tzset")
+class LocalTimeBucketsTest(unittest.TestCase):
+    def setUp(self):
+        self._tz = os.environ.get("TZ")
+        os.environ["TZ"] = "Europe/Berlin"
+        time.tzset()
+
+    def tearDown(self):
+        if self._tz is None:
+            os.environ.pop("TZ", None)
+        else:
+            os.environ["TZ"] = self._tz
+        time.tzset()
+
+    def test_hours_follow_dst_change(self):
+        # 2024-03-31 00:30..01:30 UTC: 01:30 CET -> 03:30 CEST (02:00 local não existe)
+        t0 = 1711845000.0
+        st = analyze_arrays(_cols(np.arange(t0, t0 + 3600.0)))
+        self.assertEqual(sorted(st["hourly_leq"]), ["2024-03-31 01:00", "2024-03-31 03:00"])
+        self.assertEqual(list(st["daily_dose"]), ["2024-03-31"])
+
+    def test_days_split_at_local_midnight_after_change(self):
+        # 2024-10-26 21:30 UTC (23:30 CEST) até 2024-10-27 23:30 UTC (00:30 CET do dia 28)
+        t0 = 1729978200.0
+        st = analyze_arrays(_cols(np.arange(t0, t0 + 26 * 3600.0, 60.0)), max_gap=120.0)
+        self.assertEqual(list(st["daily_dose"]), ["2024-10-26", "2024-10-27", "2024-10-28"])
+        hours = sorted(st["hourly_leq"])
+        self.assertEqual((hours[0], hours[-1]), ("2024-10-26 23:00", "2024-10-28 00:00"))
+
+    def test_csv_load_round_trips_across_dst(self):
+        t0 = 1711845000.0
+        samples = [(t0 + 7 * i, 7.0 * i, MODES[i % 2], 30.0 + i % 5, 50.0 + i / 10, i / 1000, ZONES[i % 3], i / 500)
+                   for i in range(1000)]
+        with tempfile.TemporaryDirectory() as d:
+            for name in ("s.csv", "s.csv.gz"):
+                path = os.path.join(d, name)
+                export_report(HistoryStore.from_samples(samples), DEFAULT_CFG, path)
+                cols = load_arrays(path)
+                self.assertEqual(cols["ts"].tolist(), [s[0] for s in samples])
+                self.assertEqual(cols["mode"].tolist(), [i % 2 for i in range(1000)])
+                self.assertEqual(cols["zone"].tolist(), [i % 3 for i in range(1000)])
+                self.assertEqual(cols["L"].tolist(), [s[4] for s in samples])
+
+if __name__ == "__main__":
+    unittest.main()
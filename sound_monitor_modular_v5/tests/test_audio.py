@@ -0,0 +1,84 @@
+import threading, time, unittest
+
+from sound_monitor.audio import AudioActor, VolumeEnforcer, PRIO_USER, PRIO_CEILING, PRIO_LOCK
+from sound_monitor.simaudio import SimulatedEndpoint
+
+def _until(cond, timeout=2.0):
+    end = time.time() + timeout
+    while not cond() and time.time() < end:
+        time.sleep(0.005)
+    return cond()
+
+class AudioActorTest(unittest.TestCase):
+    def setUp(self):
+        self.ep = SimulatedEndpoint(volume=30.0)
+        self.actor = AudioActor(self.ep).start()
+        self.actor.refresh(wait=True)
+
+    def tearDown(self):
+        self.actor.stop()
+
+    def _settle(self):
+        # a leitura pedida só termina depois de aplicar as intenções pendentes
+        self.actor.refresh(wait=True)
+        return self.ep.peek()
+
+    def test_lock_beats_ceiling_beats_user(self):
+        a = self.actor
+        a.request(70, PRIO_USER)
+        self.assertEqual(self._settle(), 70.0)
+        a.request(50, PRIO_CEILING)
+        a.request(80, PRIO_USER)
+        self.assertEqual(self._settle(), 50.0)
+        a.request(20, PRIO_LOCK)
+        a.request(45, PRIO_USER)
+        self.assertEqual(self._settle(), 20.0)
+        a.release(PRIO_LOCK)
+        a.request(90, PRIO_USER)
+        self.assertEqual(self._settle(), 50.0)
+        a.release(PRIO_CEILING)
+        a.request(90, PRIO_USER)
+        self.assertEqual(self._settle(), 90.0)
+
+    def test_noop_write_is_skipped(self):
+        a = self.actor
+        a.request(40, PRIO_USER)
+        self._settle()
+        sets, skipped = self.ep.call_count("set_percent"), a.skipped
+        a.request(40, PRIO_USER)
+        self._settle()
+        self.assertEqual(self.ep.call_count("set_percent"), sets)
+        self.assertEqual(a.skipped, skipped + 1)
+        self.assertEqual(a.cached, 40.0)
+
+    def test_lock_reverts_external_change(self):
+        a = self.actor
+        a.request(25, PRIO_LOCK)
+        self._settle()
+        self.ep.external_set(80)
+        self.assertTrue(_until(lambda: self.ep.peek() == 25.0))
+        self.assertGreaterEqual(a.corrections, 1)
+
+class VolumeEnforcerTest(unittest.TestCase):
+    def test_exits_without_target_and_never_relocks(self):
+        ep = SimulatedEndpoint(volume=30.0)
+        actor = AudioActor(ep).start()
+        try:
+            target = [20.0]
+            stop = threading.Event()
+            enf = VolumeEnforcer(actor, lambda: target[0], stop, poll_interval=0.01, verify_interval=0.01)
+            enf.start()
+            self.assertTrue(_until(lambda: ep.peek() == 20.0))
+            target[0] = None                  # bloqueio liberado
+            stop.set()
+            actor.release(PRIO_LOCK)
+            enf.join(2.0)
+            self.assertFalse(enf.is_alive())
+            actor.request(60, PRIO_USER)
+            actor.refresh(wait=True)
+            self.assertEqual(ep.peek(), 60.0)
+        finally:
+            actor.stop()
+
+if __name__ == "__main__":
+    unittest.main()
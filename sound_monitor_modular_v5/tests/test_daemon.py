@@ -0,0 +1,76 @@
+import json, os, subprocess, sys, tempfile, time, unittest
+from pathlib import Path
+
+from sound_monitor.daemon import DaemonClient, DaemonError
+
+ROOT = Path(__file__).resolve().parent.parent
+
+class DaemonImportTest(unittest.TestCase):
+    def test_import_skips_heavy_modules(self):
+        # o daemon sobe sem tkinter e sem openpyxl/numpy (só a exportação .xlsx os carrega)
+        code = ("import sys, sound_monitor.daemon; "
+                "print(','.join(m for m in ('tkinter', 'openpyxl', 'numpy') if m in sys.modules))")
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=ROOT)
+        self.assertEqual(out.stdout.strip(), "")
+
+class DaemonProtocolTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        home = cls._tmp.name
+        env = dict(os.environ, HOME=home, USERPROFILE=home, TSM_AUDIO="sim:latency=0.001",
+                   PYTHONPATH=str(ROOT))
+        cls.proc = subprocess.Popen([sys.executable, "-m", "sound_monitor.daemon", "run"], cwd=ROOT, env=env,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        ep = Path(home) / ".tcc_sound_monitor" / "daemon.json"
+        end = time.time() + 20.0
+        while not ep.exists() and time.time() < end and cls.proc.poll() is None:
+            time.sleep(0.05)
+        if not ep.exists():
+            cls.proc.kill()
+            cls._tmp.cleanup()
+            raise RuntimeError("daemon não anunciou o endpoint")
+        data = json.loads(ep.read_text(encoding="utf-8"))
+        cls.port, cls.token = int(data["port"]), str(data["token"])
+
+    @classmethod
+    def tearDownClass(cls):
+        try:
+            c = DaemonClient(cls.port, cls.token)
+            c.call("shutdown")
+            c.close()
+            cls.proc.wait(10)
+        except Exception:
+            cls.proc.kill()
+            cls.proc.wait()
+        cls._tmp.cleanup()
+
+    def test_hello_and_subscribe(self):
+        c = DaemonClient(self.port, self.token)
+        try:
+            snap = c.call("subscribe")
+            self.assertEqual(set(snap), {"state", "slots", "rows"})
+            self.assertIn(snap["state"]["mode"], ("prefixado", "dinamico"))
+            self.assertEqual(c.call("set_volume", value=40.0), {"volume": 40.0})
+            # a mudança chega como evento de estado para quem está inscrito
+            for ev in c.events():
+                if ev.get("ev") == "state" and ev["state"]["volume"] == 40.0:
+                    break
+            self.assertEqual(c.call("status")["state"]["volume"], 40.0)
+            with self.assertRaises(DaemonError):
+                c.call("no_such_command")
+        finally:
+            c.close()
+
+    def test_bad_token_is_rejected(self):
+        with self.assertRaises(DaemonError):
+            DaemonClient(self.port, "0" * 32, timeout=3.0)
+        # o daemon segue atendendo quem tem o token
+        c = DaemonClient(self.port, self.token)
+        try:
+            self.assertIn("state", c.call("status"))
+        finally:
+            c.close()
+
+if __name__ == "__main__":
+    unittest.main()
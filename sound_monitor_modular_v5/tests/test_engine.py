@@ -0,0 +1,70 @@
+import unittest
+
+from sound_monitor.engine import DoseEngine
+from sound_monitor.replay import DEFAULT_CFG
+
+T0 = 1.7e9
+MAX_SLEEP = 60.0   # TickScheduler.max_sleep
+
+def _run(vol, duration, step=None):
+    """Dirige o motor como o monitor: ações aplicadas na hora; passos fixos (`step`) ou pelo next_deadline."""
+    eng = DoseEngine(dict(DEFAULT_CFG))
+    eng.max_dt = MAX_SLEEP + 1.0
+    t, end = T0, T0 + duration
+    eng.step(t, vol)
+    while t < end:
+        if step is not None:
+            t = min(end, t + step)
+        else:
+            t = min(end, t + MAX_SLEEP, max(t + 1e-3, eng.next_deadline(t)))
+        res = eng.step(t, vol)
+        if res.lock_target is not None:
+            vol = eng.lock(res.lock_target, res.lock_reason)
+        elif res.volume_target is not None:
+            vol = res.volume_target
+    return eng
+
+class DeadlineIntegrationTest(unittest.TestCase):
+    def test_daily_lock_holds_new_level(self):
+        # 90% por 4 h passa de 100% e trava no mínimo; o intervalo longo depois do
+        # bloqueio diário tem de ser integrado no nível travado, não no anterior
+        coarse = _run(90.0, 4 * 3600)
+        fine = _run(90.0, 4 * 3600, step=0.2)
+        self.assertTrue(coarse.locked)
+        self.assertAlmostEqual(coarse.daily_dose, fine.daily_dose, delta=1e-4)
+
+class CheckpointTest(unittest.TestCase):
+    def test_restore_after_paused_checkpoint_credits_nothing(self):
+        eng = DoseEngine(dict(DEFAULT_CFG))
+        eng.step(T0, 90.0)
+        eng.step(T0 + 60, 90.0)
+        eng.paused = True
+        eng.step(T0 + 120, 90.0)
+        state = eng.checkpoint(T0 + 120)
+        self.assertEqual(state["rate"], 0.0)
+        fresh = DoseEngine(dict(DEFAULT_CFG))
+        fresh.restore(state, now=T0 + 180, max_gap=120)
+        self.assertEqual(fresh.daily_dose, eng.daily_dose)
+        self.assertEqual(fresh.session_dose, eng.session_dose)
+
+    def test_restore_after_running_checkpoint_credits_gap(self):
+        eng = DoseEngine(dict(DEFAULT_CFG))
+        eng.step(T0, 90.0)
+        eng.step(T0 + 60, 90.0)
+        state = eng.checkpoint(T0 + 60)
+        fresh = DoseEngine(dict(DEFAULT_CFG))
+        fresh.restore(state, now=T0 + 120, max_gap=120)
+        self.assertGreater(fresh.daily_dose, eng.daily_dose)
+
+class PrefixCapTest(unittest.TestCase):
+    def test_table_decision_matches_exact_cap(self):
+        eng = DoseEngine(dict(DEFAULT_CFG))
+        for i in range(1001):
+            dose = i / 1000.0
+            cap = eng.prefix_cap(dose)
+            for v in range(101):
+                expected = cap is not None and v > cap + 0.1
+                self.assertEqual(eng.prefix_cap_exceeded(float(v), dose) is not None, expected, (v, dose))
+
+if __name__ == "__main__":
+    unittest.main()
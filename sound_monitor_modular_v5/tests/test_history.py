@@ -0,0 +1,65 @@
+import unittest
+
+from sound_monitor.ringbuf import ColumnRing, TimeWindowRing
+from sound_monitor.history import HistoryStore
+
+def _sample(i):
+    return (1.7e9 + i, float(i), "dinamico" if i % 2 else "prefixado", 30.0 + i, 50.0 + i / 10,
+            i / 100.0, "ATENÇÃO" if i % 3 else "SEGURA", i / 50.0)
+
+class ColumnRingTest(unittest.TestCase):
+    def test_wraparound_keeps_newest_in_order(self):
+        r = ColumnRing((("a", "l"), ("b", "d")), 4)
+        for i in range(10):
+            r.append(i, i * 0.5)
+        self.assertEqual(len(r), 4)
+        self.assertEqual(list(r.rows()), [(i, i * 0.5) for i in range(6, 10)])
+        self.assertEqual(r[0], (6, 3.0))
+        self.assertEqual(r[-1], (9, 4.5))
+        # o intervalo cruza a volta do anel: duas fatias, mesma ordem
+        segs = r.segments("a", 1, 4)
+        self.assertEqual([x for s in segs for x in s], [7, 8, 9])
+        self.assertEqual(list(r.rows(1, 3)), [(7, 3.5), (8, 4.0)])
+
+    def test_drop_oldest_and_bisect(self):
+        r = ColumnRing((("a", "l"),), 5)
+        for i in range(7):
+            r.append(i * 10)
+        r.drop_oldest(2)
+        self.assertEqual([v for (v,) in r.rows()], [40, 50, 60])
+        self.assertEqual(r.bisect_left("a", 45), 1)
+        self.assertEqual(r.bisect_left("a", 70), 3)
+
+class TimeWindowRingTest(unittest.TestCase):
+    def test_evict_before_across_wrap(self):
+        w = TimeWindowRing(8)
+        for t in range(20):
+            w.append(float(t), 60.0, t / 100.0)
+            w.evict_before(t - 5)
+        self.assertEqual([p[0] for p in w], [14.0, 15.0, 16.0, 17.0, 18.0, 19.0])
+        self.assertEqual(w.latest_t(), 19.0)
+        self.assertEqual(w.window_start(16.5), 3)
+
+class HistoryStoreTest(unittest.TestCase):
+    def test_snapshot_is_chronological_after_wrap(self):
+        h = HistoryStore(5)
+        for i in range(12):
+            h.append_sample(_sample(i))
+        snap = h.snapshot()
+        h.append_sample(_sample(12))   # o snapshot não acompanha gravações posteriores
+        self.assertEqual(len(snap), 5)
+        self.assertEqual(list(snap.column("t_session")), [7.0, 8.0, 9.0, 10.0, 11.0])
+        rows = list(snap.iter_rows())
+        self.assertEqual([r[2] for r in rows], ["dinamico", "prefixado", "dinamico", "prefixado", "dinamico"])
+        self.assertEqual([r[6] for r in rows], ["ATENÇÃO", "ATENÇÃO", "SEGURA", "ATENÇÃO", "ATENÇÃO"])
+        self.assertEqual(list(h.column("t_session")), [8.0, 9.0, 10.0, 11.0, 12.0])
+
+    def test_from_samples_matches_appends(self):
+        samples = [_sample(i) for i in range(6)]
+        h = HistoryStore(6)
+        for s in samples:
+            h.append_sample(s)
+        self.assertEqual(list(HistoryStore.from_samples(samples).rows()), list(h.rows()))
+
+if __name__ == "__main__":
+    unittest.main()
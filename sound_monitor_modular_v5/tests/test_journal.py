@@ -0,0 +1,47 @@
+import tempfile, unittest
+
+from sound_monitor.journal import SessionJournal, read_journal, read_segment, segment_paths
+from sound_monitor.utils import day_bounds
+
+def _sample(ts, i):
+    return (ts, float(i), "prefixado", 30.0, 56.5, i / 1000.0, "SEGURA", i / 500.0)
+
+class SessionJournalTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.base = self._tmp.name
+        _day, self.midnight = day_bounds(1.7e9)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _write(self, samples):
+        j = SessionJournal(base=self.base)   # sem start(): close() grava na própria thread
+        for s in samples:
+            j.append(s)
+        j.close()
+        return j
+
+    def test_rotates_segment_at_local_midnight(self):
+        samples = [_sample(self.midnight + k, k + 3) for k in range(-3, 3)]
+        j = self._write(samples)
+        self.assertEqual(j.written, 6)
+        paths = segment_paths(self.base)
+        self.assertEqual([p.stem for p in paths],
+                         [day_bounds(self.midnight - 1)[0], day_bounds(self.midnight)[0]])
+        self.assertEqual([r[0] for r in read_segment(paths[0])], [self.midnight - 3, self.midnight - 2, self.midnight - 1])
+        self.assertEqual(list(read_journal(self.base, decode=True)), samples)
+
+    def test_partial_trailing_record_is_dropped_and_truncated(self):
+        first = [_sample(self.midnight - 100 + k, k) for k in range(4)]
+        self._write(first)
+        (path,) = segment_paths(self.base)
+        with open(path, "ab") as fh:
+            fh.write(b"\x01" * 11)       # queda no meio de um registro
+        self.assertEqual(list(read_segment(path, decode=True)), first)
+        more = [_sample(self.midnight - 50 + k, 10 + k) for k in range(2)]
+        self._write(more)                # reabrir corta o resto e continua alinhado
+        self.assertEqual(list(read_segment(path, decode=True)), first + more)
+
+if __name__ == "__main__":
+    unittest.main()
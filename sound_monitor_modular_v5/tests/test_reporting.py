@@ -0,0 +1,52 @@
+import csv, gzip, os, tempfile, unittest
+
+from sound_monitor.history import HistoryStore, COLUMNS, MODES, ZONES
+from sound_monitor.reporting import export_report, load_columnar, HEADERS
+from sound_monitor.replay import DEFAULT_CFG
+
+def _sample(i):
+    return (1.7e9 + i + 0.25, i * 1.000001, MODES[i % 2], 30.0 + (i % 7), 40.0 + i / 3.0,
+            i / 997.0, ZONES[i % 3], i / 313.0)
+
+class ColumnarExportTest(unittest.TestCase):
+    def setUp(self):
+        # no Windows as views do mmap seguram o arquivo até serem coletadas
+        self._tmp = tempfile.TemporaryDirectory(ignore_cleanup_errors=True)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _export(self, history, name):
+        path = os.path.join(self._tmp.name, name)
+        export_report(history, DEFAULT_CFG, path)
+        return path
+
+    def test_tsc_round_trip_is_exact(self):
+        h = HistoryStore(50)
+        for i in range(73):                      # anel já deu a volta
+            h.append_sample(_sample(i))
+        meta, cols = load_columnar(self._export(h, "s.tsc"))
+        self.assertEqual(meta["rows"], 50)
+        self.assertEqual(meta["modes"], list(MODES))
+        self.assertEqual(meta["zones"], list(ZONES))
+        self.assertEqual([c["header"] for c in meta["columns"]], HEADERS)
+        for name, _tc in COLUMNS:
+            self.assertEqual(list(cols[name]), list(h.column(name)), name)
+
+    def test_tsc_empty_history(self):
+        meta, cols = load_columnar(self._export(HistoryStore(4), "vazio.tsc"))
+        self.assertEqual(meta["rows"], 0)
+        self.assertTrue(all(len(c) == 0 for c in cols.values()))
+
+    def test_csv_gz_rows(self):
+        h = HistoryStore.from_samples([_sample(i) for i in range(5)])
+        with gzip.open(self._export(h, "s.csv.gz"), "rt", encoding="utf-8", newline="") as fh:
+            rows = list(csv.reader(fh))
+        self.assertEqual(rows[0], HEADERS)
+        self.assertEqual(len(rows), 6)
+        self.assertEqual([r[2] for r in rows[1:]], [MODES[i % 2] for i in range(5)])
+        self.assertEqual(float(rows[3][5]), 2 / 997.0)
+        self.assertFalse(os.path.exists(os.path.join(self._tmp.name, "s.csv.gz.part")))
+
+if __name__ == "__main__":
+    unittest.main()
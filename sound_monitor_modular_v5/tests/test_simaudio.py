@@ -0,0 +1,19 @@
+import time, unittest
+
+from sound_monitor.simaudio import SimulatedEndpoint, UserActivity
+
+class UserActivityTest(unittest.TestCase):
+    def test_start_stop_join(self):
+        ep = SimulatedEndpoint(volume=30.0)
+        user = UserActivity(ep, mean_interval=0.005, low=40.0, high=60.0, seed=1)
+        user.start()
+        deadline = time.time() + 2.0
+        while ep.peek() == 30.0 and time.time() < deadline:
+            time.sleep(0.01)
+        user.stop()
+        user.join(2.0)
+        self.assertFalse(user.is_alive())
+        self.assertTrue(40.0 <= ep.peek() <= 60.0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import math, random, unittest
+
+from sound_monitor.history import HistoryStore, MODES, ZONES
+from sound_monitor.reporting import compute_summary_stats
+from sound_monitor.stats import SessionStats
+
+def _samples(n, seed=7):
+    rng = random.Random(seed)
+    t, dose, out = 0.0, 0.0, []
+    for i in range(n):
+        t += rng.choice((0.0, 0.5, 1.0, 1.0, 3.0))      # inclui amostras repetidas (dt = 0)
+        L = rng.uniform(40.0, 95.0)
+        dose = min(1.2, dose + rng.uniform(0.0, 0.02))
+        out.append((1.7e9 + t, t, rng.choice(MODES), rng.uniform(5, 100), L, dose, rng.choice(ZONES), dose))
+    return out
+
+def _rescan(samples):
+    """Referência: varredura completa como o compute_summary_stats original (intervalo com a amostra anterior)."""
+    T = sum_L = energy = 0.0
+    zone = dict.fromkeys(ZONES, 0.0); mode = dict.fromkeys(MODES, 0.0)
+    for cur, nxt in zip(samples, samples[1:]):
+        dt = max(0.0, nxt[1] - cur[1])
+        T += dt; sum_L += cur[4] * dt; energy += 10 ** (cur[4] / 10) * dt
+        zone[cur[6]] += dt; mode[cur[2]] += dt
+    t50 = next((s[1] for s in samples if s[5] >= 0.5), None)
+    t100 = next((s[1] for s in samples if s[5] >= 1.0), None)
+    return {
+        "points": len(samples), "total_time_s": T,
+        "avg_db": sum_L / T if T else 0.0, "leq_db": 10 * math.log10(energy / T) if T else 0.0,
+        "peak_db": max(s[4] for s in samples), "peak_vol": max(s[3] for s in samples),
+        "max_dose": max(s[5] for s in samples),
+        "t_to_50_days": t50 / 86400.0 if t50 is not None else 0.0,
+        "t_to_100_days": t100 / 86400.0 if t100 is not None else 0.0,
+        "zone_time_s": zone, "mode_time_s": mode,
+    }
+
+class SessionStatsTest(unittest.TestCase):
+    def assertSummary(self, got, ref):
+        for k, v in ref.items():
+            if isinstance(v, dict):
+                for kk in v:
+                    self.assertAlmostEqual(got[k][kk], v[kk], places=6, msg=f"{k}[{kk}]")
+            else:
+                self.assertAlmostEqual(got[k], v, places=6, msg=k)
+
+    def test_incremental_matches_rescan_at_every_prefix(self):
+        samples = _samples(400)
+        st = SessionStats()
+        for i, s in enumerate(samples, 1):
+            st.add(s)
+            if i % 57 == 0 or i == len(samples):
+                self.assertSummary(st.summary(), _rescan(samples[:i]))
+
+    def test_matches_compute_summary_stats(self):
+        samples = _samples(250, seed=3)
+        st = SessionStats()
+        for s in samples:
+            st.add(s)
+        self.assertSummary(st.summary(), compute_summary_stats(HistoryStore.from_samples(samples)))
+
+    def test_reset_and_device_attribution(self):
+        st = SessionStats()
+        st.add((0.0, 0.0, MODES[0], 30.0, 60.0, 0.0, ZONES[0], 0.0), device="A")
+        st.add((1.0, 10.0, MODES[0], 30.0, 60.0, 0.1, ZONES[0], 0.1), device="B")
+        st.add((2.0, 15.0, MODES[0], 30.0, 60.0, 0.3, ZONES[0], 0.3), device="B")
+        s = st.summary()
+        self.assertEqual(s["device_time_s"], {"A": 10.0, "B": 5.0})
+        self.assertAlmostEqual(s["device_dose"]["A"], 0.1)
+        self.assertAlmostEqual(s["device_dose"]["B"], 0.2)
+        st.reset()
+        self.assertEqual(st.summary()["points"], 0)
+        self.assertEqual(st.summary()["total_time_s"], 0.0)
+
+if __name__ == "__main__":
+    unittest.main()